@@ -1,7 +1,5 @@
-from flask import Flask, render_template, jsonify, request, session, redirect, url_for
+from flask import Flask, Response, render_template, jsonify, request, session, redirect, url_for
 from functools import wraps
-from dataclasses import asdict
-import random
 import threading
 import time
 import os
@@ -11,12 +9,22 @@ from models import Stock
 from storage import StockStorage
 from search import SearchManager
 from ranking import RankingManager
-from trend_analysis import TrendAnalyzer
+from trend_analysis import TrendEngine
+from indicators import IndicatorAnalyzer
 from sorting import StockSorter
+from sorted_index import StockIndexes
 from sector_analysis import SectorAnalyzer
-from main import populate_initial_data # Reuse data population
+from changes import ChangeTracker
+from streaming import StreamBroadcaster
+from main import populate_initial_data, backfill_history # Reuse data population
 from live_data import LiveDataManager
-from portfolio_manager import PortfolioManager
+from portfolio_manager import PortfolioBook, DEFAULT_USER, DEFAULT_ACCOUNT
+from simulate import simulate, METHODS as SIMULATION_METHODS, MAX_PATH_VALUES
+from persistence import MarketStore
+from tick_archive import TickArchive
+from bars import BarBuilder
+from response_cache import ResponseCache
+from serialization import STOCK_FIELDS, json_response, parse_fields, project
 
 app = Flask(__name__)
 app.secret_key = "rvce_secret_key_1234" # Session encryption
@@ -29,44 +37,90 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def reads_market(f):
+    # Shared storage lock for the whole request: one consistent view, concurrent with other readers
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with storage.lock.read():
+            return f(*args, **kwargs)
+    return decorated_function
+
 storage = StockStorage()
-search_manager = SearchManager(storage)
-ranking_manager = RankingManager(storage)
-trend_analyzer = TrendAnalyzer()
+portfolio_book = PortfolioBook(storage) # Every user's portfolios, refreshed per tick through a symbol index
+DATA_DIR = os.environ.get('STOCK_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+market_store = MarketStore(DATA_DIR) # Snapshot + tick log on disk
+indicator_analyzer = IndicatorAnalyzer()
 sorter = StockSorter(threshold=20)
-sector_analyzer = SectorAnalyzer(storage)
+response_cache = ResponseCache(lambda: storage.write_version) # Serialized reads, valid until the next mutation
 live_data_manager = LiveDataManager()
-portfolio_manager = PortfolioManager(storage)
+tick_archive = TickArchive(os.path.join(DATA_DIR, 'ticks')) # Timestamped ticks for long-range charts
+SIMULATION_WORKERS = int(os.environ.get('SIMULATION_WORKERS', os.cpu_count() or 1)) # Monte Carlo process pool size
+PORTFOLIO_RESYNC_EVERY = 20 # refreshes between full portfolio resyncs (clears the incremental P/L's float drift)
+
+# Components that index the market: built by create_app(), once the market is loaded
+search_manager = trend_engine = bar_builder = sector_analyzer = None
+stock_indexes = ranking_manager = change_tracker = broadcaster = None
 
 last_update_time = datetime.now()
-data_version = 0
 
-populate_initial_data(storage)
+def create_app():
+    """
+    Load the market, build the components over it, start logging and the refresh thread.
+    Kept out of import so that importing this module does nothing: simulation workers
+    start from a clean interpreter and re-import the main module. Run as `python app.py`,
+    or serve `app:create_app()` from a WSGI server.
+    """
+    global search_manager, trend_engine, bar_builder, sector_analyzer
+    global stock_indexes, ranking_manager, change_tracker, broadcaster
+    # Loaded before the components below so they index the restored market
+    warm_start = market_store.load(storage, portfolio_book)
+    search_manager = SearchManager(storage)
+    trend_engine = TrendEngine(storage) # Incremental trends, updated on every price tick
+    bar_builder = BarBuilder(storage) # Live OHLCV bars (1m..1d) per symbol
+    sector_analyzer = SectorAnalyzer(storage) # Running per-sector aggregates behind /api/sectors
+    stock_indexes = StockIndexes(storage) # Sorted indexes backing /api/stocks pagination
+    ranking_manager = RankingManager(storage, stock_indexes) # Live top-K leaderboards
+    change_tracker = ChangeTracker(storage) # Per-symbol versions behind /api/changes
+    broadcaster = StreamBroadcaster(storage, trend_engine, change_tracker) # SSE ticks for /api/stream
+
+    if not warm_start:
+        populate_initial_data(storage)
+    market_store.attach(storage, portfolio_book) # log every change from here on
+    tick_archive.attach(storage)
+    threading.Thread(target=background_refresh, daemon=True).start()
+    return app
 
 def background_refresh():
-    global last_update_time, data_version
+    global last_update_time
+    refreshes = 0
     while True:
         time.sleep(30)
+        refreshes += 1
         try:
+            if refreshes % PORTFOLIO_RESYNC_EVERY == 0:
+                with storage.lock.write():
+                    portfolio_book.resync()
             print("Background refresh: Fetching updated stock data...")
             live_stocks = live_data_manager.fetch_top_stocks()
             
             if live_stocks:
-
-                for stock_data in live_stocks:
-                    existing_stock = storage.get_stock(stock_data['symbol'])
-                    if existing_stock:
-                        existing_stock.update_price(stock_data['price'])
+                # Only symbols whose price moved, applied as one tick (one change version);
+                # the fetch above ran without any lock, the write lock is held just for the apply
+                with storage.lock.read():
+                    symbols, prices = storage.diff_prices(
+                        [d['symbol'] for d in live_stocks],
+                        [d['price'] for d in live_stocks]
+                    )
+                if symbols:
+                    storage.update_many(symbols, prices)
+                market_store.maybe_snapshot() # compact once the log tail grows long
+                tick_archive.flush()
                 
                 last_update_time = datetime.now()
-                data_version += 1
-                print(f"Background refresh complete. Version: {data_version}")
+                print(f"Background refresh complete. {len(symbols)} changed, version: {change_tracker.version}")
         except Exception as e:
             print(f"Background refresh error: {e}")
 
-refresh_thread = threading.Thread(target=background_refresh, daemon=True)
-refresh_thread.start()
-
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -79,6 +133,7 @@ def login():
         
         if username == '1234' and password == 'rvce':
             session['logged_in'] = True
+            session['user'] = username
             return redirect(url_for('market'))
         else:
             return render_template('login.html', error="Invalid username or password")
@@ -115,6 +170,7 @@ def about():
 
 @app.route('/stock/<symbol>')
 @login_required
+@reads_market
 def stock_detail(symbol):
     stock = storage.get_stock(symbol.upper())
     if not stock:
@@ -123,6 +179,8 @@ def stock_detail(symbol):
 
 @app.route('/api/stocks', methods=['GET'])
 @login_required
+@reads_market
+@response_cache.cached
 def get_stocks():
 
     sort_key = request.args.get('sort', 'price')
@@ -132,51 +190,73 @@ def get_stocks():
     
     if sector_filter:
         stocks = storage.get_stocks_by_sector(sector_filter)
+        rows = storage.get_sector_rows(sector_filter)
     else:
         stocks = storage.get_all_stocks()
+        rows = None
     
     limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', 0, type=int)
+    cursor = request.args.get('cursor')
+    next_cursor = None
+    try:
+        fields = parse_fields(request.args.get('fields')) # no price_history unless asked for
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    if sort_key == 'score':
-        sorted_stocks = sorted(stocks, key=lambda s: ranking_manager.calculate_priority_score(s), reverse=not ascending)
+    if ',' not in sort_key and stock_indexes.covers(sort_key.lstrip('-'), sector_filter):
+        # Single key: read one page from the maintained sorted index, O(log n + k)
+        descending = ascending == sort_key.startswith('-')
+        try:
+            sorted_stocks, next_cursor, total = stock_indexes.query(
+                sort_key.lstrip('-'), descending, limit or None, offset, sector_filter, cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
     else:
-        sorted_stocks = sorter.hybrid_sort(stocks, sort_key, ascending)
-    
-
-    if limit:
-        sorted_stocks = sorted_stocks[:limit]
+        # Multi-key sort: ?sort=sector,-price  ('-' flips the requested order for that key)
+        sort_keys = []
+        for part in sort_key.split(','):
+            name = part.lstrip('-')
+            key = ranking_manager.calculate_priority_scores(rows) if name == 'score' else name
+            sort_keys.append((key, ascending != part.startswith('-')))
+        sorted_stocks = sorter.sort(stocks, sort_keys)
+        total = len(sorted_stocks)
+        sorted_stocks = sorted_stocks[offset:offset + limit] if limit else sorted_stocks[offset:]
     
 
-    response = []
-    for s in sorted_stocks:
-        s_dict = asdict(s)
-        if sort_key == 'score':
+    response = project(storage, sorted_stocks, fields)
+    if 'score' in sort_key:
+        for s_dict, s in zip(response, sorted_stocks):
             s_dict['score'] = ranking_manager.calculate_priority_score(s)
-        response.append(s_dict)
 
-    return jsonify(response)
+    resp = json_response(response)
+    resp.headers['X-Total-Count'] = str(total)
+    if next_cursor:
+        resp.headers['X-Next-Cursor'] = next_cursor
+    return resp
 
 @app.route('/api/stocks', methods=['POST'])
 @login_required
 def add_stock():
     data = request.json
     try:
-        existing = storage.get_stock(data['symbol'])
-        if existing:
-            if 'price' in data:
-                existing.update_price(float(data['price']))
-                return jsonify({"message": "Stock updated", "stock": asdict(existing)})
-        
-        new_stock = Stock(
-            symbol=data['symbol'],
-            name=data['name'],
-            sector=data['sector'],
-            price=float(data['price']),
-            volume=int(data['volume']),
-            volatility=float(data['volatility'])
-        )
-        storage.add_stock(new_stock)
-        return jsonify({"message": "Stock created", "stock": asdict(new_stock)})
+        with storage.lock.write(): # check-then-add as one step
+            existing = storage.get_stock(data['symbol'])
+            if existing:
+                if 'price' in data:
+                    existing.update_price(float(data['price']))
+                    return jsonify({"message": "Stock updated", "stock": project(storage, [existing], STOCK_FIELDS)[0]})
+            
+            new_stock = Stock(
+                symbol=data['symbol'],
+                name=data['name'],
+                sector=data['sector'],
+                price=float(data['price']),
+                volume=int(data['volume']),
+                volatility=float(data['volatility'])
+            )
+            storage.add_stock(new_stock)
+            return jsonify({"message": "Stock created", "stock": project(storage, [new_stock], STOCK_FIELDS)[0]})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -186,13 +266,19 @@ def search():
     query = request.args.get('q', '')
     if not query:
         return jsonify([])
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    results = search_manager.composite_search(query)
+    # Ranked from the n-gram index: exact symbol > prefix > substring
+    with storage.lock.read():
+        results = project(storage, search_manager.ranked_search(query, request.args.get('limit', type=int)), fields)
     
 
     if not results:
         print(f"No local match for '{query}', trying live fetch...")
-        live_data = live_data_manager.fetch_stock_by_symbol(query)
+        live_data = live_data_manager.fetch_stock_by_symbol(query) # network call, outside any lock
         if live_data:
 
             new_stock = Stock(
@@ -204,83 +290,140 @@ def search():
                 volatility=live_data['volatility']
             )
             
-            new_stock.price_history = []
-            current = new_stock.price
-            for _ in range(10):
-                prev = current / (1 + random.uniform(-0.02, 0.02))
-                new_stock.price_history.insert(0, prev)
-                current = prev
-            new_stock.price_history.append(new_stock.price)
+            new_stock.price_history = backfill_history(new_stock.price)
             
-            storage.add_stock(new_stock)
-            
-            results.append(new_stock)
+            with storage.lock.write():
+                if not storage.add_stock(new_stock): # another request added it meanwhile
+                    new_stock = storage.get_stock(new_stock.symbol)
+                results = project(storage, [new_stock], fields)
             
-    return jsonify([asdict(s) for s in results])
+    return json_response(results)
 
 @app.route('/api/top-k')
 @login_required
+@reads_market
+@response_cache.cached
 def get_top_k():
     k = int(request.args.get('k', 5))
     criteria = request.args.get('type', 'price')
     sector = request.args.get('sector', '')
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     if sector:
         results = ranking_manager.get_top_k_stocks_by_sector(sector, k, criteria)
     else:
         results = ranking_manager.get_top_k_stocks(k, criteria)
         
-    response = []
-    for s in results:
-        s_dict = asdict(s)
-        if criteria == 'score':
+    response = project(storage, results, fields)
+    if criteria == 'score':
+        for s_dict, s in zip(response, results):
             s_dict['score'] = ranking_manager.calculate_priority_score(s)
-        response.append(s_dict)
         
-    return jsonify(response)
+    return json_response(response)
 
 @app.route('/api/sentiment')
 @login_required
+@reads_market
+@response_cache.cached
 def get_sentiment():
-    stocks = storage.get_all_stocks()
-    counts = trend_analyzer.calculate_market_sentiment(stocks)
+    counts = trend_engine.get_sentiment()
     return jsonify(counts)
 
+@app.route('/api/indicators')
+@login_required
+@reads_market
+def get_indicators():
+    # SMA/EMA/RSI/MACD/Bollinger/volatility/returns for every symbol in one vectorized pass
+    sector = request.args.get('sector', '')
+    rows = storage.get_sector_rows(sector) if sector else None
+    return jsonify(indicator_analyzer.calculate_for_storage(storage, rows))
+
 @app.route('/api/sectors')
 @login_required
+@reads_market
+@response_cache.cached
 def get_sectors():
     stats = sector_analyzer.calculate_sector_stats()
     return jsonify(stats)
 
 
+@app.route('/api/changes')
+@login_required
+@reads_market
+def get_changes():
+    # Delta poll: only symbols stamped after the client's version
+    since = request.args.get('since', 0, type=int)
+    return jsonify(change_tracker.changes_since(since))
+
+@app.route('/api/stream')
+@login_required
+def stream():
+    # One long-lived SSE connection per client instead of polling every endpoint
+    return Response(broadcaster.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/cache-stats')
+@login_required
+def get_cache_stats():
+    return jsonify(response_cache.stats())
+
 @app.route('/api/last-update')
 @login_required
 def get_last_update():
     return jsonify({
         "last_update": last_update_time.isoformat(),
-        "version": data_version,
+        "version": change_tracker.version,
         "timestamp": last_update_time.strftime("%I:%M:%S %p")
     })
 
 @app.route('/api/trend/<symbol>')
 @login_required
+@reads_market
 def get_trend(symbol):
     stock = storage.get_stock(symbol)
     if not stock:
         return jsonify({"error": "Stock not found"}), 404
         
-    trend = trend_analyzer.analyze_trend(stock.price_history)
-    sma = trend_analyzer.calculate_moving_average(stock.price_history)
-    return jsonify({
+    trend = trend_engine.get_trend(symbol)
+    sma = trend_engine.get_sma(symbol)
+    result = {
         "symbol": symbol,
         "trend": trend,
         "sma": sma,
-        "history": stock.price_history,
+        "history": list(stock.price_history),
         "priority_score": ranking_manager.calculate_priority_score(stock)
-    })
+    }
+
+    # Bar chart: ?interval=1m|5m|15m|1h|1d. Recent bars come from the live builder; an explicit
+    # &start=&end= range (epoch seconds) is served from the tick archive. Trend and SMA then follow the bar closes.
+    interval = request.args.get('interval')
+    if interval:
+        start, end = request.args.get('start', type=float), request.args.get('end', type=float)
+        try:
+            if start is None and end is None:
+                bars = bar_builder.get_bars(symbol, interval, request.args.get('limit', type=int))
+            else:
+                bars = tick_archive.get_ohlc(symbol, interval, start, end)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        result["bars"] = bars
+        if bars:
+            closes = [bar["close"] for bar in bars]
+            result["trend"] = trend_engine.analyze_trend(closes)
+            result["sma"] = trend_engine.calculate_moving_average(closes)
+    return jsonify(result)
 
 # --- Portfolio Routes ---
 
+def user_portfolio(account=None, create=False):
+    # The signed-in user's portfolio for ?account= (default 'main'); reads never create one
+    user = session.get('user', DEFAULT_USER)
+    account = account or request.args.get('account') or DEFAULT_ACCOUNT
+    return portfolio_book.portfolio(user, account) if create else portfolio_book.get(user, account)
+
 @app.route('/portfolio')
 @login_required
 def portfolio():
@@ -292,11 +435,13 @@ def add_portfolio_item():
     data = request.json
     try:
         # Check if stock exists in main storage, if not, try fetching it live
-        stock = storage.get_stock(data['symbol'].upper())
+        with storage.lock.read():
+            stock = storage.get_stock(data['symbol'].upper())
+        new_stock = None
         if not stock:
             from live_data import LiveDataManager
             dm = LiveDataManager()
-            live_data = dm.fetch_stock_by_symbol(data['symbol'])
+            live_data = dm.fetch_stock_by_symbol(data['symbol']) # network call, outside any lock
             if live_data:
                 # Add it to main storage first
                 from models import Stock
@@ -308,16 +453,18 @@ def add_portfolio_item():
                     live_data['volume'],
                     live_data['volatility']
                 )
-                storage.add_stock(new_stock)
             else:
                 return jsonify({"error": "Stock symbol not found in market"}), 400
 
-        success = portfolio_manager.add_stock(
-            data['symbol'],
-            int(data['quantity']),
-            float(data['buy_price']),
-            data['platform']
-        )
+        with storage.lock.write():
+            if new_stock is not None:
+                storage.add_stock(new_stock) # no-op if another request added it meanwhile
+            success = user_portfolio(data.get('account'), create=True).add_stock(
+                data['symbol'],
+                float(data['quantity']),
+                float(data['buy_price']),
+                data['platform']
+            )
         if success:
             return jsonify({"message": "Stock added to portfolio"})
         else:
@@ -325,45 +472,136 @@ def add_portfolio_item():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/api/portfolio/sell', methods=['POST'])
+@login_required
+def sell_portfolio_item():
+    data = request.json
+    try:
+        with storage.lock.write():
+            portfolio_manager = user_portfolio(data.get('account'), create=True)
+            price = data.get('price')
+            if price is None: # sell at the market
+                stock = storage.get_stock(data['symbol'].upper())
+                if not stock:
+                    return jsonify({"error": "Stock symbol not found in market"}), 400
+                price = stock.price
+            realized = portfolio_manager.sell_stock(data['symbol'], float(data['quantity']), float(price),
+                                                    data.get('platform'))
+        return jsonify({"message": "Stock sold", "realized_pl": realized})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/portfolio/cost-basis', methods=['POST'])
+@login_required
+def set_portfolio_cost_basis():
+    data = request.json
+    try:
+        with storage.lock.write():
+            user_portfolio(data.get('account'), create=True).set_cost_basis(data['method'])
+        return jsonify({"message": f"Cost basis set to {data['method']}"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/portfolio/risk')
+@login_required
+@reads_market
+def get_portfolio_risk():
+    confidence = request.args.get('confidence', 0.95, type=float)
+    if not 0.5 <= confidence < 1:
+        return jsonify({"error": "confidence must be in [0.5, 1)"}), 400
+    return jsonify(user_portfolio().get_risk_report(confidence) or {})
+
+@app.route('/api/portfolio/simulate')
+@login_required
+def simulate_portfolio():
+    horizon = request.args.get('horizon', 30, type=int) # ticks ahead
+    paths = request.args.get('paths', 10_000, type=int)
+    if not (1 <= horizon <= 250 and 1 <= paths <= 200_000):
+        return jsonify({"error": "horizon must be 1-250 and paths 1-200000"}), 400
+    if paths * (horizon + 1) > MAX_PATH_VALUES: # the bands hold every path's values: ~20 MB at most
+        return jsonify({"error": f"paths x (horizon + 1) must be at most {MAX_PATH_VALUES:,}"}), 400
+    method = request.args.get('method', 'gbm')
+    if method not in SIMULATION_METHODS:
+        return jsonify({"error": f"method must be one of {list(SIMULATION_METHODS)}"}), 400
+    # Copy the inputs under the read lock; the simulation itself runs without blocking ticks
+    with storage.lock.read():
+        inputs = user_portfolio().simulation_inputs()
+    if inputs is None:
+        return jsonify({})
+    symbols, values, returns = inputs
+    # Small runs are cheaper inline than shipped to the process pool
+    workers = SIMULATION_WORKERS if paths * horizon * len(values) >= 1 << 22 else 1
+    try:
+        result = simulate(values, returns, horizon, paths, method, request.args.get('seed', 0, type=int), workers)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result['symbols'] = symbols
+    return jsonify(result)
+
+@app.route('/api/portfolio/ledger/<symbol>')
+@login_required
+@reads_market
+def get_portfolio_ledger(symbol):
+    upto = request.args.get('upto', type=int) # position as of the first `upto` transactions
+    ledger = user_portfolio().get_ledger(symbol, upto)
+    if ledger is None:
+        return jsonify({"error": "No such holding"}), 404
+    return jsonify(ledger)
+
 @app.route('/api/portfolio/stats')
 @login_required
+@reads_market
 def get_portfolio_stats():
+    portfolio_manager = user_portfolio()
     stats = portfolio_manager.get_portfolio_stats()
     stats['health_score'] = portfolio_manager.calculate_portfolio_health_score()
     return jsonify(stats)
 
 @app.route('/api/portfolio/holdings')
 @login_required
+@reads_market
 def get_portfolio_holdings():
     sort_key = request.args.get('sort', 'profit')
     ascending = request.args.get('order', 'desc') == 'asc'
-    return jsonify(portfolio_manager.get_all_holdings_sorted(sort_key, ascending))
+    return jsonify(user_portfolio().get_all_holdings_sorted(sort_key, ascending))
 
 @app.route('/api/portfolio/top-k')
 @login_required
+@reads_market
 def get_portfolio_top_k():
     k = int(request.args.get('k', 3))
     criteria = request.args.get('type', 'profit')
-    return jsonify(portfolio_manager.get_top_k_holdings(k, criteria))
+    return jsonify(user_portfolio().get_top_k_holdings(k, criteria))
 
 @app.route('/api/portfolio/distribution')
 @login_required
+@reads_market
 def get_portfolio_distribution():
-    return jsonify(portfolio_manager.get_platform_distribution())
+    return jsonify(user_portfolio().get_platform_distribution())
 
 @app.route('/api/portfolio/scatter')
 @login_required
+@reads_market
 def get_portfolio_scatter():
-    return jsonify(portfolio_manager.get_risk_vs_profit_data())
+    return jsonify(user_portfolio().get_risk_vs_profit_data())
+
+@app.route('/api/portfolio/accounts')
+@login_required
+@reads_market
+def get_portfolio_accounts():
+    return jsonify(portfolio_book.accounts.get(session.get('user', DEFAULT_USER), []))
 
 @app.route('/api/portfolio/sectors')
 @login_required
+@reads_market
 def get_portfolio_sectors():
-    return jsonify(portfolio_manager.get_sector_distribution())
+    return jsonify(user_portfolio().get_sector_distribution())
 
 
 if __name__ == '__main__':
+    # The debug reloader runs this file twice: a watcher, and the serving process it restarts
     if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        create_app()
         print("\n" + "="*60)
         print("  🚀 STOCK MARKET ANALYZER DASHBOARD IS LIVE!")
         print("  🔗 Open your dashboard at: http://localhost:5001")
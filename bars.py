@@ -0,0 +1,133 @@
+import time
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import Stock
+from storage import StockStorage, StorageListener
+from tick_archive import INTERVALS
+
+# Layout of a row's open-bar column: bucket index + 1 (0 = no open bar yet), then OHLCV.
+_BUCKET, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME = range(6)
+
+
+class BarBuilder(StorageListener):
+    """
+    Streaming OHLCV bars at every resolution in INTERVALS, built from price ticks.
+    Each symbol's open bar lives in a storage column per resolution, so a tick updates
+    all of its rows with a few vectorized ops. When a tick lands in a new bucket the open
+    bar is finalized onto a per-symbol deque holding at most `max_bars` bars.
+    Bar volume is traded volume: the increase in the quote's session volume, with a drop
+    read as a new session.
+    Buckets are UTC-aligned; a bucket without ticks produces no bar.
+    Time Complexity: O(k * R) per k-symbol tick over R resolutions; each bar is finalized
+    once, in O(1). Memory is O(N * R * max_bars).
+    """
+
+    def __init__(self, storage: StockStorage, resolutions=tuple(INTERVALS), max_bars: int = 500, clock=time.time):
+        unknown = set(resolutions) - set(INTERVALS)
+        if unknown:
+            raise ValueError(f"Unknown resolutions {sorted(unknown)}")
+        if 'bar_last_volume' in storage._column_arrays():
+            raise ValueError("storage already has a BarBuilder")  # it would share the open-bar columns
+        self.storage = storage
+        self.resolutions = list(resolutions)
+        self.max_bars = max_bars
+        self.clock = clock
+        self.closed: Dict[Tuple[str, str], deque] = {}  # (symbol, resolution) -> finalized bars, made on first use
+
+        for resolution in self.resolutions:
+            storage.register_column(self._column(resolution), np.float64, (6,))
+        storage.register_column('bar_last_volume', np.int64)
+
+        rows = np.arange(len(storage.stocks_list))
+        storage.bar_last_volume[rows] = storage.volumes[rows]  # the first observation trades nothing
+        if len(rows):
+            self._observe(rows, clock())
+        storage.add_listener(self)
+
+    # --- Reads ---
+
+    def get_bars(self, symbol: str, resolution: str, limit: Optional[int] = None,
+                 include_open: bool = True) -> List[Dict]:
+        """Bars oldest -> newest, the last `limit` of them; the open bar last unless excluded."""
+        if resolution not in self.resolutions:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {self.resolutions}")
+        row = self.storage.get_row(symbol)
+        if row is None:
+            return []
+        width = INTERVALS[resolution]
+        closed = self.closed.get((symbol, resolution), ())
+        bars = [self._bar(bar, width) for bar in islice(closed, max(0, len(closed) - limit) if limit else 0, None)]
+        current = getattr(self.storage, self._column(resolution))[row].tolist()
+        if include_open and current[_BUCKET]:
+            bars.append(self._bar(current, width))
+        return bars[-limit:] if limit else bars
+
+    def get_closes(self, symbol: str, resolution: str, limit: Optional[int] = None) -> List[float]:
+        return [bar["close"] for bar in self.get_bars(symbol, resolution, limit)]
+
+    @staticmethod
+    def _bar(values, width: int) -> Dict:
+        return {"time": int(values[_BUCKET] - 1) * width, "open": values[_OPEN], "high": values[_HIGH],
+                "low": values[_LOW], "close": values[_CLOSE], "volume": int(values[_VOLUME])}
+
+    @staticmethod
+    def _column(resolution: str) -> str:
+        return f'bar_{resolution}'
+
+    # --- Updates ---
+
+    def _observe(self, rows: np.ndarray, now: float):
+        storage = self.storage
+        prices = storage.prices[rows]
+        volumes = storage.volumes[rows]
+        last_volumes = storage.bar_last_volume[rows]
+        traded = np.where(volumes >= last_volumes, volumes - last_volumes, volumes).astype(np.float64)
+        storage.bar_last_volume[rows] = volumes
+
+        symbols = None
+        for resolution in self.resolutions:
+            width = INTERVALS[resolution]
+            column = getattr(storage, self._column(resolution))
+            bucket = now // width + 1
+            bars = column[rows]
+
+            rolled = bars[:, _BUCKET] != bucket
+            finalized = rolled & (bars[:, _BUCKET] > 0)
+            if finalized.any():
+                if symbols is None:
+                    stocks_list = storage.stocks_list
+                    symbols = [stocks_list[row].symbol for row in rows.tolist()]
+                for i, bar in zip(np.flatnonzero(finalized).tolist(), bars[finalized].tolist()):
+                    key = (symbols[i], resolution)
+                    closed = self.closed.get(key)
+                    if closed is None:
+                        closed = self.closed[key] = deque(maxlen=self.max_bars)
+                    closed.append(tuple(bar))
+
+            same = ~rolled
+            bars[same, _HIGH] = np.maximum(bars[same, _HIGH], prices[same])
+            bars[same, _LOW] = np.minimum(bars[same, _LOW], prices[same])
+            bars[same, _VOLUME] += traded[same]
+            bars[rolled, _BUCKET] = bucket
+            bars[rolled, _OPEN] = bars[rolled, _HIGH] = bars[rolled, _LOW] = prices[rolled]
+            bars[rolled, _VOLUME] = traded[rolled]
+            bars[:, _CLOSE] = prices
+            column[rows] = bars
+
+    # --- Storage events ---
+
+    def on_stock_added(self, stock: Stock):
+        row = np.array([stock._row], dtype=np.intp)
+        self.storage.bar_last_volume[row] = stock.volume  # the first observation trades nothing
+        self._observe(row, self.clock())
+
+    def on_stock_removed(self, stock: Stock):
+        for resolution in self.resolutions:
+            self.closed.pop((stock.symbol, resolution), None)
+
+    def on_prices_updated(self, rows, old_prices):
+        self._observe(rows, self.clock())
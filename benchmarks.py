@@ -0,0 +1,743 @@
+"""
+Micro-benchmarks for the storage and analytics layers.
+Run all:  python3 benchmarks.py
+Run one:  python3 benchmarks.py delete
+"""
+import gc
+import heapq
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import asdict
+
+import numpy as np
+from flask import Flask, jsonify
+
+from models import Stock, HISTORY_LENGTH
+from storage import StockStorage
+from trend_analysis import TrendAnalyzer, TrendEngine
+from indicators import IndicatorAnalyzer
+from sorting import StockSorter
+from sorted_index import StockIndexes
+from ranking import RankingManager
+from search import SearchManager
+from live_data import LiveDataManager, FakeQuoteProvider
+from changes import ChangeTracker
+from streaming import StreamBroadcaster
+from persistence import MarketStore
+from portfolio_manager import PortfolioItem, PortfolioManager, PortfolioBook
+from ledger import Ledger, Position, COST_BASIS_METHODS
+from tick_archive import TickArchive, TICK_DTYPE
+from bars import BarBuilder
+from response_cache import ResponseCache
+import serialization
+import simulate
+from serialization import STOCK_FIELDS, LIST_FIELDS, project
+
+SECTORS = ['Tech', 'Finance', 'Health', 'Energy', 'Consumer', 'Industrial', 'Utilities', 'Materials']
+
+
+def make_universe(n: int, seed: int = 42, **storage_kwargs) -> StockStorage:
+    rng = random.Random(seed)
+    storage = StockStorage(capacity=n, **storage_kwargs)
+    for i in range(n):
+        storage.add_stock(Stock(
+            f"S{i:06d}",
+            f"Company {i}",
+            rng.choice(SECTORS),
+            round(rng.uniform(5, 2000), 2),
+            rng.randint(10000, 5000000),
+            round(rng.uniform(0.1, 0.9), 2)
+        ))
+    return storage
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_delete(sizes=(10_000, 50_000, 200_000), deletes=2_000, ordered_deletes=100):
+    print("\n--- delete_stock: cost per delete (random symbols) ---")
+    print(f"{'universe':>10} {'swap us/op':>12} {'ordered us/op':>15} {'delete_many(ordered) ms':>25}")
+    for n in sizes:
+        symbols = random.Random(n).sample([f"S{i:06d}" for i in range(n)], deletes)
+
+        storage = make_universe(n, preserve_order=False)
+        swap_time, _ = timed(lambda: [storage.delete_stock(s) for s in symbols])
+
+        # The ordered baseline is O(N) per delete, so it gets a smaller sample.
+        storage = make_universe(n)
+        ordered_time, _ = timed(lambda: [storage.delete_stock(s) for s in symbols[:ordered_deletes]])
+
+        storage = make_universe(n)
+        batch_time, _ = timed(storage.delete_many, symbols)
+
+        print(f"{n:>10} {swap_time / deletes * 1e6:>12.2f} "
+              f"{ordered_time / ordered_deletes * 1e6:>15.2f} {batch_time * 1e3:>25.2f}")
+
+
+def bench_history(n=50_000):
+    print(f"\n--- price history: deque per stock vs shared ring buffer ({n} symbols) ---")
+    rng = random.Random(1)
+
+    tracemalloc.start()
+    deques = [deque((rng.uniform(5, 2000) for _ in range(HISTORY_LENGTH)), maxlen=HISTORY_LENGTH) for _ in range(n)]
+    deque_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del deques
+
+    storage = make_universe(n)
+    ring_bytes = sum(getattr(storage, attr).nbytes for attr in ('history', 'history_head', 'history_len'))
+    ring_bytes = ring_bytes * n // len(storage.prices)
+    print(f"bytes/symbol  deque: {deque_bytes / n:8.0f}   ring buffer: {ring_bytes / n:8.0f}")
+
+    symbols = [s.symbol for s in storage.get_all_stocks()]
+    prices = [rng.uniform(5, 2000) for _ in range(n)]
+    loop_time, _ = timed(lambda: [storage.get_stock(sym).update_price(p) for sym, p in zip(symbols, prices)])
+    batch_time, _ = timed(storage.update_many, symbols, prices)
+    print(f"one market tick  update_price loop: {loop_time * 1e3:8.2f} ms   update_many: {batch_time * 1e3:8.2f} ms")
+
+    for _ in range(10):
+        storage.update_many(symbols, [p * rng.uniform(0.98, 1.02) for p in prices])
+    trend = TrendAnalyzer()
+    stocks = storage.get_all_stocks()
+    loop_time, _ = timed(trend.calculate_market_sentiment, stocks)
+    vector_time, _ = timed(trend.calculate_storage_sentiment, storage)
+    print(f"market sentiment  per-stock loop: {loop_time * 1e3:8.2f} ms   vectorized: {vector_time * 1e3:8.2f} ms")
+
+
+def _python_indicators(prices, analyzer: IndicatorAnalyzer) -> dict:
+    """Per-stock pure-Python reference for IndicatorAnalyzer (full-length histories only)."""
+    def ewm(values, alpha):
+        state = values[0]
+        for v in values[1:]:
+            state = alpha * v + (1 - alpha) * state
+        return state
+
+    fast, slow, signal_span = analyzer.macd_spans
+    a_fast, a_slow, a_signal = 2 / (fast + 1), 2 / (slow + 1), 2 / (signal_span + 1)
+    e_fast = e_slow = prices[0]
+    macd_line = []
+    for p in prices:
+        e_fast = a_fast * p + (1 - a_fast) * e_fast
+        e_slow = a_slow * p + (1 - a_slow) * e_slow
+        macd_line.append(e_fast - e_slow)
+
+    changes = [b - a for a, b in zip(prices, prices[1:])]
+    gain = ewm([max(c, 0.0) for c in changes], 1 / analyzer.rsi_period)
+    loss = ewm([max(-c, 0.0) for c in changes], 1 / analyzer.rsi_period)
+
+    band = prices[-analyzer.bollinger_window:]
+    mid = sum(band) / len(band)
+    std = (sum((p - mid) ** 2 for p in band) / len(band)) ** 0.5
+    rets = [math.log(b / a) for a, b in zip(prices[-analyzer.volatility_window - 1:], prices[-analyzer.volatility_window:])]
+    mean_ret = sum(rets) / len(rets)
+
+    return {
+        'sma': sum(prices[-analyzer.window_size:]) / analyzer.window_size,
+        'ema': ewm(prices, 2 / (analyzer.window_size + 1)),
+        'rsi': 100 - 100 / (1 + gain / loss) if loss > 0 else 100.0,
+        'macd': macd_line[-1],
+        'macd_signal': ewm(macd_line, a_signal),
+        'bb_upper': mid + analyzer.bollinger_k * std,
+        'bb_lower': mid - analyzer.bollinger_k * std,
+        'volatility': (sum((r - mean_ret) ** 2 for r in rets) / (len(rets) - 1)) ** 0.5,
+        'return_1': prices[-1] / prices[-2] - 1,
+        'return_window': prices[-1] / prices[0] - 1,
+    }
+
+
+def bench_indicators(n=10_000, points=1_000):
+    print(f"\n--- technical indicators: {n} symbols x {points} points ---")
+    rng = np.random.default_rng(5)
+    matrix = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(n, points)), axis=1))
+    analyzer = IndicatorAnalyzer()
+
+    vector_time, results = timed(analyzer.calculate_matrix, matrix)
+    histories = matrix.tolist()
+    loop_time, reference = timed(lambda: [_python_indicators(h, analyzer) for h in histories])
+
+    worst = max(abs(reference[i][k] - results[k][i]) / max(abs(reference[i][k]), 1e-12)
+                for i in range(0, n, max(n // 100, 1)) for k in reference[0])
+    print(f"per-stock Python loop: {loop_time:8.2f} s   vectorized: {vector_time:8.3f} s   "
+          f"speedup: {loop_time / vector_time:6.1f}x   max rel diff: {worst:.1e}")
+
+
+def bench_sort(sizes=(10_000, 100_000)):
+    print("\n--- /api/stocks sort: legacy hybrid vs key-extracted engines ---")
+    print(f"{'universe':>10} {'key':>16} {'hybrid ms':>11} {'timsort ms':>11} {'numpy ms':>11}")
+    for n in sizes:
+        stocks = make_universe(n).get_all_stocks()
+        for label, keys in (('price desc', [('price', False)]), ('name', [('name', True)]),
+                            ('sector,-price', [('sector', True), ('price', False)])):
+            row = [f"{n:>10} {label:>16}"]
+            for engine in ('hybrid', 'timsort', 'numpy'):
+                if engine == 'hybrid' and len(keys) > 1:
+                    row.append(f"{'n/a':>11}")
+                    continue
+                sorter = StockSorter(threshold=20, engine=engine)
+                elapsed, _ = timed(sorter.sort, stocks, keys)
+                row.append(f"{elapsed * 1e3:>11.1f}")
+            print(" ".join(row))
+
+
+def bench_pagination(n=100_000, limit=50, requests=200):
+    print(f"\n--- /api/stocks page of {limit}: full sort vs maintained index ({n} symbols) ---")
+    storage = make_universe(n)
+    build_time, indexes = timed(StockIndexes, storage)
+    sorter = StockSorter()
+    stocks = storage.get_all_stocks()
+    offsets = [random.Random(i).randrange(0, n - limit) for i in range(requests)]
+
+    sort_time, _ = timed(lambda: [sorter.sort(stocks, [('price', False)])[o:o + limit] for o in offsets[:10]])
+    page_time, _ = timed(lambda: [indexes.query('price', True, limit, o) for o in offsets])
+    print(f"index build: {build_time:6.2f} s   per request  sort+slice: {sort_time / 10 * 1e3:8.2f} ms   "
+          f"index page: {page_time / requests * 1e3:6.3f} ms")
+
+    symbols = [s.symbol for s in stocks]
+    prices = [p * 1.01 for p in storage.column('price').tolist()]
+    tick_time, _ = timed(storage.update_many, symbols, prices)
+    print(f"index maintenance for a full {n}-symbol tick: {tick_time:6.2f} s "
+          f"({tick_time / n * 1e6:.1f} us/symbol)")
+
+
+def bench_topk(n=100_000, k=5, requests=200):
+    print(f"\n--- /api/top-k (k={k}): heapq.nlargest vs live leaderboard ({n} symbols) ---")
+    storage = make_universe(n)
+    stocks = storage.get_all_stocks()
+    live = RankingManager(storage, StockIndexes(storage))
+    for criteria, key in (('price', lambda s: s.price), ('score', live.calculate_priority_score)):
+        heap_time, expected = timed(lambda: [heapq.nlargest(k, stocks, key=key) for _ in range(5)])
+        board_time, got = timed(lambda: [live.get_top_k_stocks(k, criteria) for _ in range(requests)])
+        assert got[0] == expected[0]
+        print(f"{criteria:>6}  nlargest: {heap_time / 5 * 1e3:8.2f} ms   leaderboard: {board_time / requests * 1e3:6.3f} ms")
+
+
+def bench_search(n=100_000, requests=200):
+    print(f"\n--- composite search per keystroke: linear scan vs trigram index ({n} symbols) ---")
+    storage = make_universe(n)
+    linear = SearchManager(storage, use_index=False)
+    build_time, indexed = timed(SearchManager, storage)
+    print(f"index build: {build_time:6.2f} s")
+    print(f"{'query':>14} {'matches':>8} {'linear ms':>10} {'index ms':>10} {'ranked(10) ms':>14}")
+    for query in ('s04217', 'company 9876', '12345', 'S0999', 'utili', 'c'):
+        linear_time, expected = timed(lambda: [linear.composite_search(query) for _ in range(5)])
+        index_time, got = timed(lambda: [indexed.composite_search(query) for _ in range(requests)])
+        ranked_time, _ = timed(lambda: [indexed.ranked_search(query, 10) for _ in range(requests)])
+        assert got[0] == expected[0]
+        print(f"{query:>14} {len(got[0]):>8} {linear_time / 5 * 1e3:10.2f} {index_time / requests * 1e3:10.3f} "
+              f"{ranked_time / requests * 1e3:14.3f}")
+
+
+def bench_fetch(symbols=200, latency=0.02, jitter=0.02):
+    print(f"\n--- refresh of {symbols} symbols, fake provider at {latency * 1e3:.0f}-{(latency + jitter) * 1e3:.0f} ms/call ---")
+    watchlist = [f"S{i:04d}" for i in range(symbols)]
+    for workers in (1, 16, 64, symbols):
+        manager = LiveDataManager(FakeQuoteProvider(latency, jitter), max_workers=workers)
+        elapsed, infos = timed(manager.fetch_infos, watchlist)
+        assert len(infos) == symbols
+        print(f"workers {workers:>4}: {elapsed * 1e3:8.1f} ms")
+
+
+def bench_stream(clients=500, slow_clients=50, n=2_000, ticks=100, movers=50):
+    print(f"\n--- SSE fan-out: {clients} clients ({slow_clients} never read), {ticks} ticks of {movers} symbols ---")
+    storage = make_universe(n)
+    broadcaster = StreamBroadcaster(storage, TrendEngine(storage), ChangeTracker(storage), heartbeat=0.5)
+    received = [0] * clients
+
+    def consume(i):
+        for chunk in broadcaster.stream():
+            received[i] += chunk.count("event: tick")
+            if received[i] >= ticks:
+                return
+
+    streams = [broadcaster.stream() for _ in range(slow_clients)]
+    for stream in streams:
+        next(stream)  # subscribed, never drained
+    readers = [threading.Thread(target=consume, args=(i,)) for i in range(clients - slow_clients)]
+    for reader in readers:
+        reader.start()
+    while broadcaster.stats()["clients"] < clients:
+        time.sleep(0.01)
+
+    rng = random.Random(1)
+    symbols = [s.symbol for s in storage.get_all_stocks()]
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(ticks):
+        batch = rng.sample(symbols, movers)
+        storage.update_many(batch, [storage.get_stock(s).price * rng.uniform(0.99, 1.01) for s in batch])
+        time.sleep(0.005)
+    for reader in readers:
+        reader.join()
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    stats = broadcaster.stats()
+    print(f"stream: {cpu * 1e3:8.1f} ms CPU over {wall * 1e3:.0f} ms wall for {ticks} ticks "
+          f"({cpu / ticks * 1e3:.2f} ms CPU per tick to all clients, {stats['dropped']} frames dropped "
+          f"for slow clients, {stats['clients']} still connected)")
+
+    # The polling alternative: every client refetches the stock list once per interval.
+    sample = 20
+    stocks = storage.get_all_stocks()
+    cpu_start = time.process_time()
+    for _ in range(sample):
+        json.dumps([asdict(s) for s in stocks])
+    poll_cpu = (time.process_time() - cpu_start) / sample * clients
+    print(f"polling: {poll_cpu * 1e3:8.1f} ms CPU per interval to serve /api/stocks to {clients} clients")
+    for stream in streams:
+        stream.close()
+
+
+def bench_locking(n=10_000, readers=4, duration=2.0, tick_interval=0.05, movers=500):
+    print(f"\n--- Read latency under the storage lock: {readers} readers, a {movers}-symbol tick every {tick_interval * 1e3:.0f} ms ---")
+    storage = make_universe(n)
+    indexes = StockIndexes(storage)
+    TrendEngine(storage)
+    symbols = [s.symbol for s in storage.get_all_stocks()]
+
+    def run(with_writer, long_reader=False):
+        stop = threading.Event()
+        latencies = [[] for _ in range(readers)]
+
+        def slow_reader():
+            # A 200 ms read overlapping the others; it sleeps, so this measures the lock, not the GIL
+            while not stop.is_set():
+                with storage.lock.read():
+                    time.sleep(0.2)
+
+        def reader(out):
+            while not stop.is_set():
+                start = time.perf_counter()
+                with storage.lock.read():
+                    [asdict(s) for s in indexes.query('price', descending=True, limit=50)[0]]
+                out.append(time.perf_counter() - start)
+
+        def writer():
+            rng = random.Random(1)
+            while not stop.wait(tick_interval):
+                batch = rng.sample(symbols, movers)
+                storage.update_many(batch, [storage.get_stock(s).price * rng.uniform(0.99, 1.01) for s in batch])
+
+        threads = [threading.Thread(target=reader, args=(out,)) for out in latencies]
+        if with_writer:
+            threads.append(threading.Thread(target=writer))
+        if long_reader:
+            threads.append(threading.Thread(target=slow_reader))
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads:
+            t.join()
+        samples = np.array([x for out in latencies for x in out]) * 1e3
+        label = ("with writer" if with_writer else "readers only") + (" + 200 ms read" if long_reader else "")
+        print(f"{label:>25}: {len(samples) / duration:8.0f} reads/s, "
+              f"p50 {np.percentile(samples, 50):.3f} ms, p99 {np.percentile(samples, 99):.3f} ms, "
+              f"max {samples.max():.2f} ms")
+
+    run(False)
+    run(True)
+    run(True, long_reader=True)
+
+
+def bench_warm_start(n=100_000, ticks=200, movers=500):
+    print(f"\n--- Warm start: {n} symbols x {HISTORY_LENGTH} history points, log tail of {ticks} ticks ---")
+    storage = make_universe(n)
+    rng = np.random.default_rng(5)
+    storage.history[:n] = rng.uniform(5, 2000, (n, HISTORY_LENGTH))
+    storage.history_len[:n] = HISTORY_LENGTH
+    path = tempfile.mkdtemp()
+    try:
+        store = MarketStore(path)
+        snapshot_time, _ = timed(store.attach, storage)
+        symbols = [s.symbol for s in storage.get_all_stocks()]
+        pick = random.Random(5)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            batch = pick.sample(symbols, movers)
+            storage.update_many(batch, [pick.uniform(5, 2000) for _ in batch])
+        tick_time = (time.perf_counter() - start) / ticks
+        store.close()
+
+        restored = StockStorage()
+        load_time, _ = timed(MarketStore(path).load, restored)
+        assert np.array_equal(restored.history[:n], storage.history[:n])
+        cold_time, _ = timed(make_universe, n)
+        print(f"snapshot write: {snapshot_time * 1e3:8.1f} ms")
+        print(f"tick + log:     {tick_time * 1e3:8.3f} ms per {movers}-symbol tick")
+        print(f"warm start:     {load_time * 1e3:8.1f} ms (mmap snapshot + replay {ticks} ticks)")
+        print(f"cold rebuild:   {cold_time * 1e3:8.1f} ms via add_stock, before any network refresh")
+    finally:
+        shutil.rmtree(path)
+
+
+def bench_archive(ticks=5_000_000, chunk=1 << 18):
+    print(f"\n--- Tick archive: one symbol, {ticks:,} ticks ({ticks * TICK_DTYPE.itemsize / 1e6:.0f} MB on disk) ---")
+    path = tempfile.mkdtemp()
+    try:
+        archive = TickArchive(path)
+        rng = np.random.default_rng(3)
+        records = np.empty(ticks, dtype=TICK_DTYPE)
+        records['ts'] = 1.7e9 + np.cumsum(rng.uniform(0.5, 1.5, ticks))  # ~1 tick per second
+        records['price'] = 100 * np.exp(np.cumsum(rng.normal(0, 1e-4, ticks)))
+        records['volume'] = rng.integers(1e4, 1e6, ticks)
+        records.tofile(archive._file("AAA"))
+        last_ts = float(records['ts'][-1])
+        del records
+
+        def peak(fn, *args, **kwargs):
+            tracemalloc.start()
+            elapsed, result = timed(fn, *args, **kwargs)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return elapsed, peak_bytes, result
+
+        def load_everything():
+            return np.fromfile(archive._file("AAA"), dtype=TICK_DTYPE)
+
+        for label, fn, args, kwargs in [
+            ("last hour, raw ticks", archive.get_history, ("AAA", last_ts - 3600), {}),
+            ("last day, 5m bars", archive.get_ohlc, ("AAA", "5m", last_ts - 86400), {}),
+            ("all time, 1d bars", archive.get_ohlc, ("AAA", "1d"), {"chunk": chunk}),
+            ("load whole file", load_everything, (), {}),
+        ]:
+            elapsed, peak_bytes, result = peak(fn, *args, **kwargs)
+            print(f"{label:>22}: {elapsed * 1e3:8.1f} ms, peak {peak_bytes / 1e6:7.1f} MB, {len(result):,} rows")
+    finally:
+        shutil.rmtree(path)
+
+    n, movers, rounds = 5_000, 500, 200
+    print(f"\n--- Tick archive: write lock held per tick, {movers} of {n:,} symbols moving ---")
+    path = tempfile.mkdtemp()
+    try:
+        storage = make_universe(n)
+        archive = TickArchive(path)
+        archive.attach(storage)
+        rng = np.random.default_rng(4)
+        symbols = [f"S{i:06d}" for i in range(n)]
+        held = []
+        for _ in range(rounds):
+            picked = [symbols[i] for i in rng.choice(n, movers, replace=False)]
+            elapsed, _ = timed(storage.update_many, picked, rng.uniform(5, 2000, movers).tolist())
+            held.append(elapsed)
+        archive.close()
+        print(f"update_many: mean {np.mean(held) * 1e3:6.2f} ms, worst {max(held) * 1e3:6.2f} ms")
+    finally:
+        shutil.rmtree(path)
+
+
+def bench_bars(n=10_000, ticks=600, movers=500):
+    print(f"\n--- OHLCV bars: {n} symbols, {ticks} ticks of {movers} symbols, one tick per second ---")
+    rng = random.Random(9)
+
+    def run(with_builder):
+        storage = make_universe(n)
+        now = [1.7e9]
+        builder = BarBuilder(storage, clock=lambda: now[0]) if with_builder else None
+        symbols = [s.symbol for s in storage.get_all_stocks()]
+        batches = [rng.sample(symbols, movers) for _ in range(ticks)]
+        start = time.perf_counter()
+        for batch in batches:
+            now[0] += 1
+            storage.update_many(batch, [rng.uniform(5, 2000) for _ in batch])
+        return (time.perf_counter() - start) / ticks, builder
+
+    base, _ = run(False)
+    with_bars, builder = run(True)
+    print(f"tick without bars: {base * 1e3:.3f} ms, with 5 resolutions: {with_bars * 1e3:.3f} ms "
+          f"(+{(with_bars - base) / movers * 1e6:.2f} us per symbol)")
+
+    # Payload and trend compute for one hour of one symbol: raw 1s ticks vs 1m bars.
+    raw = [{"ts": 1.7e9 + i, "price": 100 + math.sin(i / 300)} for i in range(3600)]
+    bars = builder.get_bars(builder.storage.stocks_list[0].symbol, "1m")
+    analyzer = TrendAnalyzer()
+    raw_time, _ = timed(analyzer.analyze_trend, [r["price"] for r in raw])
+    bar_time, _ = timed(analyzer.analyze_trend, [b["close"] for b in bars])
+    print(f"1 hour payload: raw ticks {len(json.dumps(raw)) / 1e3:.0f} KB vs 60 x 1m bars "
+          f"{len(json.dumps(bars[:1] * 60)) / 1e3:.1f} KB; trend over closes {bar_time * 1e6:.0f} us vs raw {raw_time * 1e6:.0f} us")
+
+
+def bench_response_cache(n=2_000, requests=200):
+    print(f"\n--- Response cache: GET of {n} stocks, {requests} requests between data changes ---")
+    storage = make_universe(n)
+    cache = ResponseCache(lambda: storage.write_version)
+    app = Flask(__name__)
+
+    def all_stocks():
+        return jsonify([asdict(s) for s in storage.get_all_stocks()])
+
+    app.add_url_rule('/raw', 'raw', all_stocks)
+    app.add_url_rule('/cached', 'cached', cache.cached(all_stocks))
+    client = app.test_client()
+    etag = client.get('/cached').headers['ETag']
+
+    for label, url, headers in [("uncached", '/raw', {}), ("cached 200", '/cached', {}),
+                                ("cached 304", '/cached', {'If-None-Match': etag})]:
+        elapsed, response = timed(lambda: [client.get(url, headers=headers) for _ in range(requests)][-1])
+        print(f"{label:>11}: {elapsed / requests * 1e3:7.3f} ms/request, {len(response.get_data()):>8,} bytes")
+    print(f"stats: {cache.stats()}")
+
+
+def bench_serialize(n=10_000, repeat=5):
+    print(f"\n--- Serializing {n} stocks ---")
+    storage = make_universe(n)
+    storage.history[:n] = np.random.default_rng(1).uniform(5, 2000, (n, HISTORY_LENGTH))
+    storage.history_len[:n] = HISTORY_LENGTH
+    stocks = storage.get_all_stocks()
+    app = Flask(__name__)
+
+    def legacy():
+        return jsonify([asdict(s) for s in stocks]).get_data()
+
+    def stdlib(fields):
+        fast, serialization.orjson = serialization.orjson, None
+        try:
+            return serialization.dumps(project(storage, stocks, fields))
+        finally:
+            serialization.orjson = fast
+
+    cases = [
+        ("asdict + jsonify (full)", legacy),
+        ("project + orjson (full)", lambda: serialization.dumps(project(storage, stocks, STOCK_FIELDS))),
+        ("project + json (list default)", lambda: stdlib(LIST_FIELDS)),
+        ("project + orjson (list default)", lambda: serialization.dumps(project(storage, stocks, LIST_FIELDS))),
+        ("project + orjson (symbol,price)", lambda: serialization.dumps(project(storage, stocks, ('symbol', 'price')))),
+    ]
+    with app.app_context():
+        for label, fn in cases:
+            best = min(timed(fn)[0] for _ in range(repeat))
+            print(f"{label:>32}: {best * 1e3:8.1f} ms, {len(fn()) / 1e6:6.2f} MB")
+
+
+def bench_memory(n=100_000):
+    print(f"\n--- Memory: bytes per object at {n:,} (tracemalloc, {HISTORY_LENGTH}-point histories) ---")
+    rng = random.Random(2)
+    prices = [[rng.uniform(5, 2000) for _ in range(HISTORY_LENGTH)] for _ in range(1000)]
+
+    def measure(build):
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del kept
+        return used / n
+
+    def loose_stocks():
+        stocks = []
+        for i in range(n):
+            # Sector strings built at runtime, like ones parsed from an API response.
+            stock = Stock(f"S{i:06d}", f"Company {i}", "".join(SECTORS[i % len(SECTORS)]), 100.0, 1000, 0.2)
+            stock.price_history = prices[i % 1000]
+            stocks.append(stock)
+        return stocks
+
+    def stored_stocks():
+        storage = StockStorage(capacity=n)
+        for stock in loose_stocks():
+            storage.add_stock(stock)
+        return storage
+
+    def holdings():
+        return [PortfolioItem(f"S{i:06d}", 10, 100.0, "Broker") for i in range(n)]
+
+    for label, build in [("Stock (not stored)", loose_stocks), ("Stock in StockStorage", stored_stocks),
+                         ("PortfolioItem", holdings)]:
+        print(f"{label:>22}: {measure(build):8.0f} bytes")
+
+
+def bench_portfolio(n=20_000, holdings=500, tick_size=500, ticks=200):
+    print(f"\n--- Portfolio: {holdings} holdings in {n:,} stocks, {tick_size}-symbol ticks ---")
+    storage = make_universe(n)
+    portfolio = PortfolioManager(storage)
+    rng = random.Random(4)
+    symbols = [s.symbol for s in storage.get_all_stocks()]
+    for i, symbol in enumerate(rng.sample(symbols, holdings)):
+        portfolio.add_stock(symbol, rng.randint(1, 100), rng.uniform(5, 2000), f"Broker{i % 4}")
+    batches = [(rng.sample(symbols, tick_size), [rng.uniform(5, 2000) for _ in range(tick_size)])
+               for _ in range(ticks)]
+
+    def stats_page():
+        stats = portfolio.get_portfolio_stats()
+        stats['health_score'] = portfolio.calculate_portfolio_health_score()
+        return stats, portfolio.get_sector_distribution()
+
+    def swept_page():
+        # Before: every read re-synced every holding (twice for /api/portfolio/stats).
+        portfolio.resync()
+        portfolio.resync()
+        portfolio.resync()
+        return stats_page()
+
+    elapsed, _ = timed(lambda: [storage.update_many(*batch) for batch in batches])
+    storage.remove_listener(portfolio)
+    bare, _ = timed(lambda: [storage.update_many(*batch) for batch in batches])
+    storage.add_listener(portfolio)
+    print(f"tick cost:         {(elapsed - bare) / ticks * 1e6:8.1f} us added per tick for incremental P/L")
+    for label, page in [("full sweep reads", swept_page), ("maintained reads", stats_page)]:
+        elapsed, _ = timed(lambda: [page() for _ in range(ticks)])
+        print(f"{label}:  {elapsed / ticks * 1e6:8.1f} us per stats + sectors request")
+
+
+def bench_portfolio_fanout(n=5_000, portfolios=10_000, holdings=50, tick_size=500, ticks=20):
+    print(f"\n--- Tick fan-out: {portfolios:,} portfolios x {holdings} holdings over {n:,} stocks, "
+          f"{tick_size}-symbol ticks ---")
+    rng = random.Random(5)
+    batches = [None] * ticks
+
+    def build(book: bool):
+        storage = make_universe(n)
+        symbols = [s.symbol for s in storage.get_all_stocks()]
+        owner = PortfolioBook(storage) if book else None
+        for p in range(portfolios):
+            manager = owner.portfolio(f"user{p // 3}", f"acct{p % 3}") if book else PortfolioManager(storage)
+            for symbol in rng.sample(symbols, holdings):
+                manager.add_stock(symbol, rng.randint(1, 100), rng.uniform(5, 2000), "Broker")
+        for i in range(ticks):
+            batches[i] = batches[i] or (rng.sample(symbols, tick_size), [rng.uniform(5, 2000) for _ in range(tick_size)])
+        return storage, owner
+
+    storage, book = build(True)
+    touched = sum(len(book.symbol_index.get(symbol, ())) for symbols, _ in batches for symbol in symbols)
+    elapsed, _ = timed(lambda: [storage.update_many(*batch) for batch in batches])
+    print(f"reverse index:          {elapsed / ticks * 1e3:8.2f} ms per tick "
+          f"({touched / ticks:,.0f} holdings refreshed, {elapsed / touched * 1e9:,.0f} ns each)")
+    managers = list(book.portfolios.values())
+    enabled, _ = timed(lambda: [manager.get_risk_report() for manager in managers])
+    elapsed, _ = timed(lambda: [storage.update_many(*batch) for batch in batches])
+    print(f"  + risk on every one:  {elapsed / ticks * 1e3:8.2f} ms per tick "
+          f"(models built in {enabled:.1f} s, then synced when read)")
+    elapsed, _ = timed(lambda: [manager.get_risk_report() for manager in managers[:500]])
+    print(f"  risk read after that: {elapsed / 500 * 1e3:8.2f} ms per portfolio (catching up on {ticks} ticks)")
+    del storage, book, managers
+    gc.collect()
+
+    storage, _ = build(False)
+    elapsed, _ = timed(lambda: [storage.update_many(*batch) for batch in batches])
+    print(f"listener per portfolio: {elapsed / ticks * 1e3:8.2f} ms per tick")
+
+
+def bench_ledger(transactions=200_000, queries=200):
+    print(f"\n--- Ledger: cost basis over {transactions:,} transactions, {queries} random as-of queries ---")
+    rng = random.Random(7)
+    ledger = Ledger()
+    for _ in range(transactions):
+        platform = rng.choice(("A", "B"))
+        held = ledger.open.get(platform, 0)
+        if held and rng.random() < 0.45:
+            ledger.sell(rng.randint(1, held), rng.uniform(50, 150), platform, ts=0)
+        else:
+            ledger.buy(rng.randint(1, 50), rng.uniform(50, 150), platform, ts=0)
+    points = [rng.randrange(transactions) for _ in range(queries)]
+
+    def full_replay(method, upto):
+        position = Position()
+        for txn in ledger.transactions[:upto]:
+            position.apply(txn, method)
+        return position
+
+    for method in COST_BASIS_METHODS:
+        first, _ = timed(ledger.position, method)
+        elapsed, _ = timed(lambda: [ledger.position(method, upto) for upto in points])
+        replay, _ = timed(lambda: [full_replay(method, upto) for upto in points[:5]])
+        print(f"{method:>8}: first full pass {first * 1e3:7.1f} ms, as-of query {elapsed / queries * 1e6:7.1f} us "
+              f"(checkpointed) vs {replay / 5 * 1e3:7.1f} ms (replay from 0)")
+
+
+def bench_risk(n=5_000, holdings=200, tick_size=500, ticks=200):
+    print(f"\n--- Risk: {holdings} holdings in {n:,} stocks, {HISTORY_LENGTH - 1}-tick window ---")
+    storage = make_universe(n)
+    rng = np.random.default_rng(9)
+    portfolio = PortfolioManager(storage)
+    symbols = [s.symbol for s in storage.get_all_stocks()]
+    for symbol in random.Random(9).sample(symbols, holdings):
+        portfolio.add_stock(symbol, 10, 100.0, "Broker")
+    batches = [random.Random(i).sample(symbols, tick_size) for i in range(ticks)]
+
+    def tick(batch):
+        rows = np.array([storage.get_row(symbol) for symbol in batch])
+        storage.update_many(batch, (storage.prices[rows] * np.exp(rng.normal(0, 0.01, len(rows)))).tolist())
+
+    for batch in batches[:HISTORY_LENGTH]:
+        tick(batch)
+    window = portfolio.tick_window
+    prices = [storage.prices[:tick_size] * 1.001 for _ in range(ticks)]
+    rows = [np.array([storage.get_row(symbol) for symbol in batch]) for batch in batches]
+    elapsed, _ = timed(lambda: [window.on_prices_updated(r, p) for r, p in zip(rows, prices)])
+    print(f"tick window:             {elapsed / ticks * 1e6:8.1f} us per tick (all the risk work a tick does)")
+    elapsed, _ = timed(portfolio.get_risk_report)
+    print(f"model build:             {elapsed * 1e3:8.2f} ms (once)")
+    model = portfolio.risk_model
+
+    def behind(count):
+        for batch in batches[:count]:
+            tick(batch)
+        return timed(model.sync)[0]
+
+    print(f"sync 1 tick behind:      {behind(1) * 1e3:8.2f} ms (rank-one update)")
+    print(f"sync 10 ticks behind:    {behind(10) * 1e3:8.2f} ms")
+    print(f"sync a window behind:    {behind(HISTORY_LENGTH) * 1e3:8.2f} ms (rebuild)")
+
+    def from_scratch():
+        picked = [storage.get_row(symbol) for symbol in portfolio.holdings]
+        return np.cov(window.observations(picked), rowvar=False)
+
+    elapsed, _ = timed(lambda: [from_scratch() for _ in range(20)])
+    print(f"covariance from scratch: {elapsed / 20 * 1e3:8.2f} ms per read")
+    elapsed, _ = timed(lambda: [portfolio.get_risk_report() for _ in range(20)])
+    print(f"full risk report:        {elapsed / 20 * 1e3:8.2f} ms per read (VaR, CVaR, betas, contributions)")
+
+
+def bench_simulate(holdings=200, paths=80_000, horizon=30):
+    print(f"\n--- Monte Carlo: {paths:,} paths x {horizon} ticks x {holdings} holdings ({os.cpu_count()} CPUs) ---")
+    rng = np.random.default_rng(11)
+    values = rng.uniform(1_000, 10_000, holdings)
+    returns = rng.normal(0.0005, 0.01, (HISTORY_LENGTH - 1, holdings))
+    baseline = None
+    for workers in (1, 2, 4):
+        simulate.simulate(values, returns, horizon, 2 * simulate.CHUNK_PATHS, workers=workers)  # start the pool
+        elapsed, result = timed(simulate.simulate, values, returns, horizon, paths, 'gbm', 0, workers)
+        baseline = baseline or elapsed
+        print(f"workers={workers}:  {elapsed * 1e3:8.1f} ms  speedup x{baseline / elapsed:4.2f}  "
+              f"median final {result['bands']['p50'][-1]:,.0f}")
+    simulate.shutdown()
+
+
+BENCHMARKS = {
+    'delete': bench_delete,
+    'history': bench_history,
+    'indicators': bench_indicators,
+    'sort': bench_sort,
+    'pagination': bench_pagination,
+    'topk': bench_topk,
+    'search': bench_search,
+    'fetch': bench_fetch,
+    'stream': bench_stream,
+    'locking': bench_locking,
+    'warm_start': bench_warm_start,
+    'archive': bench_archive,
+    'bars': bench_bars,
+    'response_cache': bench_response_cache,
+    'serialize': bench_serialize,
+    'memory': bench_memory,
+    'portfolio': bench_portfolio,
+    'portfolio_fanout': bench_portfolio_fanout,
+    'ledger': bench_ledger,
+    'risk': bench_risk,
+    'simulate': bench_simulate,
+}
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
@@ -0,0 +1,90 @@
+from collections import deque
+from typing import Dict, List, Optional
+from sortedcontainers import SortedList
+from models import Stock
+from storage import StockStorage, StorageListener
+
+
+class ChangeTracker(StorageListener):
+    """
+    Per-symbol versions for delta polling.
+    Every storage mutation batch (one update_many tick, one update_price, an add, a
+    delete, a field write) bumps the global version once and stamps the symbols it
+    touched; a price tick only stamps rows whose price actually moved.
+    changes_since(v) then returns just the symbols stamped after v.
+    Time Complexity: stamping O(log N) per symbol, changes_since O(log N + k).
+    """
+
+    def __init__(self, storage: StockStorage, max_removals: int = 10_000):
+        self.storage = storage
+        self.version = 0
+        self.symbol_versions: Dict[str, int] = {}
+        self.by_version = SortedList()  # (version, symbol), one entry per live symbol
+        self.removals = deque(maxlen=max_removals)  # (version, symbol), oldest first
+        self._removals_trimmed_at = 0  # deltas older than this need a full reload
+
+        for stock in storage.get_all_stocks():
+            self.symbol_versions[stock.symbol] = 0
+            self.by_version.add((0, stock.symbol))
+        storage.add_listener(self)
+
+    def changes_since(self, since: int) -> Dict:
+        """
+        {"version", "reset", "changes", "removed"} for a client that has seen `since`.
+        "reset" means `since` predates the retained removal log (or comes from a different
+        server run), so the client should reload everything instead of applying deltas.
+        """
+        if since > self.version or since < self._removals_trimmed_at:
+            return {"version": self.version, "reset": True, "changes": [], "removed": []}
+
+        changes = []
+        for version, symbol in self.by_version.irange((since + 1,)):
+            stock = self.storage.get_stock(symbol)
+            changes.append({
+                "symbol": symbol,
+                "name": stock.name,
+                "sector": stock.sector,
+                "price": stock.price,
+                "volume": stock.volume,
+                "volatility": stock.volatility,
+                "version": version,
+            })
+        removed = [symbol for version, symbol in self.removals
+                   if version > since and symbol not in self.symbol_versions]
+        return {"version": self.version, "reset": False, "changes": changes, "removed": removed}
+
+    def get_version(self, symbol: str) -> Optional[int]:
+        return self.symbol_versions.get(symbol)
+
+    def _stamp(self, symbols: List[str]):
+        if not symbols:
+            return
+        self.version += 1
+        for symbol in symbols:
+            old = self.symbol_versions.get(symbol)
+            if old is not None:
+                self.by_version.remove((old, symbol))
+            self.symbol_versions[symbol] = self.version
+            self.by_version.add((self.version, symbol))
+
+    # --- Storage events ---
+
+    def on_stock_added(self, stock: Stock):
+        self._stamp([stock.symbol])
+
+    def on_stock_removed(self, stock: Stock):
+        self.version += 1
+        old = self.symbol_versions.pop(stock.symbol)
+        self.by_version.remove((old, stock.symbol))
+        if len(self.removals) == self.removals.maxlen:
+            self._removals_trimmed_at = self.removals[0][0]
+        self.removals.append((self.version, stock.symbol))
+
+    def on_prices_updated(self, rows, old_prices):
+        moved = rows[self.storage.prices[rows] != old_prices]
+        stocks_list = self.storage.stocks_list
+        self._stamp([stocks_list[row].symbol for row in moved.tolist()])
+
+    def on_field_changed(self, row: int, field: str, old_value):
+        if getattr(self.storage, self.storage.COLUMNS[field])[row] != old_value:
+            self._stamp([self.storage.stocks_list[row].symbol])
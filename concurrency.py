@@ -0,0 +1,100 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    Readers-writer lock: any number of concurrent readers, or one writer.
+    - Readers wait only for a write in progress, not for a writer still queued behind
+      other readers: one long read does not hold every new reader behind a waiting tick.
+    - Writers cannot starve: once a writer has waited `writer_patience` seconds, new
+      readers queue behind it, so its wait is bounded by that plus the longest read in
+      flight. (writer_patience=0 makes the lock writer-preferring.)
+    - Reentrant for the writer, which may also read (storage listeners call back into storage).
+    - A thread may nest reads, but cannot upgrade a read to a write (that would deadlock
+      against another upgrading reader), so it raises instead.
+    """
+
+    def __init__(self, writer_patience: float = 0.05):
+        self.writer_patience = writer_patience
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None  # ident of the thread holding the write lock
+        self._write_depth = 0
+        self._waiting_since = []  # time.monotonic() at which each waiting writer queued
+        self._local = threading.local()
+
+    def _read_stack(self) -> list:
+        stack = getattr(self._local, 'reads', None)
+        if stack is None:
+            stack = self._local.reads = []
+        return stack
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        stack = self._read_stack()
+        with self._cond:
+            if self._writer == me or stack:
+                # The writer reading its own state, or a nested read: never wait here,
+                # a queued writer would otherwise deadlock against us.
+                counted = self._writer != me
+            else:
+                while self._writer is not None or self._writer_overdue():
+                    self._cond.wait()
+                counted = True
+            if counted:
+                self._readers += 1
+        stack.append(counted)
+
+    def release_read(self):
+        counted = self._read_stack().pop()
+        if counted:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if any(self._read_stack()):
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            queued = time.monotonic()
+            self._waiting_since.append(queued)
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_since.remove(queued)
+            self._writer = me
+            self._write_depth = 1
+
+    def _writer_overdue(self) -> bool:
+        return bool(self._waiting_since) and time.monotonic() - min(self._waiting_since) >= self.writer_patience
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -0,0 +1,136 @@
+from typing import Dict, List, Optional
+import numpy as np
+from trend_analysis import TrendAnalyzer
+
+INDICATOR_FIELDS = [
+    'sma', 'ema', 'rsi', 'macd', 'macd_signal', 'macd_hist',
+    'bb_upper', 'bb_middle', 'bb_lower', 'volatility', 'return_1', 'return_window',
+]
+
+
+class IndicatorAnalyzer(TrendAnalyzer):
+    """
+    Vectorized technical indicators for many symbols at once.
+    Input is a (symbols x time) price matrix, oldest -> newest, with NaN padding on
+    the left for shorter histories (the layout of StockStorage.history_matrix).
+    Every indicator is the latest value per row; rows without enough history get NaN.
+    Time Complexity: O(N * T) numpy work, one pass over the time axis for the
+    recursive indicators (EMA, MACD, RSI) and slices of the last columns for the rest.
+    """
+
+    def __init__(self, window_size: int = 5, rsi_period: int = 14,
+                 macd_spans=(12, 26, 9), bollinger_window: int = 20, bollinger_k: float = 2.0,
+                 volatility_window: int = 20):
+        super().__init__(window_size)
+        self.rsi_period = rsi_period
+        self.macd_spans = macd_spans
+        self.bollinger_window = bollinger_window
+        self.bollinger_k = bollinger_k
+        self.volatility_window = volatility_window
+
+    def calculate_matrix(self, prices: np.ndarray) -> Dict[str, np.ndarray]:
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.ndim == 1:
+            prices = prices[None, :]
+        n, width = prices.shape
+        valid_points = np.count_nonzero(~np.isnan(prices), axis=1)
+
+        # Recursive indicators share one sweep over time.
+        fast, slow, signal_span = self.macd_spans
+        a_ema = 2 / (self.window_size + 1)
+        a_fast, a_slow, a_signal = 2 / (fast + 1), 2 / (slow + 1), 2 / (signal_span + 1)
+        a_rsi = 1 / self.rsi_period  # Wilder smoothing
+
+        ema = np.full(n, np.nan)
+        ema_fast = np.full(n, np.nan)
+        ema_slow = np.full(n, np.nan)
+        signal = np.full(n, np.nan)
+        avg_gain = np.full(n, np.nan)
+        avg_loss = np.full(n, np.nan)
+        previous = np.full(n, np.nan)
+
+        for col in prices.T:
+            ema = _ewm_step(ema, col, a_ema)
+            ema_fast = _ewm_step(ema_fast, col, a_fast)
+            ema_slow = _ewm_step(ema_slow, col, a_slow)
+            signal = _ewm_step(signal, ema_fast - ema_slow, a_signal)
+
+            change = col - previous
+            avg_gain = _ewm_step(avg_gain, np.where(np.isnan(change), np.nan, np.maximum(change, 0.0)), a_rsi)
+            avg_loss = _ewm_step(avg_loss, np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0)), a_rsi)
+            previous = np.where(np.isnan(col), previous, col)
+
+        macd = ema_fast - ema_slow
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss > 0, 100 - 100 / (1 + avg_gain / avg_loss),
+                           np.where(avg_gain > 0, 100.0, 50.0))
+
+        # Windowed indicators only need the trailing columns; NaN propagates for short rows.
+        sma = _tail(prices, self.window_size).mean(axis=1)
+        band = _tail(prices, self.bollinger_window)
+        bb_middle = band.mean(axis=1)
+        bb_width = self.bollinger_k * band.std(axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_returns = np.diff(np.log(_tail(prices, self.volatility_window + 1)), axis=1)
+            volatility = log_returns.std(axis=1, ddof=1) if log_returns.shape[1] > 1 else np.full(n, np.nan)
+            latest = prices[:, -1]
+            return_1 = latest / prices[:, -2] - 1 if width > 1 else np.full(n, np.nan)
+            first = prices[np.arange(n), np.clip(width - valid_points, 0, width - 1)]
+            return_window = latest / first - 1
+
+        macd_ready = valid_points >= slow
+        results = {
+            'sma': sma,
+            'ema': ema,
+            'rsi': np.where(valid_points > self.rsi_period, rsi, np.nan),
+            'macd': np.where(macd_ready, macd, np.nan),
+            'macd_signal': np.where(macd_ready, signal, np.nan),
+            'macd_hist': np.where(macd_ready, macd - signal, np.nan),
+            'bb_upper': bb_middle + bb_width,
+            'bb_middle': bb_middle,
+            'bb_lower': bb_middle - bb_width,
+            'volatility': volatility,
+            'return_1': return_1,
+            'return_window': np.where(valid_points > 1, return_window, np.nan),
+        }
+        return results
+
+    def calculate_for_prices(self, prices) -> Dict[str, Optional[float]]:
+        """Indicators for a single history (a list or Stock.price_history)."""
+        results = self.calculate_matrix(np.array(list(prices), dtype=np.float64))
+        return {name: _to_json_number(values[0]) for name, values in results.items()}
+
+    def calculate_for_storage(self, storage, rows: Optional[np.ndarray] = None) -> List[Dict]:
+        """Indicators for every stored stock (or `rows`) from the shared ring buffer."""
+        if rows is None:
+            rows = np.arange(len(storage.stocks_list))
+        matrix, _ = storage.history_matrix(rows=rows)
+        results = self.calculate_matrix(matrix)
+
+        stocks = storage.get_all_stocks()
+        columns = [results[name].tolist() for name in INDICATOR_FIELDS]
+        response = []
+        for i, row in enumerate(rows):
+            entry = {"symbol": stocks[row].symbol}
+            for name, values in zip(INDICATOR_FIELDS, columns):
+                entry[name] = _to_json_number(values[i])
+            response.append(entry)
+        return response
+
+
+def _ewm_step(state: np.ndarray, values: np.ndarray, alpha: float) -> np.ndarray:
+    """One exponential smoothing step; seeds on the first value and skips NaN inputs."""
+    return np.where(np.isnan(state), values,
+                    np.where(np.isnan(values), state, alpha * values + (1 - alpha) * state))
+
+
+def _tail(prices: np.ndarray, window: int) -> np.ndarray:
+    if prices.shape[1] < window:
+        return np.full((prices.shape[0], window), np.nan)
+    return prices[:, -window:]
+
+
+def _to_json_number(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) or np.isinf(value) else value
@@ -0,0 +1,203 @@
+import math
+import time
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Cost-basis methods: which open lots a sell consumes.
+FIFO, LIFO, AVERAGE = 'fifo', 'lifo', 'average'
+COST_BASIS_METHODS = (FIFO, LIFO, AVERAGE)
+
+BUY, SELL, SPLIT = 'buy', 'sell', 'split'
+
+_EPSILON = 1e-9  # lot quantities below this are treated as fully consumed...
+_RELATIVE_EPSILON = 1e-14  # ...or below this fraction of the quantity traded (float rounding scales with it)
+
+
+def _tolerance(quantity: float) -> float:
+    return max(_EPSILON, _RELATIVE_EPSILON * quantity)
+
+
+@dataclass(frozen=True, slots=True)
+class Transaction:
+    kind: str # buy, sell or split
+    quantity: float # shares; the split ratio for a split (2 = 2-for-1)
+    price: float = 0.0 # per share; unused for a split
+    platform: str = "" # the platform holding the lots; unused for a split
+    ts: float = 0.0
+
+    def __post_init__(self):
+        # One numeric type whatever the caller or a JSON record passed: shares can be fractional
+        object.__setattr__(self, 'quantity', float(self.quantity))
+        object.__setattr__(self, 'price', float(self.price))
+
+    def to_list(self) -> list:
+        return [self.kind, self.quantity, self.price, self.platform, self.ts]
+
+
+class Position:
+    """
+    Open lots and realized P/L after replaying a ledger prefix under one cost-basis method.
+    Lots are (quantity, unit cost) per platform, oldest first; AVERAGE keeps one merged lot.
+    """
+    __slots__ = ('lots', 'realized', 'count')
+
+    def __init__(self):
+        self.lots: Dict[str, Deque[Tuple[float, float]]] = {}
+        self.realized = 0.0
+        self.count = 0 # transactions applied
+
+    def copy(self) -> 'Position':
+        position = Position()
+        position.lots = {platform: deque(lots) for platform, lots in self.lots.items()}
+        position.realized = self.realized
+        position.count = self.count
+        return position
+
+    @property
+    def quantity(self) -> float:
+        return sum(quantity for lots in self.lots.values() for quantity, _ in lots)
+
+    @property
+    def cost(self) -> float:
+        return sum(quantity * price for lots in self.lots.values() for quantity, price in lots)
+
+    def platform_quantities(self) -> Dict[str, float]:
+        return {platform: sum(quantity for quantity, _ in lots) for platform, lots in self.lots.items()}
+
+    def apply(self, txn: Transaction, method: str):
+        """Time Complexity: O(1) amortized for buys and sells (each lot is consumed once); O(lots) for a split."""
+        if txn.kind == BUY:
+            lots = self.lots.setdefault(txn.platform, deque())
+            if method == AVERAGE and lots:
+                quantity, cost = lots.pop()
+                total = quantity + txn.quantity
+                lots.append((total, (quantity * cost + txn.quantity * txn.price) / total))
+            else:
+                lots.append((txn.quantity, txn.price))
+        elif txn.kind == SELL:
+            lots = self.lots.get(txn.platform, deque())
+            remaining = txn.quantity
+            consumed_cost = 0.0
+            tolerance = _tolerance(txn.quantity)
+            # The lots and Ledger.open round separately (splits, average merges): stop when
+            # either runs out rather than trusting the other
+            while remaining > tolerance and lots:
+                quantity, cost = lots[-1] if method == LIFO else lots[0]
+                used = min(quantity, remaining)
+                consumed_cost += used * cost
+                remaining -= used
+                if method == LIFO:
+                    lots.pop()
+                    if quantity - used > tolerance:
+                        lots.append((quantity - used, cost))
+                else:
+                    lots.popleft()
+                    if quantity - used > tolerance:
+                        lots.appendleft((quantity - used, cost))
+            self.realized += txn.quantity * txn.price - consumed_cost
+            if not lots:
+                self.lots.pop(txn.platform, None)
+        elif txn.kind == SPLIT:
+            ratio = txn.quantity
+            self.lots = {platform: deque((quantity * ratio, cost / ratio) for quantity, cost in lots)
+                         for platform, lots in self.lots.items()}
+        else:
+            raise ValueError(f"Unknown transaction kind '{txn.kind}'")
+        self.count += 1
+
+
+class Ledger:
+    """
+    Append-only transaction log of one holding, with cost basis computed by replay.
+    Every `checkpoint_every` transactions a copy of the replayed Position is kept per
+    method, so a position (current or as of any earlier transaction) replays only the
+    transactions since the nearest checkpoint. The current position of each method asked
+    for is kept and advanced in place as transactions are appended.
+    Time Complexity: append O(1); position() O(transactions since checkpoint).
+    """
+
+    def __init__(self, checkpoint_every: int = 64):
+        self.checkpoint_every = checkpoint_every
+        self.transactions: List[Transaction] = []
+        self.open: Dict[str, float] = {} # platform -> open quantity (the same under every method)
+        self._checkpoints: Dict[str, List[Position]] = {}
+        self._heads: Dict[str, Position] = {}
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def buy(self, quantity: float, price: float, platform: str, ts: Optional[float] = None) -> Transaction:
+        return self.append(Transaction(BUY, quantity, price, platform, time.time() if ts is None else ts))
+
+    def sell(self, quantity: float, price: float, platform: str, ts: Optional[float] = None) -> Transaction:
+        return self.append(Transaction(SELL, quantity, price, platform, time.time() if ts is None else ts))
+
+    def split(self, ratio: float, ts: Optional[float] = None) -> Transaction:
+        return self.append(Transaction(SPLIT, ratio, ts=time.time() if ts is None else ts))
+
+    def append(self, txn: Transaction) -> Transaction:
+        """Validate and record a transaction. Raises ValueError for a sell of more than is open."""
+        if txn.kind not in (BUY, SELL, SPLIT):
+            raise ValueError(f"Unknown transaction kind '{txn.kind}'")
+        if not (txn.quantity > 0 and math.isfinite(txn.quantity)):
+            raise ValueError("Transaction quantity must be a positive number")
+        if not math.isfinite(txn.price):
+            raise ValueError("Transaction price must be a finite number")
+        if txn.kind == SELL:
+            held = self.open.get(txn.platform, 0)
+            tolerance = _tolerance(txn.quantity)
+            if txn.quantity > held + tolerance:
+                raise ValueError(f"Cannot sell {txn.quantity} on '{txn.platform}': {held} held there")
+            if held - txn.quantity > tolerance:
+                self.open[txn.platform] = held - txn.quantity
+            else:
+                del self.open[txn.platform]
+        elif txn.kind == BUY:
+            self.open[txn.platform] = self.open.get(txn.platform, 0) + txn.quantity
+        else:
+            self.open = {platform: quantity * txn.quantity for platform, quantity in self.open.items()}
+        self.transactions.append(txn)
+        return txn
+
+    def position(self, method: str = AVERAGE, upto: Optional[int] = None) -> Position:
+        """
+        Position after the first `upto` transactions (all by default) under `method`.
+        The current position is shared state: read it, do not modify it.
+        """
+        if method not in COST_BASIS_METHODS:
+            raise ValueError(f"Unknown cost basis '{method}', expected one of {list(COST_BASIS_METHODS)}")
+        end = len(self.transactions) if upto is None else max(0, min(upto, len(self.transactions)))
+        head = self._heads.get(method)
+        if upto is None and head is not None:
+            return self._replay(head, end, method)
+
+        checkpoints = self._checkpoints.get(method, [])
+        i = bisect_right(checkpoints, end, key=attrgetter('count'))
+        start = checkpoints[i - 1].copy() if i else Position()
+        if head is not None and start.count < head.count <= end:
+            start = head.copy()
+        position = self._replay(start, end, method)
+        if upto is None:
+            self._heads[method] = position
+        return position
+
+    def _replay(self, position: Position, end: int, method: str) -> Position:
+        checkpoints = self._checkpoints.setdefault(method, [])
+        transactions = self.transactions
+        every = self.checkpoint_every
+        while position.count < end:
+            position.apply(transactions[position.count], method)
+            if position.count % every == 0 and (not checkpoints or checkpoints[-1].count < position.count):
+                checkpoints.append(position.copy())
+        return position
+
+    @classmethod
+    def from_records(cls, records, checkpoint_every: int = 64) -> 'Ledger':
+        """Rebuild from Transaction.to_list() records."""
+        ledger = cls(checkpoint_every)
+        for record in records:
+            ledger.append(Transaction(*record))
+        return ledger
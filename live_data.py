@@ -1,86 +1,219 @@
-import yfinance as yf
+import heapq
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, Set
+
+import yfinance as yf
+
+
+class QuoteProvider:
+    """
+    Source of per-symbol quote data: `get_info` returns a yfinance-style info dict
+    (shortName, sector, currentPrice / regularMarketPrice, averageVolume, beta)
+    or raises. Implementations must be safe to call from several threads.
+    """
+
+    def get_info(self, symbol: str) -> Dict:
+        raise NotImplementedError
+
+
+class YFinanceProvider(QuoteProvider):
+    def get_info(self, symbol: str) -> Dict:
+        return yf.Ticker(symbol).info
+
+
+class FakeQuoteProvider(QuoteProvider):
+    """
+    Local stand-in for yfinance in tests and benchmarks.
+    Each call sleeps `latency` (+ up to `jitter`) seconds and returns a random-walk quote.
+    `failures` maps a symbol to how many of its first calls raise;
+    symbols in `hang` sleep `hang_time` seconds instead, to exercise timeouts.
+    """
+
+    SECTORS = ['Tech', 'Finance', 'Health', 'Energy', 'Consumer']
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, failures: Optional[Dict[str, int]] = None,
+                 hang: Optional[Set[str]] = None, hang_time: float = 60.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failures = dict(failures or {})
+        self.hang = set(hang or ())
+        self.hang_time = hang_time
+        self.calls: Dict[str, int] = {}
+        self._prices: Dict[str, float] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def get_info(self, symbol: str) -> Dict:
+        with self._lock:
+            self.calls[symbol] = self.calls.get(symbol, 0) + 1
+            should_fail = self.calls[symbol] <= self.failures.get(symbol, 0)
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            price = self._prices.get(symbol) or self._rng.uniform(20, 2000)
+            price = self._prices[symbol] = round(price * (1 + self._rng.uniform(-0.02, 0.02)), 2)
+
+        time.sleep(self.hang_time if symbol in self.hang else delay)
+        if should_fail:
+            raise ConnectionError(f"fake provider: transient failure for {symbol}")
+        return {
+            "symbol": symbol,
+            "shortName": f"{symbol} Corp.",
+            "sector": self.SECTORS[sum(map(ord, symbol)) % len(self.SECTORS)],
+            "currentPrice": price,
+            "averageVolume": 1_000_000 + sum(map(ord, symbol)) * 1000,
+            "beta": 0.5 + (sum(map(ord, symbol)) % 20) / 10,
+        }
+
 
 class LiveDataManager:
-    def __init__(self):
+    def __init__(self, provider: Optional[QuoteProvider] = None, max_workers: int = 32,
+                 timeout: float = 10.0, retries: int = 2, backoff: float = 0.5):
+        """
+        provider: where quotes come from (yfinance by default).
+        max_workers: bound on concurrent provider calls.
+        timeout: seconds one attempt for one symbol may take before it is abandoned.
+        retries / backoff: failed or timed-out attempts are retried up to `retries` times,
+        waiting backoff * 2**attempt seconds first.
+        """
         self.popular_symbols = [
-            'AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA', 
-            'JPM', 'V', 'JNJ', 'PFE', 'XOM', 
+            'AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA',
+            'JPM', 'V', 'JNJ', 'PFE', 'XOM',
             'CVX', 'WMT', 'PG', 'NVDA', 'AMD',
             'NFLX', 'DIS', 'KO', 'PEP', 'INTC'
         ]
+        self.provider = provider or YFinanceProvider()
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Abandoned (timed-out) calls keep their thread until the provider returns,
+        # so the pool is long-lived rather than joined at the end of every refresh.
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="quotes")
+        return self._pool
+
+    def fetch_infos(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Provider info for every symbol that succeeds, fetched concurrently.
+        Each attempt runs on the bounded pool; an attempt that raises or runs past
+        `timeout` (measured from when it starts, not when it was queued) is retried
+        with exponential backoff, and the symbol is dropped once retries run out.
+        Wall time is about max(latency) per wave of `max_workers` symbols rather than sum(latency).
+        """
+        pool = self._executor()
+        results: Dict[str, Dict] = {}
+        running = {}  # future -> (symbol, attempt, [start time once a worker picks it up])
+        retry_queue = []  # heap of (due time, symbol, attempt)
+
+        def attempt(symbol: str, started: list):
+            started.append(time.monotonic())
+            return self.provider.get_info(symbol)
+
+        def launch(symbol: str, attempt_no: int):
+            started: list = []
+            running[pool.submit(attempt, symbol, started)] = (symbol, attempt_no, started)
+
+        def give_up_or_retry(symbol: str, attempt_no: int, reason: str):
+            if attempt_no < self.retries:
+                heapq.heappush(retry_queue, (time.monotonic() + self.backoff * 2 ** attempt_no, symbol, attempt_no + 1))
+            else:
+                print(f"Failed to fetch {symbol}: {reason}")
+
+        for symbol in dict.fromkeys(symbols):
+            launch(symbol, 0)
+
+        while running or retry_queue:
+            now = time.monotonic()
+            while retry_queue and retry_queue[0][0] <= now:
+                _, symbol, attempt_no = heapq.heappop(retry_queue)
+                launch(symbol, attempt_no)
+
+            # Sleep until something finishes, an attempt's timeout expires or a retry is due.
+            # Attempts still queued (or just picked up) are rechecked within one timeout.
+            wake_times = [started[0] + self.timeout if started else now + self.timeout
+                          for _, _, started in running.values()]
+            if retry_queue:
+                wake_times.append(retry_queue[0][0])
+            wait_for = max(min(wake_times) - now, 0)
+            if running:
+                done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+            else:
+                done = set()
+                time.sleep(wait_for)
+
+            for future in done:
+                symbol, attempt_no, _ = running.pop(future)
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    give_up_or_retry(symbol, attempt_no, str(e))
+
+            now = time.monotonic()
+            for future, (symbol, attempt_no, started) in list(running.items()):
+                if started and now - started[0] >= self.timeout:
+                    del running[future]
+                    give_up_or_retry(symbol, attempt_no, f"timed out after {self.timeout}s")
+
+        return results
+
+    @staticmethod
+    def _to_stock_data(symbol: str, info: Dict, default_volatility: Optional[float] = None) -> Optional[Dict]:
+        price = info.get('currentPrice', info.get('regularMarketPrice', 0.0))
+        if not price or price <= 0:
+            return None
+
+        beta = info.get('beta', None)
+        if beta:
+            volatility = min(max(beta / 3, 0.1), 0.99)
+        elif default_volatility is not None:
+            volatility = default_volatility
+        else:
+            volatility = round(random.uniform(0.1, 0.9), 2)
+
+        return {
+            "symbol": symbol,
+            "name": info.get('shortName', symbol),
+            "sector": info.get('sector', 'Unknown'),
+            "price": float(price),
+            "volume": int(info.get('averageVolume', 0)),
+            "volatility": float(volatility)
+        }
 
     def fetch_top_stocks(self):
         print(f"Fetching live data for {len(self.popular_symbols)} stocks...")
         live_stocks = []
-        
+
         try:
-            tickers = yf.Tickers(" ".join(self.popular_symbols))
-            
+            infos = self.fetch_infos(self.popular_symbols)
             for symbol in self.popular_symbols:
-                try:
-                    info = tickers.tickers[symbol].info
-                    
-                    name = info.get('shortName', symbol)
-                    sector = info.get('sector', 'Unknown')
-                    price = info.get('currentPrice', info.get('regularMarketPrice', 0.0))
-                    volume = info.get('averageVolume', 0)
-                    
-                    beta = info.get('beta', None)
-                    if beta:
-                        volatility = min(max(beta / 3, 0.1), 0.99)
-                    else:
-                        volatility = round(random.uniform(0.1, 0.9), 2)
-                        
-                    if price and price > 0:
-                        stock_data = {
-                            "symbol": symbol,
-                            "name": name,
-                            "sector": sector,
-                            "price": float(price),
-                            "volume": int(volume),
-                            "volatility": float(volatility)
-                        }
-                        live_stocks.append(stock_data)
-                        
-                except Exception as inner_e:
-                    print(f"Failed to fetch {symbol}: {inner_e}")
-                    continue
-                    
+                stock_data = self._to_stock_data(symbol, infos[symbol]) if symbol in infos else None
+                if stock_data:
+                    live_stocks.append(stock_data)
+
         except Exception as e:
             print(f"Global fetch error: {e}")
             return []
-            
+
         print(f"Successfully fetched {len(live_stocks)} stocks.")
         return live_stocks
 
     def fetch_stock_by_symbol(self, symbol: str):
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            
+            info = self.fetch_infos([symbol]).get(symbol)
+            if not info:
+                return None
+
             if 'symbol' not in info and 'shortName' not in info:
                  if 'regularMarketPrice' not in info:
                      return None
 
-            price = info.get('currentPrice', info.get('regularMarketPrice', 0.0))
-            if not price: return None
-
-            stock_data = {
-                "symbol": info.get('symbol', symbol).upper(),
-                "name": info.get('shortName', symbol),
-                "sector": info.get('sector', 'Unknown'),
-                "price": float(price),
-                "volume": int(info.get('averageVolume', 0)),
-                "volatility": 0.5
-            }
-            
-            beta = info.get('beta', None)
-            if beta:
-                stock_data['volatility'] = min(max(beta / 3, 0.1), 0.99)
-            
-            return stock_data
-            
+            return self._to_stock_data(info.get('symbol', symbol).upper(), info, default_volatility=0.5)
+
         except Exception as e:
             print(f"Error fetching {symbol}: {e}")
             return None
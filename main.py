@@ -11,6 +11,16 @@ from sorting import StockSorter
 
 from live_data import LiveDataManager
 
+def backfill_history(price: float, points: int = 10) -> List[float]:
+    """Synthetic random-walk history ending at the current price (oldest -> newest)."""
+    history = [price]
+    current = price
+    for _ in range(points):
+        current = current / (1 + random.uniform(-0.02, 0.02))
+        history.append(current)
+    history.reverse()
+    return history
+
 def populate_initial_data(storage: StockStorage):
     print("Initializing stock data...")
     
@@ -30,13 +40,7 @@ def populate_initial_data(storage: StockStorage):
                     s_data['volatility']
                 )
                 
-                stock.price_history = []
-                current = stock.price
-                for _ in range(10):
-                    prev = current / (1 + random.uniform(-0.02, 0.02))
-                    stock.price_history.insert(0, prev)
-                    current = prev
-                stock.price_history.append(stock.price)
+                stock.price_history = backfill_history(stock.price)
                 
                 storage.add_stock(stock)
             return
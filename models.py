@@ -1,21 +1,201 @@
-from dataclasses import dataclass, field
+import sys
+from array import array
+from dataclasses import dataclass
 from typing import List, Deque
 from collections import deque
 
-@dataclass
+HISTORY_LENGTH = 100
+
+
+class StorageColumn:
+    """
+    Descriptor for a Stock field that lives in a StockStorage column.
+    Until the stock is added to a storage the value is kept on the instance;
+    afterwards reads and writes go straight to the storage row.
+    """
+
+    def __init__(self, column: str, cast):
+        self.column = column
+        self.cast = cast
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.local_name = '_' + name
+
+    def __get__(self, stock, owner=None):
+        if stock is None:
+            # No class-level default, so the dataclass field stays required.
+            raise AttributeError(self.name)
+        if stock._storage is None:
+            return getattr(stock, self.local_name)
+        return self.cast(getattr(stock._storage, self.column)[stock._row])
+
+    def __set__(self, stock, value):
+        if stock._storage is None:
+            setattr(stock, self.local_name, value)
+        else:
+            stock._storage._write_field(stock._row, self.name, value)
+
+
+class PriceHistory:
+    """
+    Read/append view over one stock's row in the storage ring buffer.
+    Behaves like the old deque: len(), iteration and indexing run oldest -> newest.
+    """
+
+    def __init__(self, storage, row: int):
+        self._storage = storage
+        self._row = row
+
+    def to_array(self):
+        return self._storage.get_history(self._row)
+
+    def append(self, price: float):
+        self._storage.append_history(self._row, price)
+
+    def extend(self, prices):
+        self._storage.replace_history(self._row, list(self) + list(prices))
+
+    def __len__(self):
+        return int(self._storage.history_len[self._row])
+
+    def __iter__(self):
+        return iter(self.to_array().tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.to_array()[index].tolist()
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("price history index out of range")
+        return self._storage._history_at(self._row, index)
+
+    def __eq__(self, other):
+        if isinstance(other, (PriceHistory, list, tuple, deque, array)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __deepcopy__(self, memo):
+        # dataclasses.asdict deep-copies field values; hand back a plain list.
+        return list(self)
+
+    def __repr__(self):
+        return f"PriceHistory({list(self)})"
+
+
+class LocalHistory(array):
+    """
+    History of a stock that is not in a storage: packed doubles (8 bytes per price
+    instead of a deque slot plus a float object), keeping the last HISTORY_LENGTH.
+    """
+    __slots__ = ()
+
+    def __new__(cls, values=()):
+        history = super().__new__(cls, 'd', values)
+        if len(history) > HISTORY_LENGTH:
+            del history[:-HISTORY_LENGTH]
+        return history
+
+    def append(self, price: float):
+        super().append(price)
+        if len(self) > HISTORY_LENGTH:
+            del self[0]
+
+    def extend(self, prices):
+        super().extend(prices)
+        if len(self) > HISTORY_LENGTH:
+            del self[:-HISTORY_LENGTH]
+
+    def __eq__(self, other):
+        if isinstance(other, (PriceHistory, list, tuple, deque, array)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __deepcopy__(self, memo):
+        return list(self)
+
+    def __repr__(self):
+        return f"LocalHistory({list(self)})"
+
+
+class HistoryColumn:
+    """
+    Descriptor for Stock.price_history.
+    Unstored stocks keep a LocalHistory; stored stocks return a PriceHistory view
+    over the shared ring buffer. Assigning any iterable replaces the history.
+    """
+
+    def __set_name__(self, owner, name):
+        self.local_name = '_' + name
+
+    def __get__(self, stock, owner=None):
+        if stock is None:
+            return None  # dataclass default; __set__ turns it into an empty history
+        if stock._storage is None:
+            return getattr(stock, self.local_name)
+        return PriceHistory(stock._storage, stock._row)
+
+    def __set__(self, stock, values):
+        values = [] if values is None else values
+        if stock._storage is None:
+            setattr(stock, self.local_name, LocalHistory(values))
+        else:
+            stock._storage.replace_history(stock._row, list(values))
+
+
+@dataclass(init=False)
 class Stock:
     symbol: str
     name: str
     sector: str
-    price: float
-    volume: int
-    volatility: float
-    price_history: deque = field(default_factory=lambda: deque(maxlen=100))
+    price: float = StorageColumn('prices', float)
+    volume: int = StorageColumn('volumes', int)
+    volatility: float = StorageColumn('volatilities', float)
+    price_history: deque = HistoryColumn()
+
+    # No per-instance __dict__: the fields, the local values behind the column
+    # descriptors and the row binding set by StockStorage.
+    __slots__ = ('symbol', 'name', 'sector', '_price', '_volume', '_volatility', '_price_history',
+                 '_storage', '_row')
+
+    def __init__(self, symbol: str, name: str, sector: str, price: float, volume: int,
+                 volatility: float, price_history=None):
+        self._storage = None
+        self._row = -1
+        self.symbol = symbol
+        self.name = name
+        self.sector = sys.intern(sector)  # a handful of sectors shared by every stock
+        self.price = price
+        self.volume = volume
+        self.volatility = volatility
+        self.price_history = price_history
 
     def update_price(self, new_price: float):
+        if self._storage is not None:
+            self._storage._record_price(self._row, new_price)
+            return
         self.price = new_price
         self.price_history.append(new_price)
 
+    def _attach(self, storage, row: int):
+        self._storage = storage
+        self._row = row
+        # The row holds the values now; drop the local copies.
+        self._price = self._volume = self._volatility = self._price_history = None
+
+    def _detach(self):
+        """Copy the row values back onto the instance so the stock outlives its storage."""
+        price, volume, volatility = self.price, self.volume, self.volatility
+        history = list(self.price_history)
+        self._storage = None
+        self._row = -1
+        self.price, self.volume, self.volatility = price, volume, volatility
+        self.price_history = history
+
     def __repr__(self):
         return f"Stock({self.symbol}, {self.name}, ${self.price}, {self.sector})"
 
@@ -25,4 +205,3 @@ if __name__ == "__main__":
     print(f"Created: {demo_stock}")
     demo_stock.update_price(105.0)
     print(f"Updated: {demo_stock} - History: {demo_stock.price_history}")
-
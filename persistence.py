@@ -0,0 +1,254 @@
+import json
+import os
+import re
+import shutil
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models import Stock
+from storage import StockStorage, StorageListener
+
+# Columns written to a snapshot, one .npy file each (row order == storage row order).
+SNAPSHOT_COLUMNS = ['prices', 'volumes', 'volatilities', 'history', 'history_head', 'history_len']
+
+_SNAPSHOT_DIR = re.compile(r'^snapshot-(\d+)$')
+_LOG_FILE = re.compile(r'^log-(\d+)\.jsonl$')
+
+
+class MarketStore(StorageListener):
+    """
+    On-disk copy of the market and the portfolios (a PortfolioManager or a whole
+    PortfolioBook), so a restart does not wait on a full network refresh.
+
+    Layout of `path`:
+      snapshot-<g>/    meta.json (symbols, names, sectors, portfolio settings, holdings with their
+                       ledgers) + one .npy per column
+      log-<g>.jsonl    append-only log of every mutation made after snapshot <g> was taken
+
+    A snapshot directory is written under a temporary name and renamed when complete.
+    Loading picks the newest complete snapshot, memory-maps its columns into storage with
+    one bulk copy, then replays every log of that generation or later in order. A torn
+    last line (crash mid-write) is ignored and truncated away, so logging resumes on a
+    clean line.
+    snapshot() starts a new generation with an empty log and deletes the other files once
+    the new snapshot is on disk, which keeps the log tail short.
+
+    Time Complexity: logging O(k) per k-symbol tick; load O(N) vectorized + O(log tail).
+    """
+
+    def __init__(self, path: str, snapshot_every: int = 10_000, fsync: bool = False):
+        self.path = path
+        self.snapshot_every = snapshot_every  # log records before maybe_snapshot() compacts
+        self.fsync = fsync
+        self.generation = 0
+        self.log_records = 0
+        self.storage: Optional[StockStorage] = None
+        self.portfolio = None
+        self._log = None
+        os.makedirs(path, exist_ok=True)
+
+    # --- Warm start ---
+
+    def load(self, storage: StockStorage, portfolio=None) -> bool:
+        """
+        Restore the newest snapshot plus its log tail into an empty storage (and portfolio).
+        Call before attach() and before building components that index the storage.
+        Returns False when there is nothing on disk.
+        """
+        generations = self._snapshot_generations()
+        if not generations:
+            return False
+        self.generation = generations[-1]
+        snapshot_dir = self._snapshot_dir(self.generation)
+
+        with open(os.path.join(snapshot_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(snapshot_dir, name + '.npy'), mmap_mode='r')
+                   for name in SNAPSHOT_COLUMNS}
+        storage.load_rows(meta['symbols'], meta['names'], meta['sectors'], **columns)
+        if portfolio is not None:
+            for settings in meta.get('portfolios', []):
+                portfolio.restore_cost_basis(**settings)
+            for holding in meta['holdings']:
+                portfolio.restore_holding(**holding)
+
+        self.log_records = 0
+        for generation in self._log_generations():
+            if generation >= generations[-1]:
+                self.log_records += self._replay(self._log_path(generation), storage, portfolio)
+                # A crash mid-snapshot leaves a newer log than snapshot: keep appending to it
+                self.generation = generation
+        return True
+
+    def _replay(self, log_path: str, storage: StockStorage, portfolio) -> int:
+        with open(log_path, 'rb') as f:
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if complete < len(data):
+            # Torn final write: cut it off, or the next append would extend the broken line
+            with open(log_path, 'r+b') as f:
+                f.truncate(complete)
+        applied = 0
+        for line in data[:complete].split(b'\n'):
+            if line:
+                self._apply(json.loads(line), storage, portfolio)
+                applied += 1
+        return applied
+
+    @staticmethod
+    def _apply(record: Dict, storage: StockStorage, portfolio):
+        op = record['op']
+        if op == 'tick':
+            storage.update_many(record['symbols'], record['prices'])
+        elif op == 'add':
+            stock = Stock(record['symbol'], record['name'], record['sector'],
+                          record['price'], record['volume'], record['volatility'])
+            stock.price_history = record['history']
+            storage.add_stock(stock)
+        elif op == 'remove':
+            storage.delete_stock(record['symbol'])
+        elif op == 'set':
+            setattr(storage.get_stock(record['symbol']), record['field'], record['value'])
+        elif op == 'history':
+            storage.get_stock(record['symbol']).price_history = record['values']
+        elif op == 'txn':
+            if portfolio is not None:
+                portfolio.restore_transaction(**{k: v for k, v in record.items() if k != 'op'})
+        elif op == 'cost_basis':
+            if portfolio is not None:
+                portfolio.restore_cost_basis(**{k: v for k, v in record.items() if k != 'op'})
+        elif op == 'holding':
+            # Whole-holding records, written before holdings had transaction ledgers.
+            if portfolio is not None:
+                portfolio.restore_holding(**{k: v for k, v in record.items() if k != 'op'})
+        else:
+            raise ValueError(f"Unknown log record '{op}'")
+
+    # --- Logging ---
+
+    def attach(self, storage: StockStorage, portfolio=None):
+        """Start logging every storage / portfolio change; snapshots first if nothing is on disk yet."""
+        self.storage = storage
+        self.portfolio = portfolio
+        storage.add_listener(self)
+        if portfolio is not None:
+            portfolio.add_listener(self)
+        if not self._snapshot_generations():
+            self.snapshot()
+        else:
+            self._open_log(self.generation)
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _write(self, record: Dict):
+        if self._log is None:
+            return
+        self._log.write(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self.log_records += 1
+
+    def _open_log(self, generation: int, truncate: bool = False):
+        self.close()
+        self._log = open(self._log_path(generation), 'wb' if truncate else 'ab')
+
+    # --- Compaction ---
+
+    def maybe_snapshot(self) -> bool:
+        if self.storage is None or self.log_records < self.snapshot_every:
+            return False
+        self.snapshot()
+        return True
+
+    def snapshot(self):
+        """
+        Write a compact snapshot of the current state and start a fresh log.
+        Only the column copy runs under the storage read lock; the files are written after it.
+        """
+        storage = self.storage
+        with storage.lock.read():
+            count = len(storage.stocks_list)
+            columns = {name: getattr(storage, name)[:count].copy() for name in SNAPSHOT_COLUMNS}
+            stocks = storage.stocks_list
+            meta = {
+                'symbols': [s.symbol for s in stocks],
+                'names': [s.name for s in stocks],
+                'sectors': [s.sector for s in stocks],
+                'portfolios': list(self.portfolio.portfolio_records()) if self.portfolio is not None else [],
+                'holdings': list(self.portfolio.holding_records()) if self.portfolio is not None else [],
+            }
+            # Changes from here on belong to the new generation's log. It starts empty: one
+            # already on disk is left from a run that crashed before its snapshot completed
+            # (a cold start), and its records predate this state.
+            self.generation += 1
+            self._open_log(self.generation, truncate=True)
+            self.log_records = 0
+
+        final_dir = self._snapshot_dir(self.generation)
+        tmp_dir = final_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, column in columns.items():
+            np.save(os.path.join(tmp_dir, name + '.npy'), column)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, separators=(',', ':'))
+        os.replace(tmp_dir, final_dir)
+
+        for generation in self._snapshot_generations():
+            if generation < self.generation:
+                shutil.rmtree(self._snapshot_dir(generation), ignore_errors=True)
+        for generation in self._log_generations():
+            if generation != self.generation:
+                os.remove(self._log_path(generation))
+
+    # --- Files ---
+
+    def _snapshot_dir(self, generation: int) -> str:
+        return os.path.join(self.path, f'snapshot-{generation}')
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.path, f'log-{generation}.jsonl')
+
+    def _snapshot_generations(self) -> List[int]:
+        return sorted(int(m.group(1)) for m in map(_SNAPSHOT_DIR.match, os.listdir(self.path)) if m)
+
+    def _log_generations(self) -> List[int]:
+        return sorted(int(m.group(1)) for m in map(_LOG_FILE.match, os.listdir(self.path)) if m)
+
+    # --- Storage / portfolio events ---
+
+    def on_stock_added(self, stock: Stock):
+        self._write({'op': 'add', 'symbol': stock.symbol, 'name': stock.name, 'sector': stock.sector,
+                     'price': stock.price, 'volume': stock.volume, 'volatility': stock.volatility,
+                     'history': list(stock.price_history)})
+
+    def on_stock_removed(self, stock: Stock):
+        self._write({'op': 'remove', 'symbol': stock.symbol})
+
+    def on_prices_updated(self, rows, old_prices):
+        stocks_list = self.storage.stocks_list
+        self._write({'op': 'tick', 'symbols': [stocks_list[row].symbol for row in rows.tolist()],
+                     'prices': self.storage.prices[rows].tolist()})
+
+    def on_field_changed(self, row: int, field: str, old_value):
+        stock = self.storage.stocks_list[row]
+        self._write({'op': 'set', 'symbol': stock.symbol, 'field': field, 'value': getattr(stock, field)})
+
+    def on_history_changed(self, row: int):
+        stock = self.storage.stocks_list[row]
+        self._write({'op': 'history', 'symbol': stock.symbol, 'values': list(stock.price_history)})
+
+    def on_transaction(self, portfolio, symbol: str, txn):
+        record = {'op': 'txn', 'symbol': symbol, 'kind': txn.kind, 'quantity': txn.quantity,
+                  'price': txn.price, 'platform': txn.platform, 'ts': txn.ts}
+        if portfolio.owner is not None:
+            record['user'], record['account'] = portfolio.owner
+        self._write(record)
+
+    def on_cost_basis_changed(self, portfolio):
+        self._write({'op': 'cost_basis', **portfolio.portfolio_record()})
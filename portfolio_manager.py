@@ -1,37 +1,141 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import heapq
-from dataclasses import dataclass, asdict
-from collections import defaultdict
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from collections import Counter
+import numpy as np
 from models import Stock
+from storage import StorageListener
+from ledger import Ledger, Transaction, AVERAGE, BUY, SELL, SPLIT, COST_BASIS_METHODS
+from risk import RiskModel, TickWindow, risk_report
 
-@dataclass
+_risk_lock = threading.Lock() # risk models are built lazily, possibly by concurrent readers
+
+@dataclass(slots=True)
 class PortfolioItem:
     symbol: str
-    quantity: int
-    buy_price: float
-    platform: str
+    quantity: float # open quantity, summed over platforms (fractional after some splits)
+    buy_price: float # average unit cost of the open lots under the portfolio's cost basis
+    platform: str # the platform holding most of the open quantity
     current_price: float = 0.0
     current_value: float = 0.0
     profit_loss: float = 0.0
     profit_loss_pct: float = 0.0
     volatility: float = 0.0 # From main stock data
     sector: str = "" # From main stock data
+    realized_pl: float = 0.0 # Closed by sells, under the portfolio's cost basis
+    platform_quantities: Dict[str, float] = field(default_factory=dict) # Open quantity per platform
 
-class PortfolioManager:
-    def __init__(self, storage):
+DEFAULT_USER = 'default'
+DEFAULT_ACCOUNT = 'main'
+
+class PortfolioManager(StorageListener):
+    def __init__(self, storage, book: Optional['PortfolioBook'] = None, owner: Optional[Tuple[str, str]] = None,
+                 cost_basis: str = AVERAGE):
         """
         Initialize Portfolio Manager.
         Storage: Hash Map (Dictionary) for O(1) access to portfolio items.
         Platform Tracking: Set for O(1) uniqueness check.
+        Holdings follow the market as it ticks: a price or volatility change to a held
+        stock refreshes that holding and moves the portfolio totals and the per-platform /
+        per-sector sums by its delta, so the read endpoints never rescan the holdings.
+        A standalone manager subscribes to the storage itself; one inside a PortfolioBook
+        (owner = (user, account)) is driven by the book instead.
+        Every holding is derived from its append-only Ledger of buys, sells and splits;
+        cost_basis (fifo / lifo / average) picks which lots a sell closes.
         """
+        if cost_basis not in COST_BASIS_METHODS:
+            raise ValueError(f"Unknown cost basis '{cost_basis}', expected one of {list(COST_BASIS_METHODS)}")
         self.storage = storage # Reference to main StockStorage to get real-time price/volatility
-        self.holdings: Dict[str, PortfolioItem] = {} # Key: Symbol
+        self.holdings: Dict[str, PortfolioItem] = {} # Key: Symbol; open positions only
+        self.ledgers: Dict[str, Ledger] = {} # Key: Symbol; closed positions keep theirs
+        self.closed_realized: Dict[str, float] = {} # realized P/L of positions sold down to zero
+        self.cost_basis = cost_basis
+        self.risk_model: Optional[RiskModel] = None # built on the first risk read, synced on each one
         self.platforms = set()
+        self.book = book
+        self.owner = owner
+
+        # Maintained aggregates (see _account)
+        self.total_investment = 0.0
+        self.current_value = 0.0
+        self.volatility_sum = 0.0
+        self.realized_pl = 0.0
+        self.platform_values: Dict[str, float] = {}
+        self.sector_values: Dict[str, float] = {}
+        self._platform_counts = Counter()
+        self._sector_counts = Counter()
+
+        if book is not None:
+            self.tick_window = book.tick_window
+            self.listeners = book.listeners
+            return
+        # notified with on_transaction(portfolio, symbol, transaction) after every change,
+        # and on_cost_basis_changed(portfolio) when the method is switched
+        self.listeners = []
+        # Per-row count of portfolios holding the stock, so a tick skips unheld rows in one
+        # vectorized step. Shared by every PortfolioManager on this storage.
+        storage.register_column('portfolio_holders', np.int32)
+        storage.add_listener(self)
+        self.tick_window = TickWindow.of(storage) # per-tick returns for the risk model
+
+    @property
+    def holders(self) -> np.ndarray:
+        # Looked up each time: the storage replaces its columns when it grows
+        return self.storage.portfolio_holders
 
-    def add_stock(self, symbol: str, quantity: int, buy_price: float, platform: str) -> bool:
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def restore_holding(self, symbol: str, quantity: float, buy_price: float, platform: str,
+                        transactions: Optional[List[list]] = None):
         """
-        Add or Update a stock in the portfolio.
-        Time Complexity: O(1) average case (Hash Map put).
+        Put back a persisted holding as-is (no symbol validation, no notifications).
+        Rebuilt from its ledger records when given; otherwise one buy of quantity @ buy_price.
+        """
+        if transactions is None:
+            transactions = [Transaction(BUY, quantity, buy_price, platform).to_list()]
+        self.ledgers[symbol] = Ledger.from_records(transactions)
+        self.platforms.update(platform for _, _, _, platform, _ in transactions if platform)
+        self._sync_item(symbol)
+
+    def restore_transaction(self, symbol: str, kind: str, quantity: float, price: float = 0.0,
+                            platform: str = "", ts: float = 0.0):
+        """Replay one logged transaction (no symbol validation, no notifications)."""
+        self._record(symbol, Transaction(kind, quantity, price, platform, ts), notify=False)
+
+    def restore_cost_basis(self, cost_basis: str):
+        """Put back a persisted cost-basis method (no notifications)."""
+        self.set_cost_basis(cost_basis, notify=False)
+
+    def portfolio_record(self) -> Dict[str, Any]:
+        """The persisted portfolio-wide settings: restore_cost_basis(**record) puts them back."""
+        record = {'cost_basis': self.cost_basis}
+        if self.owner is not None:
+            record['user'], record['account'] = self.owner
+        return record
+
+    def portfolio_records(self) -> Iterator[Dict[str, Any]]:
+        yield self.portfolio_record()
+
+    def holding_record(self, symbol: str) -> Dict[str, Any]:
+        """The persisted form of a holding, open or closed: restore_holding(**record) puts it back."""
+        item = self.holdings.get(symbol)
+        record = {'symbol': symbol, 'quantity': item.quantity if item else 0.0,
+                  'buy_price': item.buy_price if item else 0.0, 'platform': item.platform if item else "",
+                  'transactions': [txn.to_list() for txn in self.ledgers[symbol].transactions]}
+        if self.owner is not None:
+            record['user'], record['account'] = self.owner
+        return record
+
+    def holding_records(self) -> Iterator[Dict[str, Any]]:
+        return map(self.holding_record, list(self.ledgers))
+
+    def add_stock(self, symbol: str, quantity: float, buy_price: float, platform: str) -> bool:
+        """
+        Buy into a holding: a new lot on `platform`.
+        Time Complexity: O(1) average case (Hash Map put + ledger append).
         """
         symbol = symbol.upper()
         
@@ -40,90 +144,285 @@ class PortfolioManager:
         if not stock_data:
             return False # or raise error
 
-        # Update Platform Set (O(1))
-        self.platforms.add(platform)
-
-        # Update Holdings (Hash Map O(1))
-        if symbol in self.holdings:
-            # Update existing holding (Weighted Average Price logic could be added, but keeping simple for now)
-            # For this version, we'll just update quantity and avg buy price if user adds more
-            existing = self.holdings[symbol]
-            total_cost = (existing.quantity * existing.buy_price) + (quantity * buy_price)
-            total_qty = existing.quantity + quantity
-            avg_price = total_cost / total_qty
-            
-            existing.quantity = total_qty
-            existing.buy_price = avg_price
-            existing.platform = platform # Update platform to latest
-        else:
-            self.holdings[symbol] = PortfolioItem(
+        self._record(symbol, Transaction(BUY, quantity, buy_price, platform, time.time()))
+        return True
+
+    def sell_stock(self, symbol: str, quantity: float, price: float, platform: Optional[str] = None) -> float:
+        """
+        Sell out of a holding's lots on `platform` (optional when only one platform holds it),
+        closing lots per the cost basis. Returns the realized P/L of this sale.
+        Raises ValueError for an unknown holding, an ambiguous platform or an oversell.
+        """
+        symbol = symbol.upper()
+        ledger = self.ledgers.get(symbol)
+        if ledger is None:
+            raise ValueError(f"No holding of {symbol}")
+        if platform is None:
+            if len(ledger.open) != 1:
+                raise ValueError(f"{symbol} is held on {sorted(ledger.open)}: specify the platform")
+            platform = next(iter(ledger.open))
+        realized = self.holdings[symbol].realized_pl
+        self._record(symbol, Transaction(SELL, quantity, price, platform, time.time()))
+        item = self.holdings.get(symbol) # gone once the sale closes the position
+        return (item.realized_pl if item else self.closed_realized[symbol]) - realized
+
+    def split_stock(self, symbol: str, ratio: float) -> bool:
+        """Apply a stock split (ratio 2 = 2-for-1) to every lot of the holding."""
+        symbol = symbol.upper()
+        if symbol not in self.ledgers:
+            return False
+        self._record(symbol, Transaction(SPLIT, ratio, ts=time.time()))
+        return True
+
+    def set_cost_basis(self, method: str, notify: bool = True):
+        """Switch the cost-basis method; each holding replays from its ledger checkpoints."""
+        if method not in COST_BASIS_METHODS:
+            raise ValueError(f"Unknown cost basis '{method}', expected one of {list(COST_BASIS_METHODS)}")
+        if method == self.cost_basis:
+            return
+        self.cost_basis = method
+        for symbol in self.ledgers:
+            self._sync_item(symbol)
+        if notify:
+            for listener in self.listeners:
+                listener.on_cost_basis_changed(self)
+
+    def get_ledger(self, symbol: str, upto: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """A holding's transactions and its position under every cost basis (after `upto` transactions)."""
+        ledger = self.ledgers.get(symbol.upper())
+        if ledger is None:
+            return None
+        positions = {}
+        for method in COST_BASIS_METHODS:
+            position = ledger.position(method, upto)
+            positions[method] = {
+                "quantity": position.quantity,
+                "cost": position.cost,
+                "realized_pl": position.realized,
+                "lots": {platform: [list(lot) for lot in lots] for platform, lots in position.lots.items()},
+            }
+        return {"symbol": symbol.upper(), "cost_basis": self.cost_basis,
+                "transactions": [asdict(txn) for txn in ledger.transactions], "positions": positions}
+
+    def _record(self, symbol: str, txn: Transaction, notify: bool = True):
+        ledger = self.ledgers.get(symbol)
+        if ledger is None:
+            if txn.kind != BUY:
+                raise ValueError(f"No holding of {symbol}")
+            ledger = Ledger()
+        ledger.append(txn) # validates before anything changes
+        self.ledgers[symbol] = ledger
+        if txn.platform:
+            # Update Platform Set (O(1))
+            self.platforms.add(txn.platform)
+        self._sync_item(symbol)
+        if notify:
+            for listener in self.listeners:
+                listener.on_transaction(self, symbol, txn)
+
+    def _sync_item(self, symbol: str):
+        """Re-derive a holding from its ledger and move the aggregates by the change."""
+        position = self.ledgers[symbol].position(self.cost_basis)
+        quantities = position.platform_quantities()
+        quantity = sum(quantities.values())
+        buy_price = position.cost / quantity if quantity else 0.0
+        item = self.holdings.get(symbol)
+        if not quantities:
+            # Closed: no longer a holding, but its realized P/L stays in the totals
+            if item is not None:
+                del self.holdings[symbol]
+                self._account(item, -1)
+                self._untrack(item)
+            self.realized_pl += position.realized - self.closed_realized.get(symbol, 0.0)
+            self.closed_realized[symbol] = position.realized
+            return
+        if item is None:
+            self.realized_pl -= self.closed_realized.pop(symbol, 0.0) # reopened: carried by the holding again
+            item = self.holdings[symbol] = PortfolioItem(
                 symbol=symbol,
                 quantity=quantity,
                 buy_price=buy_price,
-                platform=platform
+                platform=max(quantities, key=quantities.get) if quantities else "",
+                realized_pl=position.realized,
+                platform_quantities=quantities
             )
-        return True
+            self._account(item, 1)
+            self._track(item)
+            return
+        self._account(item, -1)
+        item.quantity = quantity
+        item.buy_price = buy_price
+        if quantities:
+            item.platform = max(quantities, key=quantities.get)
+        item.platform_quantities = quantities
+        item.realized_pl = position.realized
+        self._account(item, 1)
+        stock = self.storage.get_stock(symbol)
+        if stock:
+            self._refresh(item, stock)
+
+    # --- Incremental market data ---
 
-    def _update_market_data(self):
+    def _track(self, item: PortfolioItem):
+        """A new holding: index it in the book and start following its stock."""
+        if self.book is not None:
+            self.book._track(item.symbol, self)
+        if self.risk_model is not None:
+            self.risk_model.add_symbols([item.symbol])
+        self._hold(item)
+
+    def _hold(self, item: PortfolioItem):
+        """Mark the holding's row as held and bring the holding up to date."""
+        row = self.storage.get_row(item.symbol)
+        if row is not None:
+            self.holders[row] += 1
+            self._refresh(item, self.storage.stocks_list[row])
+
+    def _untrack(self, item: PortfolioItem):
+        """A closed holding: drop it from the book's index and stop following its stock."""
+        if self.book is not None:
+            self.book._untrack(item.symbol, self)
+        self._release(item.symbol)
+
+    def _release(self, symbol: str):
+        row = self.storage.get_row(symbol)
+        if row is not None:
+            self.holders[row] -= 1
+
+    def _refresh(self, item: PortfolioItem, stock: Stock):
+        self._quote(item, stock.price, stock.volatility, stock.sector)
+
+    def _quote(self, item: PortfolioItem, price: float, volatility: float, sector: str):
         """
-        Internal helper to sync holdings with latest market data.
+        Sync one holding with its stock's quote and move the aggregates by the difference.
+        Time Complexity: O(1).
+        """
+        if item.sector != sector:
+            # First sync (or a sector change): re-file the holding under its sector.
+            self._account(item, -1)
+            self._set_quote(item, price, volatility, sector)
+            self._account(item, 1)
+            return
+        old_price, old_value, old_volatility = item.current_price, item.current_value, item.volatility
+        self._set_quote(item, price, volatility, sector)
+        delta = item.current_value - old_value
+        self.current_value += delta
+        self.volatility_sum += item.volatility - old_volatility
+        self.sector_values[sector] += delta
+        change = price - old_price
+        for platform, quantity in item.platform_quantities.items():
+            self.platform_values[platform] += quantity * change
+
+    @staticmethod
+    def _set_quote(item: PortfolioItem, price: float, volatility: float, sector: str):
+        item.current_price = price
+        item.current_value = item.quantity * price
+        item.profit_loss = item.current_value - (item.quantity * item.buy_price)
+        if item.buy_price > 0:
+            item.profit_loss_pct = (item.profit_loss / (item.quantity * item.buy_price)) * 100
+        item.volatility = volatility
+        item.sector = sector
+
+    def _account(self, item: PortfolioItem, sign: int):
+        """Add (sign=1) or take out (sign=-1) one holding's share of the aggregates."""
+        self.total_investment += sign * item.quantity * item.buy_price
+        self.current_value += sign * item.current_value
+        self.volatility_sum += sign * item.volatility
+        self.realized_pl += sign * item.realized_pl
+        for platform, quantity in item.platform_quantities.items():
+            self._bump(self.platform_values, self._platform_counts, platform, sign * quantity * item.current_price, sign)
+        self._bump(self.sector_values, self._sector_counts, item.sector, sign * item.current_value, sign)
+        if not self.holdings:
+            # No open holdings left: clear the float residue (realized P/L outlives its holdings)
+            self.total_investment = self.current_value = self.volatility_sum = 0.0
+
+    @staticmethod
+    def _bump(values: Dict[str, float], counts: Counter, key: str, delta: float, count: int):
+        counts[key] += count
+        if counts[key]:
+            values[key] = values.get(key, 0.0) + delta
+        else:
+            # Last holding gone: drop the key rather than keep a float residue.
+            del counts[key]
+            values.pop(key, None)
+
+    def resync(self):
+        """
+        Full resync of every holding and a rebuild of the aggregates from scratch.
+        Ticks keep them current; this only clears the float drift their deltas accumulate
+        (PortfolioBook.resync runs it for the app's periodic sweep). Call under the write lock.
         Time Complexity: O(N) where N is number of holdings.
         """
+        self.total_investment = self.current_value = self.volatility_sum = 0.0
+        self.realized_pl = sum(self.closed_realized.values())
+        self.platform_values.clear()
+        self.sector_values.clear()
+        self._platform_counts.clear()
+        self._sector_counts.clear()
         for symbol, item in self.holdings.items():
+            self._account(item, 1)
             stock = self.storage.get_stock(symbol)
             if stock:
-                item.current_price = stock.price
-                item.current_value = item.quantity * stock.price
-                item.profit_loss = item.current_value - (item.quantity * item.buy_price)
-                if item.buy_price > 0:
-                    item.profit_loss_pct = (item.profit_loss / (item.quantity * item.buy_price)) * 100
-                item.volatility = stock.volatility
-                item.sector = stock.sector
+                self._refresh(item, stock)
+
+    # --- Storage events ---
+
+    def on_prices_updated(self, rows, old_prices):
+        held = rows[self.holders[rows] > 0]
+        if not len(held):
+            return
+        stocks_list = self.storage.stocks_list
+        for row in held.tolist():
+            stock = stocks_list[row]
+            item = self.holdings.get(stock.symbol)
+            if item is not None:
+                self._refresh(item, stock)
+
+    def on_field_changed(self, row: int, field: str, old_value):
+        if field in ('price', 'volatility') and self.holders[row] > 0:
+            stock = self.storage.stocks_list[row]
+            item = self.holdings.get(stock.symbol)
+            if item is not None:
+                self._refresh(item, stock)
+
+    def on_stock_added(self, stock: Stock):
+        # A held symbol coming back (the holding kept its last values while it was gone).
+        item = self.holdings.get(stock.symbol)
+        if item is not None:
+            self._hold(item)
 
     def get_portfolio_stats(self) -> Dict[str, Any]:
         """
         Calculate aggregate portfolio statistics.
-        Time Complexity: O(N) linear scan.
+        Time Complexity: O(1), read off the maintained totals.
         """
-        self._update_market_data()
-        
-        total_investment = 0.0
-        current_value = 0.0
-        total_pl = 0.0
-        
-        for item in self.holdings.values():
-            total_investment += item.quantity * item.buy_price
-            current_value += item.current_value
-            total_pl += item.profit_loss
-            
+        total_investment = self.total_investment
+        current_value = self.current_value
+        total_pl = current_value - total_investment
+
         return {
             "total_investment": total_investment,
             "current_value": current_value,
             "total_pl": total_pl,
             "total_pl_pct": (total_pl / total_investment * 100) if total_investment > 0 else 0,
+            "realized_pl": self.realized_pl,
+            "cost_basis": self.cost_basis,
             "platform_count": len(self.platforms)
         }
 
     def get_platform_distribution(self) -> Dict[str, float]:
         """
         Get value distribution by platform.
-        Time Complexity: O(N).
+        Time Complexity: O(P) for P platforms.
         """
-        dist = defaultdict(float)
-        for item in self.holdings.values():
-            dist[item.platform] += item.current_value
-        return dict(dist)
+        return dict(self.platform_values)
 
     def get_sector_distribution(self) -> Dict[str, float]:
         """
         Get value distribution by sector.
-        Time Complexity: O(N).
+        Time Complexity: O(S) for S sectors.
         """
-        self._update_market_data()
-        dist = defaultdict(float)
-        for item in self.holdings.values():
-            dist[item.sector] += item.current_value
-        return dict(dist)
+        return dict(self.sector_values)
 
     def get_top_k_holdings(self, k: int, criteria: str = 'profit') -> List[Dict]:
         """
@@ -131,7 +430,6 @@ class PortfolioManager:
         Time Complexity: O(N + K log N) using heapq.nlargest.
         Criteria: 'profit', 'risk' (volatility), 'score' (composite).
         """
-        self._update_market_data()
         items = list(self.holdings.values())
         
         if not items:
@@ -190,20 +488,59 @@ class PortfolioManager:
         diversity_score = min(20, platform_count * 7) # Cap at 20
         
         # 3. Risk Score ( Inverse of Average Volatility )
-        total_vol = sum(self.holdings[s].volatility for s in self.holdings)
+        total_vol = self.volatility_sum
         avg_vol = total_vol / len(self.holdings) if self.holdings else 1.0
-        # Lower vol is better. If vol < 1.0, good.
-        risk_score = max(0, 40 - (avg_vol * 20))
+        report = self.get_risk_report()
+        if report is None:
+            # Lower vol is better. If vol < 1.0, good.
+            risk_score = max(0, 40 - (avg_vol * 20))
+        else:
+            # Correlation-aware (max 30): holdings that move together do not diversify each
+            # other, so the average volatility is scaled down only by the diversification ratio.
+            effective_vol = avg_vol / report['diversification_ratio']
+            volatility_score = max(0, 30 - (effective_vol * 20))
+            # Tail risk (max 10): one-tick historical CVaR as % of value; 5% or worse scores 0.
+            cvar_pct = report['cvar']['historical'] / report['value'] * 100
+            tail_score = 10 * min(1, max(0, 1 - cvar_pct / 5))
+            risk_score = volatility_score + tail_score
         
         total_score = profit_score + diversity_score + risk_score
         return min(100, round(total_score, 1))
 
+    def get_risk_report(self, confidence: float = 0.95) -> Optional[Dict]:
+        """
+        Covariance-based risk of the open holdings (see risk.risk_report); None without
+        open holdings or before the market has ticked twice.
+        Time Complexity: O(W * h^2) for h holdings over a W-tick window.
+        """
+        values = {symbol: item.current_value for symbol, item in self.holdings.items()}
+        if not values:
+            return None
+        if self.risk_model is None:
+            with _risk_lock:
+                if self.risk_model is None:
+                    self.risk_model = RiskModel(self.tick_window, self.holdings)
+        self.risk_model.sync()
+        return risk_report(self.risk_model, values, confidence)
+
+    def simulation_inputs(self) -> Optional[Tuple[List[str], np.ndarray, np.ndarray]]:
+        """
+        (symbols, position values, window log returns) of the open holdings for a Monte Carlo
+        run (see simulate.simulate); copies, so the run can happen outside the storage lock.
+        None without open holdings or ticks.
+        """
+        report = self.get_risk_report()
+        if report is None:
+            return None
+        symbols = report['symbols']
+        values = np.array([self.holdings[symbol].current_value for symbol in symbols])
+        return symbols, values, self.risk_model.window_returns(symbols)
+
     def get_all_holdings_sorted(self, sort_key='profit', ascending=False) -> List[Dict]:
         """
         Returns full list of holdings sorted by key.
         Uses Python's Timsort (Hybrid Sort).
         """
-        self._update_market_data()
         items = list(self.holdings.values())
         
         key_map = {
@@ -233,7 +570,6 @@ class PortfolioManager:
         """
         Data for Scatter Plot: X=Volatility, Y=Profit%
         """
-        self._update_market_data()
         data = []
         for item in self.holdings.values():
             data.append({
@@ -242,3 +578,120 @@ class PortfolioManager:
                 'r': 5 + (item.current_value / 1000) # Radius based on position size (scaled)
             })
         return data
+
+
+class PortfolioBook(StorageListener):
+    """
+    Every user's portfolios: one PortfolioManager per (user, account), all driven by a
+    single storage subscription.
+    symbol_index is the reverse index symbol -> portfolios holding it, so a tick refreshes
+    exactly the affected holdings and the rest of the book is never visited.
+    Time Complexity: a k-symbol tick is O(k) vectorized plus O(h) for the h holdings of
+    the ticked symbols.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.portfolios: Dict[Tuple[str, str], PortfolioManager] = {}
+        self.accounts: Dict[str, List[str]] = {} # user -> account names, in creation order
+        self.symbol_index: Dict[str, List[PortfolioManager]] = {}
+        self.listeners = [] # shared with every portfolio, see PortfolioManager.add_stock
+        storage.register_column('portfolio_holders', np.int32)
+        self.tick_window = TickWindow.of(storage) # per-tick returns shared by every risk model
+        self._empty = PortfolioManager(storage, book=self) # served for portfolios not created yet
+        self._lock = threading.Lock()
+        storage.add_listener(self)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    @property
+    def holders(self) -> np.ndarray:
+        return self.storage.portfolio_holders
+
+    def portfolio(self, user: str = DEFAULT_USER, account: str = DEFAULT_ACCOUNT) -> PortfolioManager:
+        """The (user, account) portfolio, created on first use."""
+        key = (user, account)
+        manager = self.portfolios.get(key)
+        if manager is None:
+            with self._lock:
+                manager = self.portfolios.get(key)
+                if manager is None:
+                    manager = self.portfolios[key] = PortfolioManager(self.storage, book=self, owner=key)
+                    self.accounts.setdefault(user, []).append(account)
+        return manager
+
+    def get(self, user: str = DEFAULT_USER, account: str = DEFAULT_ACCOUNT) -> PortfolioManager:
+        """Read-only access: an existing portfolio, or an empty one without creating it."""
+        manager = self.portfolios.get((user, account))
+        return self._empty if manager is None else manager
+
+    def restore_holding(self, symbol: str, quantity: float, buy_price: float, platform: str,
+                        transactions: Optional[List[list]] = None,
+                        user: str = DEFAULT_USER, account: str = DEFAULT_ACCOUNT):
+        self.portfolio(user, account).restore_holding(symbol, quantity, buy_price, platform, transactions)
+
+    def restore_transaction(self, symbol: str, kind: str, quantity: float, price: float = 0.0,
+                            platform: str = "", ts: float = 0.0,
+                            user: str = DEFAULT_USER, account: str = DEFAULT_ACCOUNT):
+        self.portfolio(user, account).restore_transaction(symbol, kind, quantity, price, platform, ts)
+
+    def restore_cost_basis(self, cost_basis: str, user: str = DEFAULT_USER, account: str = DEFAULT_ACCOUNT):
+        self.portfolio(user, account).restore_cost_basis(cost_basis)
+
+    def apply_split(self, symbol: str, ratio: float) -> int:
+        """A corporate action: split the holding in every portfolio that has it. Returns how many."""
+        managers = list(self.symbol_index.get(symbol.upper(), ()))
+        for manager in managers:
+            manager.split_stock(symbol, ratio)
+        return len(managers)
+
+    def portfolio_records(self) -> Iterator[Dict[str, Any]]:
+        for manager in list(self.portfolios.values()):
+            yield manager.portfolio_record()
+
+    def holding_records(self) -> Iterator[Dict[str, Any]]:
+        for manager in list(self.portfolios.values()):
+            yield from manager.holding_records()
+
+    def resync(self) -> int:
+        """Resync every portfolio (see PortfolioManager.resync). Returns how many."""
+        managers = list(self.portfolios.values())
+        for manager in managers:
+            manager.resync()
+        return len(managers)
+
+    def _track(self, symbol: str, manager: PortfolioManager):
+        self.symbol_index.setdefault(symbol, []).append(manager)
+
+    def _untrack(self, symbol: str, manager: PortfolioManager):
+        managers = self.symbol_index[symbol]
+        managers.remove(manager)
+        if not managers:
+            del self.symbol_index[symbol]
+
+    # --- Storage events ---
+
+    def on_prices_updated(self, rows, old_prices):
+        held = rows[self.holders[rows] > 0]
+        if not len(held):
+            return
+        storage = self.storage
+        stocks_list = storage.stocks_list
+        index = self.symbol_index
+        for row, price, volatility in zip(held.tolist(), storage.prices[held].tolist(),
+                                          storage.volatilities[held].tolist()):
+            stock = stocks_list[row]
+            symbol, sector = stock.symbol, stock.sector
+            for manager in index.get(symbol, ()):
+                manager._quote(manager.holdings[symbol], price, volatility, sector)
+
+    def on_field_changed(self, row: int, field: str, old_value):
+        if field in ('price', 'volatility') and self.holders[row] > 0:
+            stock = self.storage.stocks_list[row]
+            for manager in self.symbol_index.get(stock.symbol, ()):
+                manager._refresh(manager.holdings[stock.symbol], stock)
+
+    def on_stock_added(self, stock: Stock):
+        for manager in self.symbol_index.get(stock.symbol, ()):
+            manager._hold(manager.holdings[stock.symbol])
@@ -1,48 +1,99 @@
-import heapq
-from typing import List, Tuple
+from typing import List, Tuple, Optional
+import numpy as np
 from models import Stock
 from storage import StockStorage
 
+
+def priority_score(price, volume, volatility):
+    """Priority score formula; works on scalars or NumPy columns."""
+    return (price * 0.5) + (volume * 0.0001) - (volatility * 50)
+
+
+def _top_rows(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """
+    Positions of the k largest (or smallest) values, best first.
+    Ties keep their original order, matching heapq.nlargest / nsmallest.
+    Time Complexity: O(N + K log K) via partition instead of a full sort.
+    """
+    n = len(values)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    keyed = -values if largest else values
+    if k >= n:
+        return np.argsort(keyed, kind='stable')
+
+    kth = np.partition(keyed, k - 1)[k - 1]
+    candidates = np.flatnonzero(keyed <= kth)
+    return candidates[np.argsort(keyed[candidates], kind='stable')][:k]
+
+
+LEADERBOARD_CRITERIA = ('price', 'volume', 'score')
+
+
 class RankingManager:
-    def __init__(self, storage: StockStorage):
+    """
+    Top-K / bottom-K rankings. With `indexes` (a sorted_index.StockIndexes) the reads
+    come from its live, incrementally maintained leaderboards in O(log N + K);
+    without it they are computed from the storage columns on each call.
+    """
+
+    def __init__(self, storage: StockStorage, indexes=None):
         self.storage = storage
+        self.indexes = indexes
 
     def calculate_priority_score(self, stock: Stock) -> float:
-        return (stock.price * 0.5) + (stock.volume * 0.0001) - (stock.volatility * 50)
+        return priority_score(stock.price, stock.volume, stock.volatility)
 
-    def get_top_k_stocks(self, k: int, criteria: str = 'price') -> List[Stock]:
-        all_stocks = self.storage.get_all_stocks()
-        
+    def calculate_priority_scores(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """calculate_priority_score for every row (or `rows`) straight from the columns."""
+        scores = priority_score(self.storage.column('price'), self.storage.column('volume'),
+                                self.storage.column('volatility'))
+        return scores if rows is None else scores[rows]
+
+    def _criteria_column(self, criteria: str, rows: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
         if criteria == 'price':
-            return heapq.nlargest(k, all_stocks, key=lambda s: s.price)
+            values = self.storage.column('price')
         elif criteria == 'volume':
-            return heapq.nlargest(k, all_stocks, key=lambda s: s.volume)
+            values = self.storage.column('volume')
         elif criteria == 'score':
-             return heapq.nlargest(k, all_stocks, key=lambda s: self.calculate_priority_score(s))
+            values = self.calculate_priority_scores()
         else:
+            return None
+        return values if rows is None else values[rows]
+
+    def get_top_k_stocks(self, k: int, criteria: str = 'price') -> List[Stock]:
+        if self.indexes is not None and criteria in LEADERBOARD_CRITERIA:
+            return self.indexes.top(criteria, k)
+
+        values = self._criteria_column(criteria)
+        if values is None:
             return []
 
-    def get_bottom_k_stocks(self, k: int, criteria: str = 'price') -> List[Stock]:
         all_stocks = self.storage.get_all_stocks()
-        
-        if criteria == 'price':
-            return heapq.nsmallest(k, all_stocks, key=lambda s: s.price)
-        elif criteria == 'volume':
-            return heapq.nsmallest(k, all_stocks, key=lambda s: s.volume)
-        else:
+        return [all_stocks[row] for row in _top_rows(values, k)]
+
+    def get_bottom_k_stocks(self, k: int, criteria: str = 'price') -> List[Stock]:
+        if criteria not in ('price', 'volume'):
             return []
+        if self.indexes is not None:
+            return self.indexes.bottom(criteria, k)
+
+        values = self._criteria_column(criteria)
+        all_stocks = self.storage.get_all_stocks()
+        return [all_stocks[row] for row in _top_rows(values, k, largest=False)]
 
     def get_top_k_stocks_by_sector(self, sector: str, k: int, criteria: str = 'price') -> List[Stock]:
-        sector_stocks = self.storage.get_stocks_by_sector(sector)
-        if not sector_stocks:
+        if self.indexes is not None and criteria in LEADERBOARD_CRITERIA:
+            return self.indexes.top(criteria, k, sector)
+
+        rows = self.storage.get_sector_rows(sector)
+        if len(rows) == 0:
             return []
 
-        if criteria == 'price':
-            return heapq.nlargest(k, sector_stocks, key=lambda s: s.price)
-        elif criteria == 'volume':
-            return heapq.nlargest(k, sector_stocks, key=lambda s: s.volume)
-        elif criteria == 'score':
-             return heapq.nlargest(k, sector_stocks, key=lambda s: self.calculate_priority_score(s))
-        else:
+        values = self._criteria_column(criteria, rows)
+        if values is None:
             return []
 
+        all_stocks = self.storage.get_all_stocks()
+        return [all_stocks[rows[i]] for i in _top_rows(values, k)]
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from flask import Response, request
+
+# Headers a view may set that a cached copy must replay (the rest are recomputed by Flask).
+_SKIPPED_HEADERS = {'content-type', 'content-length'}
+
+
+class CachedResponse:
+    """A finished 200 response: its serialized body, extra headers and a content ETag."""
+    __slots__ = ('body', 'mimetype', 'headers', 'etag')
+
+    def __init__(self, body: bytes, mimetype: str, headers: List[Tuple[str, str]]):
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = headers
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()  # unquoted, as werkzeug compares it
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized read responses, keyed by (endpoint, query args, data version).
+    A data change bumps the version, so stale entries are never served; they just stop
+    being asked for and age out. Bounded by entry count and total body bytes; a body
+    larger than max_bytes / 4 is served but not kept.
+    Clients revalidate with If-None-Match and get 304 when nothing changed.
+    Time Complexity: lookup / insert O(1); eviction O(1) per evicted entry.
+    """
+
+    def __init__(self, version: Callable[[], int], max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.version = version
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+            self.entries[key] = entry
+            self.size += len(entry.body)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+            }
+
+    def cached(self, view):
+        """
+        Decorator for a GET view whose output depends only on its query args and the data
+        version. Run it inside the read lock so the version matches the data it was built from.
+        """
+        @wraps(view)
+        def decorated_function(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), self.version())
+            entry = self.get(key)
+            if entry is None:
+                response = view(*args, **kwargs)
+                if not isinstance(response, Response) or response.status_code != 200:
+                    return response
+                entry = CachedResponse(response.get_data(), response.mimetype,
+                                       [(k, v) for k, v in response.headers.items()
+                                        if k.lower() not in _SKIPPED_HEADERS])
+                self.put(key, entry)
+                state = 'MISS'
+            else:
+                state = 'HIT'
+
+            if request.if_none_match.contains(entry.etag):
+                with self._lock:
+                    self.not_modified += 1
+                response = Response(status=304)
+            else:
+                response = Response(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+            response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = 'no-cache'  # always revalidate; 304 when unchanged
+            response.headers['X-Cache'] = state
+            return response
+        return decorated_function
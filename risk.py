@@ -0,0 +1,262 @@
+import threading
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from models import HISTORY_LENGTH
+from storage import StockStorage, StorageListener
+
+
+class TickWindow(StorageListener):
+    """
+    The market's last `window` ticks as log returns: one observation per price tick, in
+    which every stock that did not move has a zero return, plus the equal-weighted market
+    return of the tick.
+    Returns live in per-row storage columns, each slot stamped with the tick that wrote it,
+    so rows keep their window through deletes and growth, a tick writes only the rows it
+    moved, and any symbol's window is on hand the moment a portfolio starts tracking it.
+    The window starts empty and fills as the market ticks. Stored price histories are not
+    used: each stock appends to its own history when it changes, so their right-aligned
+    entries are not observations of the same moments.
+    One instance per storage (TickWindow.of) serves every risk model on it.
+    Time Complexity: O(k) per k-symbol tick; window_returns O(window * h) for h rows.
+    """
+
+    def __init__(self, storage: StockStorage, window: int = HISTORY_LENGTH - 1):
+        if not 2 <= window < HISTORY_LENGTH:
+            raise ValueError(f"window must be between 2 and {HISTORY_LENGTH - 1} returns")
+        self.storage = storage
+        self.window = window
+        self.steps = 0 # ticks seen; tick t (1-based) writes slot (t - 1) % window
+        self.market = np.zeros(window)
+        storage.register_column('tick_window_returns', np.float64, (window,))
+        storage.register_column('tick_window_stamps', np.int64, (window,)) # tick that wrote the slot, 0 = none
+        storage.add_listener(self)
+
+    @classmethod
+    def of(cls, storage: StockStorage) -> 'TickWindow':
+        """The storage's shared window, created on first use (takes the write lock to subscribe)."""
+        window = getattr(storage, 'tick_window', None)
+        if window is None:
+            window = storage.tick_window = cls(storage)
+        return window
+
+    def on_prices_updated(self, rows, old_prices):
+        storage = self.storage
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_returns = np.log(storage.prices[rows] / old_prices)
+        log_returns[~np.isfinite(log_returns)] = 0.0
+        slot = self.steps % self.window
+        self.steps += 1
+        storage.tick_window_returns[rows, slot] = log_returns
+        storage.tick_window_stamps[rows, slot] = self.steps
+        self.market[slot] = log_returns.sum() / max(1, len(storage.stocks_list))
+
+    def observations(self, rows: List[Optional[int]], last: Optional[int] = None) -> np.ndarray:
+        """
+        (n x len(rows)+1) returns of the last n ticks (the whole window by default), oldest
+        first, market last. A row of None (a stock no longer stored) has zero returns.
+        """
+        n = min(self.steps, self.window) if last is None else min(last, self.steps, self.window)
+        ticks = np.arange(self.steps - n + 1, self.steps + 1)
+        slots = (ticks - 1) % self.window
+        out = np.zeros((n, len(rows) + 1))
+        present = [i for i, row in enumerate(rows) if row is not None]
+        if n and present:
+            picked = np.array([rows[i] for i in present], dtype=np.intp)[:, None]
+            storage = self.storage
+            fresh = storage.tick_window_stamps[picked, slots] == ticks
+            out[:, present] = np.where(fresh, storage.tick_window_returns[picked, slots], 0.0).T
+        out[:, -1] = self.market[slots]
+        return out
+
+
+class RiskModel:
+    """
+    Rolling covariance of per-tick log returns over a set of symbols plus the market
+    return (the last column, for betas), over a shared TickWindow.
+    The model keeps its own window of observations with running sums and cross-products.
+    sync() takes in the ticks since the last read by low-rank corrections (adding the new
+    observations, subtracting the ones they replace) instead of recomputing, or rebuilds
+    once it is half a window behind; once per window the sums are recomputed exactly,
+    which clears rounding.
+    Nothing runs per tick: ticks only touch the TickWindow, and a model catches up when
+    it is read. A symbol added later gets its column from the window, and the existing
+    sums and cross-products are left as they are.
+    Time Complexity: sync O(ticks behind * m^2) for m symbols, at most O(window * m^2 / 2);
+    add_symbols O(window * m) per symbol.
+    """
+
+    def __init__(self, ticks: TickWindow, symbols: Iterable[str] = ()):
+        self.ticks = ticks
+        self.storage = ticks.storage
+        self.window = ticks.window
+        self.symbols: List[str] = list(dict.fromkeys(symbols))
+        self.index: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._lock = threading.Lock() # readers under the storage read lock may sync concurrently
+        self._rebuild()
+
+    def add_symbols(self, symbols: Iterable[str]):
+        """Track more symbols over the current window; existing columns are kept as they are."""
+        with self._lock:
+            new = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.index]
+            if not new:
+                return
+            self._sync()
+            m, q = len(self.symbols), len(new)
+            keep = [*range(m), m + q] # old columns in the new layout (market stays last)
+            returns = np.zeros((self.window, m + q + 1))
+            returns[:, keep] = self.returns
+            slots = self._slots()
+            returns[slots, m:m + q] = self.ticks.observations(self._rows(new), self.count)[:, :q]
+            valid = returns[slots]
+            sums = np.empty(m + q + 1)
+            cross = np.empty((m + q + 1, m + q + 1))
+            sums[keep] = self.sums
+            cross[np.ix_(keep, keep)] = self.cross
+            added = valid[:, m:m + q]
+            sums[m:m + q] = added.sum(axis=0)
+            block = added.T @ valid
+            cross[m:m + q, :] = block
+            cross[:, m:m + q] = block.T
+            self.returns, self.sums, self.cross = returns, sums, cross
+            self.symbols.extend(new)
+            self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def sync(self):
+        """Take in the ticks since the last sync. Call before reading (under the storage read lock)."""
+        with self._lock:
+            self._sync()
+
+    # --- Window maintenance ---
+
+    def _rows(self, symbols: Iterable[str]) -> List[Optional[int]]:
+        return [self.storage.get_row(symbol) for symbol in symbols]
+
+    def _sync(self):
+        behind = self.ticks.steps - self.synced
+        if 2 * behind >= self.window: # the corrections would cost more than a rebuild
+            self._rebuild()
+        elif behind:
+            self._push(self.ticks.observations(self._rows(self.symbols), behind))
+            self.synced = self.ticks.steps
+
+    def _rebuild(self):
+        valid = self.ticks.observations(self._rows(self.symbols))
+        self.count = len(valid)
+        self.returns = np.zeros((self.window, len(self.symbols) + 1))
+        self.returns[:self.count] = valid # oldest first in slots [0, count)
+        self.head = self.count % self.window # next slot to write
+        self.steps = 0
+        self.synced = self.ticks.steps
+        self._recompute()
+
+    def _slots(self) -> np.ndarray:
+        """Buffer slots of the observations in the window, oldest first."""
+        if self.count < self.window:
+            return np.arange(self.count)
+        return (np.arange(self.window) + self.head) % self.window
+
+    def _valid(self) -> np.ndarray:
+        """Observations in the window, oldest first."""
+        return self.returns[self._slots()]
+
+    def _recompute(self):
+        valid = self._valid()
+        self.sums = valid.sum(axis=0)
+        self.cross = valid.T @ valid
+
+    def _push(self, observations: np.ndarray):
+        """Append n < window observations, replacing the oldest once the window is full."""
+        n = len(observations)
+        slots = (self.head + np.arange(n)) % self.window
+        old = self.returns[slots[slots < self.count]] # the observations they replace
+        self.sums += observations.sum(axis=0) - old.sum(axis=0)
+        self.cross += observations.T @ observations - old.T @ old
+        self.returns[slots] = observations
+        self.count = min(self.window, self.count + n)
+        self.head = (self.head + n) % self.window
+        self.steps += n
+        if self.steps >= self.window:
+            self._recompute()
+            self.steps = 0
+
+    # --- Reads ---
+
+    def covariance(self) -> np.ndarray:
+        """(m+1 x m+1) sample covariance of the window, market last."""
+        n = self.count
+        if n < 2:
+            return np.zeros_like(self.cross)
+        return (self.cross - np.outer(self.sums, self.sums) / n) / (n - 1)
+
+    def mean(self) -> np.ndarray:
+        return self.sums / self.count if self.count else np.zeros_like(self.sums)
+
+    def window_returns(self, symbols: Iterable[str]) -> np.ndarray:
+        """(count x len(symbols)) log returns in the window, oldest first (a copy)."""
+        return self._valid()[:, [self.index[symbol] for symbol in symbols]]
+
+
+def risk_report(model: RiskModel, values: Dict[str, float], confidence: float = 0.95) -> Optional[Dict]:
+    """
+    Risk of holding `values` (symbol -> position value) over one tick, from the model's window.
+    Volatility is of the portfolio return; VaR / CVaR are losses in value at `confidence`,
+    historical (the window's own P/L) and parametric (normal). Each holding gets its beta
+    to the market and its marginal and component contribution to portfolio volatility
+    (the components sum to it).
+    Returns None when there is nothing to measure (no value or fewer than 2 observations).
+    Time Complexity: O(window * h^2) for h holdings.
+    """
+    symbols = [symbol for symbol, value in values.items() if symbol in model.index and value > 0]
+    if not symbols or model.count < 2:
+        return None
+    positions = np.array([values[symbol] for symbol in symbols], dtype=np.float64)
+    total = positions.sum()
+    weights = positions / total
+    columns = np.array([model.index[symbol] for symbol in symbols], dtype=np.intp)
+    market = len(model.symbols)
+
+    full = model.covariance()
+    cov = full[np.ix_(columns, columns)]
+    volatility = float(np.sqrt(max(weights @ cov @ weights, 0.0)))
+    stds = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = np.where(np.outer(stds, stds) > 0, cov / np.outer(stds, stds), 0.0)
+        marginal = cov @ weights / volatility if volatility > 0 else np.zeros(len(symbols))
+    np.fill_diagonal(correlation, 1.0)
+    contribution = weights * marginal
+    market_variance = full[market, market]
+    betas = full[columns, market] / market_variance if market_variance > 0 else np.zeros(len(symbols))
+
+    alpha = 1.0 - confidence
+    pnl = np.expm1(model.window_returns(symbols)) @ positions
+    historical_var = float(-np.quantile(pnl, alpha))
+    tail = pnl[pnl <= -historical_var]
+    historical_cvar = float(-tail.mean()) if len(tail) else historical_var
+
+    normal = NormalDist()
+    z = normal.inv_cdf(alpha)
+    mean = float(weights @ model.mean()[columns])
+    parametric_var = -(mean + z * volatility) * total
+    parametric_cvar = -(mean - volatility * normal.pdf(z) / alpha) * total
+
+    return {
+        "confidence": confidence,
+        "observations": model.count,
+        "value": float(total),
+        "volatility": volatility,
+        "beta": float(weights @ betas),
+        "diversification_ratio": float(weights @ stds / volatility) if volatility > 0 else 1.0,
+        "var": {"historical": historical_var, "parametric": parametric_var},
+        "cvar": {"historical": historical_cvar, "parametric": parametric_cvar},
+        "symbols": symbols,
+        "correlation": correlation.tolist(),
+        "holdings": [
+            {"symbol": symbol, "weight": w, "volatility": s, "beta": b, "marginal": mc,
+             "contribution": c, "contribution_pct": c / volatility * 100 if volatility > 0 else 0.0}
+            for symbol, w, s, b, mc, c in zip(symbols, weights.tolist(), stds.tolist(), betas.tolist(),
+                                                marginal.tolist(), contribution.tolist())
+        ],
+    }
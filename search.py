@@ -1,13 +1,222 @@
-from typing import List
+import heapq
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from sortedcontainers import SortedList
 from models import Stock
-from storage import StockStorage
+from storage import StockStorage, StorageListener
+
+GRAM = 3
+SYMBOL, NAME, SECTOR = 0, 1, 2
+ALL_FIELDS = (SYMBOL, NAME, SECTOR)
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class SearchIndex(StorageListener):
+    """
+    Inverted trigram index over lowercase symbol and name, a sector -> members map,
+    and sorted symbol / name lists for prefix lookups; maintained on add_stock / delete_stock.
+    A query of 3+ characters intersects the posting sets of its trigrams (smallest first)
+    and verifies the candidates with a substring check, so it matches exactly what the
+    linear scan would. Shorter queries match most of the universe anyway and walk the
+    storage rows against the pre-lowercased text.
+    Results come back in storage order, like the scan.
+    """
 
-class SearchManager:
     def __init__(self, storage: StockStorage):
         self.storage = storage
+        self.text: Dict[str, Tuple[str, str, str]] = {}  # symbol -> (symbol, name, sector) lowercased
+        self.postings: Tuple[Dict[str, Set[str]], Dict[str, Set[str]]] = ({}, {})  # symbol / name trigrams
+        self.sector_members: Dict[str, Set[str]] = {}
+        self.exact_symbols: Dict[str, Set[str]] = {}
+        self.symbol_prefixes = SortedList()  # (lowercase symbol, symbol)
+        self.name_prefixes = SortedList()  # (lowercase name, symbol)
+
+        for stock in storage.get_all_stocks():
+            self.on_stock_added(stock)
+        storage.add_listener(self)
+
+    # --- Storage events ---
+
+    def on_stock_added(self, stock: Stock):
+        symbol = stock.symbol
+        text = (symbol.lower(), stock.name.lower(), stock.sector.lower())
+        self.text[symbol] = text
+
+        for postings, field in zip(self.postings, text):
+            for gram in _grams(field):
+                postings.setdefault(gram, set()).add(symbol)
+        self.sector_members.setdefault(text[SECTOR], set()).add(symbol)
+        self.exact_symbols.setdefault(text[SYMBOL], set()).add(symbol)
+        self.symbol_prefixes.add((text[SYMBOL], symbol))
+        self.name_prefixes.add((text[NAME], symbol))
+
+    def on_stock_removed(self, stock: Stock):
+        symbol = stock.symbol
+        text = self.text.pop(symbol)
+
+        for postings, field in zip(self.postings, text):
+            for gram in _grams(field):
+                members = postings[gram]
+                members.discard(symbol)
+                if not members:
+                    del postings[gram]
+        for mapping, key in ((self.sector_members, text[SECTOR]), (self.exact_symbols, text[SYMBOL])):
+            mapping[key].discard(symbol)
+            if not mapping[key]:
+                del mapping[key]
+        self.symbol_prefixes.remove((text[SYMBOL], symbol))
+        self.name_prefixes.remove((text[NAME], symbol))
+
+    # --- Substring lookups ---
+
+    def search(self, query: str, fields: Sequence[int] = ALL_FIELDS) -> List[Stock]:
+        """Stocks whose lowercase `fields` contain the lowercase `query`, in storage order."""
+        if len(query) < GRAM:
+            text = self.text
+            if len(fields) == 1:
+                field = fields[0]
+                return [stock for stock in self.storage.stocks_list if query in text[stock.symbol][field]]
+            if tuple(fields) != ALL_FIELDS:
+                return [stock for stock in self.storage.stocks_list
+                        if any(query in text[stock.symbol][field] for field in fields)]
+            results = []
+            for stock in self.storage.stocks_list:
+                lsym, lname, lsector = text[stock.symbol]
+                if query in lsym or query in lname or query in lsector:
+                    results.append(stock)
+            return results
+        return self._in_storage_order(self.matches(query, fields))
+
+    def matches(self, query: str, fields: Sequence[int] = ALL_FIELDS) -> Set[str]:
+        """Unordered symbols whose lowercase `fields` contain the lowercase `query`."""
+        if len(query) < GRAM:
+            return {symbol for symbol, text in self.text.items()
+                    if any(query in text[field] for field in fields)}
+
+        result: Set[str] = set()
+        for field in fields:
+            if field == SECTOR:
+                for sector, members in self.sector_members.items():
+                    if query in sector:
+                        result |= members
+            else:
+                result |= self._gram_matches(query, field)
+        return result
+
+    def _gram_matches(self, query: str, field: int) -> Set[str]:
+        postings = self.postings[field]
+        posting_sets = []
+        for gram in _grams(query):
+            members = postings.get(gram)
+            if not members:
+                return set()
+            posting_sets.append(members)
+        posting_sets.sort(key=len)
+        candidates = posting_sets[0].intersection(*posting_sets[1:])
+        if len(query) == GRAM:
+            return candidates
+        return {symbol for symbol in candidates if query in self.text[symbol][field]}
+
+    def _in_storage_order(self, symbols: Set[str]) -> List[Stock]:
+        stocks_list = self.storage.stocks_list
+        if len(symbols) * 8 > len(stocks_list):
+            # Most of the universe: one pass over the rows beats sorting.
+            return [stock for stock in stocks_list if stock.symbol in symbols]
+        return [stocks_list[row] for row in sorted(self.storage.row_index[symbol] for symbol in symbols)]
+
+    # --- Ranked lookups ---
+
+    def tier(self, symbol: str, query: str) -> Optional[int]:
+        """0 exact symbol, 1 symbol prefix, 2 name / sector prefix, 3 substring, None no match."""
+        lsym, lname, lsector = self.text[symbol]
+        if lsym == query:
+            return 0
+        if lsym.startswith(query):
+            return 1
+        if lname.startswith(query) or lsector.startswith(query):
+            return 2
+        if query in lsym or query in lname or query in lsector:
+            return 3
+        return None
+
+    def ranked(self, query: str, limit: Optional[int] = None) -> List[Stock]:
+        """
+        Stocks matching `query` anywhere, best tier first and storage order within a tier.
+        With a limit, tiers are filled in order and later tiers are never computed once
+        the page is full, so a prefix query costs O(log N + k) instead of a full match.
+        """
+        row_of = self.storage.row_index.__getitem__
+        stocks_list = self.storage.stocks_list
+        if limit is None:
+            symbols = sorted(self.matches(query), key=lambda s: (self.tier(s, query), row_of(s)))
+            return [stocks_list[row_of(symbol)] for symbol in symbols]
+
+        symbols: List[str] = []
+        for tier, size, members in self._tiers(query):
+            if len(symbols) >= limit:
+                break
+            symbols.extend(self._first_of_tier(tier, query, size, members, limit - len(symbols)))
+        return [stocks_list[row_of(symbol)] for symbol in symbols]
+
+    def _tiers(self, query: str) -> Iterator[Tuple[int, int, Callable[[], Iterable[str]]]]:
+        """(tier, size upper bound, candidate generator), computed lazily one tier at a time."""
+        exact = self.exact_symbols.get(query, set())
+        yield 0, len(exact), lambda: exact
+
+        yield (1,) + self._prefix_range(self.symbol_prefixes, query)
+
+        name_size, name_members = self._prefix_range(self.name_prefixes, query)
+        sectors = [members for sector, members in self.sector_members.items() if sector.startswith(query)]
+        yield 2, name_size + sum(map(len, sectors)), lambda: _chain(name_members(), *sectors)
+
+        if len(query) < GRAM:
+            yield 3, len(self.text), lambda: self.text
+        else:
+            found = self.matches(query)
+            yield 3, len(found), lambda: found
+
+    @staticmethod
+    def _prefix_range(prefixes: SortedList, query: str) -> Tuple[int, Callable[[], Iterable[str]]]:
+        start = prefixes.bisect_left((query,))
+        stop = prefixes.bisect_left((query + '\uffff',))
+        return stop - start, lambda: (symbol for _, symbol in prefixes.islice(start, stop))
+
+    def _first_of_tier(self, tier: int, query: str, size: int, members: Callable[[], Iterable[str]],
+                       limit: int) -> List[str]:
+        """
+        The first `limit` symbols of a tier in storage order.
+        A dense tier is found by walking the rows (about limit * N / size steps);
+        a sparse one by a bounded heap over its candidates (size steps).
+        """
+        if size * size > limit * len(self.text):
+            found = []
+            for stock in self.storage.stocks_list:
+                if self.tier(stock.symbol, query) == tier:
+                    found.append(stock.symbol)
+                    if len(found) == limit:
+                        break
+            return found
+        candidates = {symbol for symbol in members() if self.tier(symbol, query) == tier}
+        return heapq.nsmallest(limit, candidates, key=self.storage.row_index.__getitem__)
+
+
+def _chain(*iterables: Iterable[str]) -> Iterator[str]:
+    for iterable in iterables:
+        yield from iterable
+
+
+class SearchManager:
+    def __init__(self, storage: StockStorage, use_index: bool = True):
+        self.storage = storage
+        self.index = SearchIndex(storage) if use_index else None
 
     def search_by_name(self, query: str) -> List[Stock]:
         query = query.lower()
+        if self.index is not None:
+            return self.index.search(query, (NAME,))
+
         results = []
         for stock in self.storage.get_all_stocks():
             if query in stock.name.lower():
@@ -16,6 +225,10 @@ class SearchManager:
 
     def search_by_symbol(self, query: str) -> List[Stock]:
         query = query.upper()
+        if self.index is not None:
+            # Candidates from the lowercase index, then the original case-sensitive check.
+            return [stock for stock in self.index.search(query.lower(), (SYMBOL,)) if query in stock.symbol]
+
         results = []
         for stock in self.storage.get_all_stocks():
             if query in stock.symbol:
@@ -24,16 +237,28 @@ class SearchManager:
 
     def composite_search(self, query: str) -> List[Stock]:
         query_lower = query.lower()
+        if self.index is not None:
+            return self.index.search(query_lower)
+
         results = []
         seen_symbols = set()
-        
+
         for stock in self.storage.get_all_stocks():
-            if (query_lower in stock.symbol.lower() or 
-                query_lower in stock.name.lower() or 
+            if (query_lower in stock.symbol.lower() or
+                query_lower in stock.name.lower() or
                 query_lower in stock.sector.lower()):
-                
+
                 if stock.symbol not in seen_symbols:
                     results.append(stock)
                     seen_symbols.add(stock.symbol)
-        
+
         return results
+
+    def ranked_search(self, query: str, limit: Optional[int] = None) -> List[Stock]:
+        """
+        composite_search matches ranked exact symbol > symbol prefix > name / sector prefix
+        > substring (storage order within a rank), optionally capped at `limit`.
+        """
+        if self.index is None:
+            self.index = SearchIndex(self.storage)
+        return self.index.ranked(query.lower(), limit)
@@ -1,38 +1,173 @@
+from dataclasses import dataclass, field
 from typing import List, Dict
+import numpy as np
+from sortedcontainers import SortedList
 from models import Stock
-from storage import StockStorage
+from storage import StockStorage, StorageListener
+
+
+@dataclass
+class SectorAggregate:
+    """
+    Running statistics for one sector.
+    Price mean / variance use Welford's update (and its inverse for removals), so they
+    stay accurate without re-summing; min / max come from a sorted list of prices.
+    Time Complexity: add / remove / price change O(log n) for the sorted prices, O(1) otherwise.
+    """
+    count: int = 0
+    price_mean: float = 0.0
+    price_m2: float = 0.0  # sum of squared deviations from the mean
+    volume_sum: int = 0
+    volatility_sum: float = 0.0
+    prices: SortedList = field(default_factory=SortedList)
+
+    def add(self, price: float, volume: int, volatility: float):
+        self._add_price(price)
+        self.volume_sum += volume
+        self.volatility_sum += volatility
+
+    def remove(self, price: float, volume: int, volatility: float):
+        self._remove_price(price)
+        self.volume_sum -= volume
+        self.volatility_sum -= volatility
+
+    def replace_price(self, old_price: float, new_price: float):
+        self._remove_price(old_price)
+        self._add_price(new_price)
+
+    def _add_price(self, price: float):
+        self.count += 1
+        delta = price - self.price_mean
+        self.price_mean += delta / self.count
+        self.price_m2 += delta * (price - self.price_mean)
+        self.prices.add(price)
+
+    def _remove_price(self, price: float):
+        self.prices.remove(price)
+        self.count -= 1
+        if self.count == 0:
+            self.price_mean = self.price_m2 = 0.0
+            return
+        delta = price - self.price_mean
+        self.price_mean -= delta / self.count
+        self.price_m2 = max(self.price_m2 - delta * (price - self.price_mean), 0.0)
+
+    @property
+    def price_variance(self) -> float:
+        """Population variance of the sector's prices."""
+        return self.price_m2 / self.count if self.count else 0.0
+
+
+class SectorAnalyzer(StorageListener):
+    """
+    Per-sector aggregates kept current through storage events
+    (add_stock, delete_stock, price ticks and direct field writes),
+    so /api/sectors only formats one record per sector.
+    """
 
-class SectorAnalyzer:
     def __init__(self, storage: StockStorage):
         self.storage = storage
+        self.aggregates: Dict[str, SectorAggregate] = {}
+        for stock in storage.get_all_stocks():
+            self.on_stock_added(stock)
+        storage.add_listener(self)
 
     def calculate_sector_stats(self) -> List[Dict]:
-        sector_stats = []
-        for sector, stocks in self.storage.sector_map.items():
-            if not stocks:
-                continue
-                
-            total_price = 0.0
-            total_volume = 0
-            total_volatility = 0.0
-            count = len(stocks)
-            
-            for stock in stocks:
-                total_price += stock.price
-                total_volume += stock.volume
-                total_volatility += stock.volatility
-                
-            avg_price = total_price / count
-            avg_volatility = total_volatility / count
-            
-            sector_stats.append({
-                "sector": sector,
-                "count": count,
-                "avg_price": round(avg_price, 2),
-                "avg_volatility": round(avg_volatility, 3),
-                "total_volume": total_volume
-            })
-            
+        """
+        Per-sector aggregates from the running totals.
+        Time Complexity: O(S log S) for S sectors, independent of the number of stocks.
+        """
+        sector_stats = [self._format(sector, aggregate) for sector, aggregate in self.aggregates.items()]
         sector_stats.sort(key=lambda x: x['avg_price'], reverse=True)
-            
         return sector_stats
+
+    def check_consistency(self) -> List[str]:
+        """
+        Compare the running aggregates with a from-scratch recompute over the storage columns.
+        Returns a description of every mismatch; empty when they agree.
+        Time Complexity: O(N) vectorized + O(N) per sector for min / max / variance.
+        """
+        codes = self.storage.sector_code_column()
+        columns = {name: self.storage.column(name) for name in ('price', 'volume', 'volatility')}
+        problems = []
+        for code, sector in enumerate(self.storage.sector_names):
+            mask = codes == code
+            aggregate = self.aggregates.get(sector)
+            if not mask.any():
+                if aggregate is not None:
+                    problems.append(f"{sector}: running aggregate for an empty sector")
+                continue
+            if aggregate is None:
+                problems.append(f"{sector}: no running aggregate")
+                continue
+
+            prices = columns['price'][mask]
+            expected = {
+                'count': int(mask.sum()),
+                'price_mean': float(prices.mean()),
+                'price_variance': float(prices.var()),
+                'min_price': float(prices.min()),
+                'max_price': float(prices.max()),
+                'volume_sum': int(columns['volume'][mask].sum()),
+                'volatility_sum': float(columns['volatility'][mask].sum()),
+            }
+            actual = {
+                'count': aggregate.count,
+                'price_mean': aggregate.price_mean,
+                'price_variance': aggregate.price_variance,
+                'min_price': aggregate.prices[0],
+                'max_price': aggregate.prices[-1],
+                'volume_sum': aggregate.volume_sum,
+                'volatility_sum': aggregate.volatility_sum,
+            }
+            # Variance is in price^2 units: its rounding noise scales with mean^2, not with 1
+            variance_atol = 1e-9 * max(1.0, expected['price_mean'] ** 2)
+            for key, value in expected.items():
+                atol = variance_atol if key == 'price_variance' else 1e-9
+                if not np.isclose(actual[key], value, rtol=1e-9, atol=atol):
+                    problems.append(f"{sector}.{key}: running {actual[key]} != recomputed {value}")
+
+        for sector in set(self.aggregates) - set(self.storage.sector_names):
+            problems.append(f"{sector}: running aggregate for an unknown sector")
+        return problems
+
+    @staticmethod
+    def _format(sector: str, aggregate: SectorAggregate) -> Dict:
+        return {
+            "sector": sector,
+            "count": aggregate.count,
+            "avg_price": round(aggregate.price_mean, 2),
+            "avg_volatility": round(aggregate.volatility_sum / aggregate.count, 3),
+            "total_volume": aggregate.volume_sum,
+            "min_price": round(aggregate.prices[0], 2),
+            "max_price": round(aggregate.prices[-1], 2),
+            "price_variance": round(aggregate.price_variance, 2),
+        }
+
+    # --- Storage events ---
+
+    def on_stock_added(self, stock: Stock):
+        aggregate = self.aggregates.setdefault(stock.sector, SectorAggregate())
+        aggregate.add(float(stock.price), int(stock.volume), float(stock.volatility))
+
+    def on_stock_removed(self, stock: Stock):
+        aggregate = self.aggregates[stock.sector]
+        aggregate.remove(float(stock.price), int(stock.volume), float(stock.volatility))
+        if not aggregate.count:
+            del self.aggregates[stock.sector]
+
+    def on_prices_updated(self, rows, old_prices):
+        stocks_list = self.storage.stocks_list
+        new_prices = self.storage.prices[rows].tolist()
+        for row, old_price, new_price in zip(rows.tolist(), old_prices.tolist(), new_prices):
+            self.aggregates[stocks_list[row].sector].replace_price(old_price, new_price)
+
+    def on_field_changed(self, row: int, field: str, old_value):
+        stock = self.storage.stocks_list[row]
+        aggregate = self.aggregates[stock.sector]
+        if field == 'price':
+            aggregate.replace_price(float(old_value), float(stock.price))
+        elif field == 'volume':
+            aggregate.volume_sum += int(stock.volume) - int(old_value)
+        elif field == 'volatility':
+            aggregate.volatility_sum += float(stock.volatility) - float(old_value)
@@ -0,0 +1,184 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+METHODS = ('gbm', 'bootstrap')
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+CHUNK_PATHS = 2_000 # paths per seeded chunk: the unit of work and of reproducibility
+_BATCH_FLOATS = 1 << 21 # cap on one batch's (paths x horizon x holdings) increments
+MAX_PATH_VALUES = 2_500_000 # cap on paths x (horizon + 1): the value matrix behind the bands, 20 MB
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def simulate(values, returns, horizon: int = 30, paths: int = 10_000, method: str = 'gbm', seed: int = 0,
+             workers: int = 1, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict:
+    """
+    Monte Carlo projection of a portfolio's value over `horizon` ticks.
+    values: current position values (h,); returns: historical log returns (window x h).
+      gbm        correlated normal log returns with the window's mean and covariance
+      bootstrap  whole rows of the window resampled with replacement (keeps fat tails
+                 and cross-correlation as observed)
+    Paths are generated in chunks of CHUNK_PATHS, chunk i seeded from
+    SeedSequence(seed).spawn(...)[i], so the result depends on the seed but not on
+    `workers`. With workers > 1 the chunks run on a process pool reading the inputs from
+    one shared-memory block.
+    Returns percentile bands of portfolio value per tick (index 0 = today).
+    The bands are exact, so every path's values are held at once: paths * (horizon + 1)
+    is capped at MAX_PATH_VALUES.
+    Time Complexity: O(paths * horizon * h) spread over the workers; the bands add
+    O(paths * horizon) to gather.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {list(METHODS)}")
+    if horizon < 1 or paths < 1:
+        raise ValueError("horizon and paths must be positive")
+    if paths * (horizon + 1) > MAX_PATH_VALUES:
+        raise ValueError(f"paths x (horizon + 1) must be at most {MAX_PATH_VALUES:,}")
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    if returns.ndim != 2 or returns.shape[1] != len(values) or len(returns) < 2:
+        raise ValueError("returns must be (window >= 2) x len(values)")
+    percentiles = [float(p) for p in percentiles]
+
+    inputs = {'values': values}
+    if method == 'gbm':
+        inputs['mean'] = returns.mean(axis=0)
+        inputs['scale'] = _covariance_root(np.atleast_2d(np.cov(returns, rowvar=False)))
+    else:
+        inputs['returns'] = returns
+
+    sizes = [CHUNK_PATHS] * (paths // CHUNK_PATHS) + ([paths % CHUNK_PATHS] if paths % CHUNK_PATHS else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    paths_values = np.empty((paths, horizon + 1)) # chunks land in place, never concatenated
+    if workers <= 1:
+        for offset, size, child in zip(np.cumsum([0] + sizes[:-1]).tolist(), sizes, seeds):
+            paths_values[offset:offset + size] = _simulate_chunk(inputs, method, horizon, size, child)
+    else:
+        _run_shared(inputs, method, horizon, sizes, seeds, workers, paths_values)
+
+    final = paths_values[:, -1]
+    start = float(values.sum())
+    final_stats = {"mean": float(final.mean()), "prob_loss": float((final < start).mean())}
+    # Partitions the matrix in place rather than sorting a copy of it
+    bands = np.percentile(paths_values, percentiles, axis=0, overwrite_input=True)
+    return {
+        "method": method,
+        "paths": paths,
+        "horizon": horizon,
+        "seed": seed,
+        "start_value": start,
+        "percentiles": percentiles,
+        "bands": {f"p{p:g}": band.tolist() for p, band in zip(percentiles, bands)},
+        "final": final_stats,
+    }
+
+
+def _covariance_root(cov: np.ndarray) -> np.ndarray:
+    """S with S @ S.T == cov; an eigen root, so a singular covariance is fine (Cholesky is not)."""
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+
+def _simulate_chunk(inputs: Dict[str, np.ndarray], method: str, horizon: int, size: int,
+                    seed: np.random.SeedSequence) -> np.ndarray:
+    """(size x horizon+1) portfolio values for one chunk of paths."""
+    rng = np.random.default_rng(seed)
+    values = inputs['values']
+    holdings = len(values)
+    batch = max(1, min(size, _BATCH_FLOATS // (horizon * holdings)))
+    out = np.empty((size, horizon + 1))
+    out[:, 0] = values.sum()
+    for start in range(0, size, batch):
+        n = min(batch, size - start)
+        if method == 'gbm':
+            shocks = rng.standard_normal((n, horizon, holdings))
+            increments = shocks @ inputs['scale'].T
+            increments += inputs['mean']
+        else:
+            history = inputs['returns']
+            increments = history[rng.integers(0, len(history), (n, horizon))]
+        np.cumsum(increments, axis=1, out=increments)
+        np.exp(increments, out=increments)
+        out[start:start + n, 1:] = increments @ values
+    return out
+
+
+# --- Process pool over shared memory ---
+
+def _run_shared(inputs: Dict[str, np.ndarray], method: str, horizon: int, sizes, seeds, workers: int,
+                out: np.ndarray):
+    """Run the chunks on the pool, copying each result into its rows of `out` as it arrives."""
+    block, layout = _share(inputs)
+    try:
+        pool = _pool(workers)
+        futures = {pool.submit(_simulate_shared_chunk, block.name, layout, method, horizon, size, child): offset
+                   for offset, size, child in zip(np.cumsum([0] + sizes[:-1]).tolist(), sizes, seeds)}
+        for future in as_completed(futures):
+            offset = futures.pop(future) # drop the future, so its chunk is freed once copied
+            chunk = future.result()
+            out[offset:offset + len(chunk)] = chunk
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _share(inputs: Dict[str, np.ndarray]) -> Tuple[shared_memory.SharedMemory, Dict]:
+    """Copy the arrays into one shared-memory block; layout maps name -> (offset, shape)."""
+    layout, offset = {}, 0
+    for name, array in inputs.items():
+        layout[name] = (offset, array.shape)
+        offset += array.nbytes
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, array in inputs.items():
+        start, shape = layout[name]
+        np.ndarray(shape, dtype=np.float64, buffer=block.buf, offset=start)[...] = array
+    return block, layout
+
+
+def _simulate_shared_chunk(name: str, layout: Dict, method: str, horizon: int, size: int,
+                           seed: np.random.SeedSequence) -> np.ndarray:
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        inputs = {key: np.ndarray(shape, dtype=np.float64, buffer=block.buf, offset=start)
+                  for key, (start, shape) in layout.items()}
+        result = _simulate_chunk(inputs, method, horizon, size, seed)
+        del inputs # release the buffer views before closing
+        return result
+    finally:
+        block.close()
+
+
+# Workers never fork the app, which has live threads and locks a fork would copy in
+# whatever state they are in.
+_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    """
+    One long-lived pool per worker count.
+    Workers start from a forkserver (spawn where there is none) and re-import the parent's
+    main module, so that module must do its work under `if __name__ == '__main__'` (app.py
+    does it in create_app()).
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            if _CONTEXT.get_start_method() == 'forkserver':
+                _CONTEXT.set_forkserver_preload([__name__]) # numpy imported once, in the server
+            pool = _pools[workers] = ProcessPoolExecutor(workers, mp_context=_CONTEXT)
+        return pool
+
+
+def shutdown():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
@@ -0,0 +1,243 @@
+import base64
+import json
+from typing import Dict, List, Optional, Tuple
+from sortedcontainers import SortedList
+from models import Stock
+from storage import StockStorage, StorageListener
+from ranking import priority_score
+
+INDEXED_KEYS = ('price', 'volume', 'name', 'sector', 'score')
+SECTOR_INDEXED_KEYS = ('price', 'volume', 'name', 'score')
+
+
+class SortedIndex:
+    """
+    One ordered index over (key, seq, symbol) entries in a SortedList (a B+ tree-like
+    list of sorted blocks). seq is the insertion sequence, so equal keys keep
+    insertion order and every entry is unique.
+    Insert / remove / update: O(log N). Page of k entries: O(log N + k).
+    Descending pages are stable too: equal keys still come out in insertion order.
+    """
+
+    def __init__(self):
+        self.entries = SortedList()
+        self.keys: Dict[str, Tuple] = {}  # symbol -> its current entry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self, entries: List[Tuple]):
+        """Bulk-build from (key, seq, symbol) entries: one O(N log N) sort instead of N inserts."""
+        self.entries = SortedList(entries)
+        self.keys = {entry[2]: entry for entry in entries}
+
+    def insert(self, symbol: str, key, seq: int):
+        entry = (key, seq, symbol)
+        self.entries.add(entry)
+        self.keys[symbol] = entry
+
+    def remove(self, symbol: str):
+        entry = self.keys.pop(symbol, None)
+        if entry is not None:
+            self.entries.remove(entry)
+
+    def update(self, symbol: str, key):
+        entry = self.keys.get(symbol)
+        if entry is None or entry[0] == key:
+            return
+        self.entries.remove(entry)
+        self.insert(symbol, key, entry[1])
+
+    def page(self, limit: Optional[int] = None, offset: int = 0, descending: bool = False,
+             after: Optional[Tuple] = None) -> List[Tuple]:
+        """
+        Entries in key order (or reverse). `after` is a (key, seq) position from a
+        previous page; the page then starts right after it and `offset` is ignored.
+        """
+        entries = self.entries
+        if descending:
+            rank = offset if after is None else self._rank_after_desc(*after)
+            return self._desc_stable(rank, limit)
+
+        # (key, seq + 1) sorts after every entry at (key, seq, *) and before the next seq.
+        start = offset if after is None else entries.bisect_left((after[0], after[1] + 1))
+        stop = len(entries) if limit is None else min(len(entries), start + limit)
+        if start >= stop:
+            return []
+        return list(entries.islice(start, stop))
+
+    def top(self, k: int) -> List[Tuple]:
+        return self._desc_stable(0, k)
+
+    def bottom(self, k: int) -> List[Tuple]:
+        return self.page(k)
+
+    def _group_bounds(self, key) -> Tuple[int, int]:
+        """[start, stop) positions of all entries whose key equals `key`."""
+        return self.entries.bisect_left((key,)), self.entries.bisect_left((key, float('inf')))
+
+    def _rank_after_desc(self, key, seq: int) -> int:
+        # Works even if the cursor entry was deleted: bisect lands on its successor.
+        start, stop = self._group_bounds(key)
+        position = self.entries.bisect_left((key, seq + 1))
+        return (len(self.entries) - stop) + (position - start)
+
+    def _desc_stable(self, rank: int, limit: Optional[int]) -> List[Tuple]:
+        """
+        Entries from descending rank `rank` on, keys high -> low and equal keys by seq.
+        In ascending positions a tie group [start, stop) occupies descending ranks
+        [n - stop, n - start), in its own ascending order. O(log N) per tie group + k.
+        """
+        entries = self.entries
+        n = len(entries)
+        result: List[Tuple] = []
+        while rank < n and (limit is None or len(result) < limit):
+            start, stop = self._group_bounds(entries[n - 1 - rank][0])
+            begin = start + rank - (n - stop)
+            end = stop if limit is None else min(stop, begin + limit - len(result))
+            result.extend(entries.islice(begin, end))
+            rank += end - begin
+        return result
+
+
+class StockIndexes(StorageListener):
+    """
+    Persistent sorted indexes on price, volume, name, sector and priority score,
+    globally and per sector, kept current through storage events
+    (add_stock, delete_stock, update_price / update_many, direct field writes).
+    /api/stocks reads a page from them instead of sorting the whole universe.
+    """
+
+    def __init__(self, storage: StockStorage):
+        self.storage = storage
+        self.indexes: Dict[str, SortedIndex] = {key: SortedIndex() for key in INDEXED_KEYS}
+        self.sector_indexes: Dict[str, Dict[str, SortedIndex]] = {}
+        self._next_seq = 0
+
+        self._load(storage.get_all_stocks())
+        storage.add_listener(self)
+
+    def _load(self, stocks: List[Stock]):
+        entries = {name: [] for name in INDEXED_KEYS}
+        sector_entries: Dict[str, Dict[str, List[Tuple]]] = {}
+        for stock in stocks:
+            seq = self._next_seq
+            self._next_seq += 1
+            keys = self._keys_for(stock)
+            per_sector = sector_entries.setdefault(stock.sector, {name: [] for name in SECTOR_INDEXED_KEYS})
+            for name in INDEXED_KEYS:
+                entry = (keys[name], seq, stock.symbol)
+                entries[name].append(entry)
+                if name in per_sector:
+                    per_sector[name].append(entry)
+
+        for name, index in self.indexes.items():
+            index.load(entries[name])
+        for sector, lists in sector_entries.items():
+            self.sector_indexes[sector] = {name: SortedIndex() for name in SECTOR_INDEXED_KEYS}
+            for name, index in self.sector_indexes[sector].items():
+                index.load(lists[name])
+
+    # --- Queries ---
+
+    def query(self, key: str, descending: bool = False, limit: Optional[int] = None, offset: int = 0,
+              sector: str = '', cursor: Optional[str] = None) -> Tuple[List[Stock], Optional[str], int]:
+        """
+        One page of stocks ordered by `key`.
+        Returns (stocks, next_cursor, total); next_cursor is None on the last page.
+        Raises ValueError for an unknown key or a cursor minted for a different query.
+        """
+        index = self._index_for(key, sector)
+        after = self._decode_cursor(cursor, key, descending, sector) if cursor else None
+        entries = index.page(limit, offset, descending, after)
+
+        next_cursor = None
+        if limit and len(entries) == limit:
+            last_key, last_seq, _ = entries[-1]
+            next_cursor = self._encode_cursor(key, descending, sector, last_key, last_seq)
+
+        stocks = [self.storage.get_stock(symbol) for _, _, symbol in entries]
+        return stocks, next_cursor, len(index)
+
+    def top(self, key: str, k: int, sector: str = '') -> List[Stock]:
+        """Leaderboard read: k highest, ties in insertion order (like heapq.nlargest). O(log N + k)."""
+        return [self.storage.get_stock(symbol) for _, _, symbol in self._index_for(key, sector).top(k)]
+
+    def bottom(self, key: str, k: int, sector: str = '') -> List[Stock]:
+        """k lowest, ties in insertion order (like heapq.nsmallest). O(log N + k)."""
+        return [self.storage.get_stock(symbol) for _, _, symbol in self._index_for(key, sector).bottom(k)]
+
+    @staticmethod
+    def covers(key: str, sector: str = '') -> bool:
+        """Whether query() can order by `key` (within `sector` if given); otherwise sort the stocks directly."""
+        return key in (SECTOR_INDEXED_KEYS if sector else INDEXED_KEYS)
+
+    def _index_for(self, key: str, sector: str) -> SortedIndex:
+        if sector:
+            if key not in SECTOR_INDEXED_KEYS:
+                raise ValueError(f"'{key}' is not indexed within a sector")
+            return self.sector_indexes.get(sector, {}).get(key, SortedIndex())
+        if key not in self.indexes:
+            raise ValueError(f"'{key}' is not an indexed sort key")
+        return self.indexes[key]
+
+    @staticmethod
+    def _encode_cursor(key: str, descending: bool, sector: str, last_key, last_seq: int) -> str:
+        payload = json.dumps([key, descending, sector, last_key, last_seq])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str, key: str, descending: bool, sector: str) -> Tuple:
+        try:
+            c_key, c_desc, c_sector, last_key, last_seq = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise ValueError("Malformed cursor")
+        if (c_key, c_desc, c_sector) != (key, descending, sector):
+            raise ValueError("Cursor does not match this query")
+        return last_key, last_seq
+
+    # --- Storage events ---
+
+    def _keys_for(self, stock: Stock) -> Dict[str, object]:
+        return {
+            'price': stock.price,
+            'volume': stock.volume,
+            'name': stock.name,
+            'sector': stock.sector,
+            'score': priority_score(stock.price, stock.volume, stock.volatility),
+        }
+
+    def on_stock_added(self, stock: Stock):
+        seq = self._next_seq
+        self._next_seq += 1
+
+        keys = self._keys_for(stock)
+        for name, index in self.indexes.items():
+            index.insert(stock.symbol, keys[name], seq)
+
+        sector_indexes = self.sector_indexes.setdefault(
+            stock.sector, {name: SortedIndex() for name in SECTOR_INDEXED_KEYS})
+        for name, index in sector_indexes.items():
+            index.insert(stock.symbol, keys[name], seq)
+
+    def on_stock_removed(self, stock: Stock):
+        for index in self.indexes.values():
+            index.remove(stock.symbol)
+        for index in self.sector_indexes.get(stock.sector, {}).values():
+            index.remove(stock.symbol)
+
+    def on_prices_updated(self, rows, old_prices):
+        for row in rows.tolist():
+            self._refresh(self.storage.stocks_list[row], ('price', 'score'))
+
+    def on_field_changed(self, row: int, field: str, old_value):
+        self._refresh(self.storage.stocks_list[row], (field, 'score'))
+
+    def _refresh(self, stock: Stock, names):
+        keys = self._keys_for(stock)
+        sector_indexes = self.sector_indexes[stock.sector]
+        for name in names:
+            if name in self.indexes:
+                self.indexes[name].update(stock.symbol, keys[name])
+            if name in sector_indexes:
+                sector_indexes[name].update(stock.symbol, keys[name])
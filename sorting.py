@@ -1,9 +1,28 @@
-from typing import List, Callable
+from typing import List, Callable, Optional, Sequence, Tuple, Union
+import numpy as np
 from models import Stock
 
+# A sort key is a Stock field name or a precomputed value array aligned with the stocks.
+SortKey = Union[str, Sequence]
+
+NUMERIC_FIELDS = {'price', 'volume', 'volatility'}
+TEXT_FIELDS = {'symbol', 'name', 'sector'}
+
+
 class StockSorter:
-    def __init__(self, threshold: int = 50):
+    """
+    engine='numpy'   : extract each key once into an array, then one stable np.lexsort.
+    engine='timsort' : extract keys once, then stable list.sort passes on the precomputed keys.
+    engine='hybrid'  : the original quick/merge sort, kept for comparison (single key only).
+    """
+
+    ENGINES = ('numpy', 'timsort', 'hybrid')
+
+    def __init__(self, threshold: int = 50, engine: str = 'numpy'):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown sort engine '{engine}'")
         self.threshold = threshold
+        self.engine = engine
 
     def _quick_sort(self, stocks: List[Stock], key_func: Callable[[Stock], float]) -> List[Stock]:
         if len(stocks) <= 1:
@@ -45,6 +64,42 @@ class StockSorter:
         return result
 
     def hybrid_sort(self, stocks: List[Stock], key: str = 'price', ascending: bool = True) -> List[Stock]:
+        if self.engine != 'hybrid':
+            return self.sort(stocks, [(key, ascending)])
+        return self._legacy_hybrid_sort(stocks, key, ascending)
+
+    def sort(self, stocks: List[Stock], keys: List[Tuple[SortKey, bool]]) -> List[Stock]:
+        """
+        Stable multi-key sort, e.g. [('sector', True), ('price', False)] sorts by sector
+        then price descending. Equal keys keep their input order in both directions.
+        Time Complexity: O(K * N) key extraction + O(N log N) sort on plain arrays.
+        """
+        return [stocks[i] for i in self.argsort(stocks, keys)]
+
+    def argsort(self, stocks: List[Stock], keys: List[Tuple[SortKey, bool]]) -> np.ndarray:
+        if not stocks or not keys:
+            return np.arange(len(stocks))
+
+        if self.engine == 'hybrid':
+            (key, ascending), = keys
+            positions = {id(s): i for i, s in enumerate(stocks)}
+            return np.array([positions[id(s)] for s in self._legacy_hybrid_sort(stocks, key, ascending)])
+
+        rows = _storage_rows(stocks)
+        columns = [(_extract_key(stocks, key, rows), ascending) for key, ascending in keys]
+
+        if self.engine == 'timsort':
+            order = list(range(len(stocks)))
+            for values, ascending in reversed(columns):
+                values = values.tolist()
+                order.sort(key=values.__getitem__, reverse=not ascending)
+            return np.array(order, dtype=np.intp)
+
+        # np.lexsort treats the last key as primary and is stable.
+        codes = [_ordered_codes(values, ascending) for values, ascending in reversed(columns)]
+        return np.lexsort(codes)
+
+    def _legacy_hybrid_sort(self, stocks: List[Stock], key: str = 'price', ascending: bool = True) -> List[Stock]:
         key_map = {
             'price': lambda s: s.price,
             'volume': lambda s: s.volume,
@@ -63,3 +118,28 @@ class StockSorter:
             return sorted_stocks[::-1]
             
         return sorted_stocks
+
+
+def _storage_rows(stocks: List[Stock]) -> Optional[np.ndarray]:
+    """Row numbers if every stock is a view into the same storage, else None."""
+    storage = stocks[0]._storage
+    if storage is None or any(s._storage is not storage for s in stocks):
+        return None
+    return np.fromiter((s._row for s in stocks), dtype=np.intp, count=len(stocks))
+
+
+def _extract_key(stocks: List[Stock], key: SortKey, rows: Optional[np.ndarray]) -> np.ndarray:
+    if not isinstance(key, str):
+        return np.asarray(key)
+    if key not in NUMERIC_FIELDS and key not in TEXT_FIELDS:
+        key = 'price'
+    if key in NUMERIC_FIELDS and rows is not None:
+        return stocks[0]._storage.column(key)[rows]
+    return np.array([getattr(s, key) for s in stocks])
+
+
+def _ordered_codes(values: np.ndarray, ascending: bool) -> np.ndarray:
+    """Numeric sort codes; strings become ranks so descending order is a plain negation."""
+    if values.dtype.kind not in 'if':
+        values = np.unique(values, return_inverse=True)[1]
+    return values if ascending else -values
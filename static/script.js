@@ -4,6 +4,9 @@ const API_BASE = '/api';
 let updateInterval = null;
 let isUpdating = true;
 let lastDataVersion = 0;
+// Client-side copy of the universe behind the risk scatter, patched from /api/changes deltas
+const marketStocks = new Map();
+let marketLoad = null; // the full load in flight, if any
 
 // Initial Load
 document.addEventListener('DOMContentLoaded', () => {
@@ -124,8 +127,10 @@ async function fetchTopK() {
 // Sentiment Chart
 async function fetchSentiment() {
     const res = await fetch(`${API_BASE}/sentiment`);
-    const data = await res.json();
+    renderSentiment(await res.json());
+}
 
+function renderSentiment(data) {
     const ctx = document.getElementById('sentimentChart');
     if (ctx) {
         if (window.sentimentChartInstance) window.sentimentChartInstance.destroy();
@@ -365,10 +370,34 @@ async function fetchTopCharts() {
 
 // Risk Analysis (Price vs Volatility Scatter)
 async function fetchRiskAnalysis() {
-    const res = await fetch(`${API_BASE}/stocks`);
+    marketLoad = loadMarketStocks();
+    await marketLoad;
+    renderRiskAnalysis();
+}
+
+async function loadMarketStocks() {
+    // Version first: deltas after it are applied on top, so nothing between the two reads is missed
+    const versionRes = await fetch(`${API_BASE}/last-update`);
+    const { version } = await versionRes.json();
+    const res = await fetch(`${API_BASE}/stocks?fields=symbol,price,volume,volatility`);
     const stocks = await res.json();
 
-    const scatterData = stocks.map(s => ({
+    marketStocks.clear();
+    stocks.forEach(s => marketStocks.set(s.symbol, s));
+    lastDataVersion = version;
+}
+
+// Patch marketStocks with one /api/changes delta; false when the server asks for a full reload
+function applyDelta(delta) {
+    if (delta.reset) return false;
+    delta.changes.forEach(s => marketStocks.set(s.symbol, s));
+    delta.removed.forEach(symbol => marketStocks.delete(symbol));
+    lastDataVersion = delta.version;
+    return true;
+}
+
+function renderRiskAnalysis() {
+    const scatterData = Array.from(marketStocks.values(), s => ({
         x: s.volatility,
         y: s.price,
         label: s.symbol
@@ -535,9 +564,44 @@ async function viewTrend(symbol) {
 // REAL-TIME UPDATE FUNCTIONS
 // ============================================
 
+let eventSource = null;
+let chartRefreshTimer = null;
+
 function startRealTimeUpdates() {
     console.log("Starting real-time updates...");
 
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+
+    // Server pushes ticks over one connection; charts refresh only when something moved
+    eventSource = new EventSource(`${API_BASE}/stream`);
+    eventSource.addEventListener('tick', (e) => {
+        if (!isUpdating) return;
+        const tick = JSON.parse(e.data);
+        renderSentiment(tick.sentiment);
+        scheduleChartRefresh();
+    });
+    eventSource.addEventListener('resync', () => {
+        // We fell behind and missed ticks: refetch everything once
+        if (isUpdating) scheduleChartRefresh();
+    });
+    eventSource.onerror = () => {
+        if (eventSource.readyState === EventSource.CLOSED) {
+            eventSource = null;
+            startPolling();
+        }
+    };
+}
+
+function scheduleChartRefresh() {
+    // Coalesce bursts of ticks into one refetch
+    clearTimeout(chartRefreshTimer);
+    chartRefreshTimer = setTimeout(updateAllCharts, 1000);
+}
+
+function startPolling() {
     // Update every 5 seconds
     updateInterval = setInterval(async () => {
         if (isUpdating) {
@@ -547,6 +611,10 @@ function startRealTimeUpdates() {
 }
 
 function stopRealTimeUpdates() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
     if (updateInterval) {
         clearInterval(updateInterval);
         updateInterval = null;
@@ -556,19 +624,32 @@ function stopRealTimeUpdates() {
 
 async function updateAllCharts() {
     try {
+        // Never poll from version 0 while the first full load is still in flight
+        await marketLoad;
+
+        // Pull only the stocks that changed since the version we hold
+        const res = await fetch(`${API_BASE}/changes?since=${lastDataVersion}`);
+        const delta = await res.json();
+        if (!delta.reset && delta.version === lastDataVersion) {
+            return;
+        }
+
         // Show update indicator
         showUpdateIndicator(true);
 
-        // Fetch all data and update charts
+        // The universe is patched in place; the other charts are small server-side aggregates
+        if (applyDelta(delta)) {
+            renderRiskAnalysis();
+        }
         await Promise.all([
             fetchSentiment(),
             fetchTopK(),
             fetchSectors(),
             fetchTopCharts(),
-            fetchRiskAnalysis()
+            delta.reset ? fetchRiskAnalysis() : null
         ]);
 
-        // Update timestamp
+        // Update timestamp; later changes are picked up by the next delta poll
         await updateTimestamp();
 
         // Hide update indicator
@@ -600,8 +681,6 @@ async function updateTimestamp() {
         if (timestampEl) {
             timestampEl.textContent = data.timestamp;
         }
-
-        lastDataVersion = data.version;
     } catch (error) {
         console.error("Error fetching timestamp:", error);
     }
@@ -1,44 +1,514 @@
-from typing import List, Dict, Optional
-from models import Stock
+import gc
+import sys
+from functools import wraps
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from models import Stock, HISTORY_LENGTH
+from concurrency import RWLock
+
+class StorageListener:
+    """
+    Hooks StockStorage calls after each mutation; override the ones you need.
+    Register with StockStorage.add_listener().
+    """
+
+    def on_stock_added(self, stock: Stock):
+        pass
+
+    def on_stock_removed(self, stock: Stock):
+        """Called before anything is removed, so the stock's row is still readable."""
+        pass
+
+    def on_prices_updated(self, rows: np.ndarray, old_prices: np.ndarray):
+        """A price tick: new prices are written and appended to each row's history."""
+        pass
+
+    def on_field_changed(self, row: int, field: str, old_value):
+        """Direct write to price, volume or volatility (no history entry)."""
+        pass
+
+    def on_history_changed(self, row: int):
+        """History replaced or appended to outside a price tick."""
+        pass
+
+
+def _writes(method):
+    """Run a mutating StockStorage method (and the listeners it notifies) under the write lock."""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.write():
+            result = method(self, *args, **kwargs)
+            self.write_version += 1
+            return result
+    return locked
+
 
 class StockStorage:
-    def __init__(self):
+    """
+    Columnar stock storage.
+    price, volume and volatility live in contiguous NumPy arrays indexed by row;
+    the Stock objects in stocks_list are views over those rows (row i == stocks_list[i]).
+
+    preserve_order=True keeps rows in insertion order, so a delete shifts the
+    rows behind it (O(N)). preserve_order=False swaps the last row into the gap
+    instead, making delete_stock O(1).
+
+    Price history is one shared (rows x HISTORY_LENGTH) ring buffer with a
+    per-row head pointer and fill count, replacing a deque per Stock.
+
+    Components that keep derived per-row state can register extra columns
+    (they grow and move with the rows) and listen for mutations.
+
+    Thread safety: every mutator takes `lock` for writing, so a mutation and all of its
+    listener updates are applied as one unit. Code that reads several rows, indexes or
+    derived state and needs them mutually consistent holds `lock.read()` around the read.
+    """
+
+    COLUMNS = {'price': 'prices', 'volume': 'volumes', 'volatility': 'volatilities'}
+
+    def __init__(self, capacity: int = 1024, preserve_order: bool = True):
+        self.preserve_order = preserve_order
         self.stocks_list: List[Stock] = []
         self.stocks_map: Dict[str, Stock] = {}
         self.sector_map: Dict[str, List[Stock]] = {}
 
+        # Column store
+        self.row_index: Dict[str, int] = {}
+        self.sector_rows: Dict[str, List[int]] = {}
+        self._sector_pos: Dict[str, int] = {}  # symbol -> position in its sector lists
+        self.sector_ids: Dict[str, int] = {}
+        self.sector_names: List[str] = []
+        self._sector_row_cache: Dict[str, np.ndarray] = {}
+
+        capacity = max(capacity, 1)
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.volumes = np.zeros(capacity, dtype=np.int64)
+        self.volatilities = np.zeros(capacity, dtype=np.float64)
+        self.sector_codes = np.zeros(capacity, dtype=np.int32)
+
+        # Ring buffer: history_head[row] is the next write slot, history_len[row] the fill count.
+        self.history = np.zeros((capacity, HISTORY_LENGTH), dtype=np.float64)
+        self.history_head = np.zeros(capacity, dtype=np.int32)
+        self.history_len = np.zeros(capacity, dtype=np.int32)
+
+        self._extra_columns: List[str] = []
+        self.listeners: List[StorageListener] = []
+        self.lock = RWLock()
+        self.write_version = 0  # bumped by every mutation (including history-only ones)
+
+    def _column_arrays(self) -> List[str]:
+        return ['prices', 'volumes', 'volatilities', 'sector_codes',
+                'history', 'history_head', 'history_len'] + self._extra_columns
+
+    @_writes
+    def register_column(self, attr: str, dtype, shape: tuple = ()):
+        """Add a zero-initialised per-row array attribute that grows and moves with the rows."""
+        if attr not in self._extra_columns:
+            setattr(self, attr, np.zeros((len(self.prices),) + shape, dtype=dtype))
+            self._extra_columns.append(attr)
+        return getattr(self, attr)
+
+    @_writes
+    def add_listener(self, listener: StorageListener):
+        self.listeners.append(listener)
+
+    @_writes
+    def remove_listener(self, listener: StorageListener):
+        self.listeners.remove(listener)
+
+    def _ensure_capacity(self, size: int):
+        capacity = len(self.prices)
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2)
+        for attr in self._column_arrays():
+            old = getattr(self, attr)
+            grown = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, attr, grown)
+
+    @_writes
     def add_stock(self, stock: Stock) -> bool:
         if stock.symbol in self.stocks_map:
             return False
-        
+
+        if stock._storage is not None:
+            stock._detach()
+
+        row = len(self.stocks_list)
+        self._ensure_capacity(row + 1)
+
+        if stock.sector not in self.sector_ids:
+            self.sector_ids[stock.sector] = len(self.sector_names)
+            self.sector_names.append(stock.sector)
+
+        self.prices[row] = stock.price
+        self.volumes[row] = stock.volume
+        self.volatilities[row] = stock.volatility
+        self.sector_codes[row] = self.sector_ids[stock.sector]
+        self._set_history(row, list(stock.price_history))
+        for attr in self._extra_columns:
+            getattr(self, attr)[row] = 0
+        stock._attach(self, row)
+
         self.stocks_list.append(stock)
         self.stocks_map[stock.symbol] = stock
-        
+        self.row_index[stock.symbol] = row
+
         if stock.sector not in self.sector_map:
             self.sector_map[stock.sector] = []
+            self.sector_rows[stock.sector] = []
+        self._sector_pos[stock.symbol] = len(self.sector_map[stock.sector])
         self.sector_map[stock.sector].append(stock)
-        
+        self.sector_rows[stock.sector].append(row)
+        self._sector_row_cache.pop(stock.sector, None)
+
+        for listener in self.listeners:
+            listener.on_stock_added(stock)
         return True
 
+    @_writes
+    def load_rows(self, symbols: List[str], names: List[str], sectors: List[str],
+                  prices, volumes, volatilities, history, history_head, history_len) -> int:
+        """
+        Bulk-load rows into an empty storage straight from column arrays (a warm start).
+        The Stock objects are bound to their rows without the per-stock add_stock path.
+        Time Complexity: O(N) with the column copies vectorized.
+        """
+        if self.stocks_list:
+            raise ValueError("load_rows needs an empty storage")
+        count = len(symbols)
+        if len(set(symbols)) != count:
+            raise ValueError("duplicate symbols in bulk load")
+        self._ensure_capacity(count)
+
+        self.prices[:count] = prices
+        self.volumes[:count] = volumes
+        self.volatilities[:count] = volatilities
+        self.history[:count] = history
+        self.history_head[:count] = history_head
+        self.history_len[:count] = history_len
+        for attr in self._extra_columns:
+            getattr(self, attr)[:count] = 0
+
+        for sector in dict.fromkeys(sectors):
+            self.sector_ids[sector] = len(self.sector_names)
+            self.sector_names.append(sys.intern(sector))
+        codes = np.fromiter(map(self.sector_ids.__getitem__, sectors), dtype=np.int32, count=count)
+        self.sector_codes[:count] = codes
+
+        # Allocating N objects would trigger repeated collections over an already large
+        # heap; nothing built here forms a cycle, so pause the collector meanwhile.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            # Bound here, so the local column slots are never read and stay unset.
+            new = Stock.__new__
+            sector_names = self.sector_names
+            stocks = [new(Stock) for _ in range(count)]
+            for row, stock, symbol, name, code in zip(range(count), stocks, symbols, names, codes.tolist()):
+                stock.symbol = symbol
+                stock.name = name
+                stock.sector = sector_names[code]
+                stock._storage = self
+                stock._row = row
+            self.stocks_list[:] = stocks
+            self.stocks_map.update(zip(symbols, stocks))
+            self.row_index.update(zip(symbols, range(count)))
+
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(self.sector_names) + 1))
+            for code, sector in enumerate(self.sector_names):
+                rows = order[bounds[code]:bounds[code + 1]].tolist()
+                self.sector_rows[sector] = rows
+                self.sector_map[sector] = [stocks[r] for r in rows]
+                self._sector_pos.update(zip([symbols[r] for r in rows], range(len(rows))))
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self._sector_row_cache.clear()
+
+        if self.listeners:
+            for stock in self.stocks_list:
+                for listener in self.listeners:
+                    listener.on_stock_added(stock)
+        return count
+
     def get_stock(self, symbol: str) -> Optional[Stock]:
         return self.stocks_map.get(symbol)
 
+    @_writes
     def delete_stock(self, symbol: str) -> bool:
         if symbol not in self.stocks_map:
             return False
 
         stock = self.stocks_map[symbol]
-        
+        row = self.row_index[symbol]
+        last = len(self.stocks_list) - 1
+
+        for listener in self.listeners:
+            listener.on_stock_removed(stock)
+        stock._detach()
         del self.stocks_map[symbol]
-        self.stocks_list.remove(stock)
-        
-        if stock.sector in self.sector_map:
-            self.sector_map[stock.sector].remove(stock)
-            
+        del self.row_index[symbol]
+        self._remove_from_sector(stock)
+
+        if not self.preserve_order:
+            self._swap_remove_row(row, last)
+            return True
+
+        # Close the gap so rows stay in insertion order.
+        for attr in self._column_arrays():
+            column = getattr(self, attr)
+            column[row:last] = column[row + 1:last + 1]
+        del self.stocks_list[row]
+        for moved_row in range(row, last):
+            moved = self.stocks_list[moved_row]
+            moved._row = moved_row
+            self.row_index[moved.symbol] = moved_row
+
+        for sector, rows in self.sector_rows.items():
+            rows[:] = [r - 1 if r > row else r for r in rows]
+        self._sector_row_cache.clear()
+
         return True
 
+    def _remove_from_sector(self, stock: Stock):
+        pos = self._sector_pos.pop(stock.symbol)
+        stocks = self.sector_map[stock.sector]
+        rows = self.sector_rows[stock.sector]
+
+        if self.preserve_order:
+            del stocks[pos]
+            del rows[pos]
+            for shifted in stocks[pos:]:
+                self._sector_pos[shifted.symbol] -= 1
+        else:
+            # Swap-with-last: O(1)
+            tail_stock, tail_row = stocks.pop(), rows.pop()
+            if pos < len(stocks):
+                stocks[pos] = tail_stock
+                rows[pos] = tail_row
+                self._sector_pos[tail_stock.symbol] = pos
+
+        self._sector_row_cache.pop(stock.sector, None)
+
+    def _swap_remove_row(self, row: int, last: int):
+        """Move the last row into the freed slot and fix up every index that pointed at it."""
+        tail = self.stocks_list.pop()
+        if row == last:
+            return
+
+        for attr in self._column_arrays():
+            column = getattr(self, attr)
+            column[row] = column[last]
+
+        self.stocks_list[row] = tail
+        tail._row = row
+        self.row_index[tail.symbol] = row
+        self.sector_rows[tail.sector][self._sector_pos[tail.symbol]] = row
+        self._sector_row_cache.pop(tail.sector, None)
+
+    @_writes
+    def delete_many(self, symbols: List[str]) -> int:
+        """
+        Delete a batch of symbols; returns how many were removed.
+        Swap-remove mode: O(K). Ordered mode: one O(N + K) compaction pass
+        instead of K separate O(N) shifts.
+        """
+        doomed = [s for s in dict.fromkeys(symbols) if s in self.stocks_map]
+        if not doomed:
+            return 0
+
+        if not self.preserve_order or len(doomed) == 1:
+            for symbol in doomed:
+                self.delete_stock(symbol)
+            return len(doomed)
+
+        for symbol in doomed:
+            for listener in self.listeners:
+                listener.on_stock_removed(self.stocks_map[symbol])
+
+        size = len(self.stocks_list)
+        drop = np.zeros(size, dtype=bool)
+        for symbol in doomed:
+            drop[self.row_index.pop(symbol)] = True
+            stock = self.stocks_map.pop(symbol)
+            del self._sector_pos[symbol]
+            stock._detach()
+
+        keep = np.flatnonzero(~drop)
+        for attr in self._column_arrays():
+            column = getattr(self, attr)
+            column[:len(keep)] = column[keep]
+
+        self.stocks_list[:] = [self.stocks_list[r] for r in keep]
+        for row, stock in enumerate(self.stocks_list):
+            stock._row = row
+            self.row_index[stock.symbol] = row
+
+        for sector, stocks in self.sector_map.items():
+            stocks[:] = [s for s in stocks if s.symbol in self.stocks_map]
+            self.sector_rows[sector][:] = [s._row for s in stocks]
+            for pos, s in enumerate(stocks):
+                self._sector_pos[s.symbol] = pos
+        self._sector_row_cache.clear()
+
+        return len(doomed)
+
     def get_all_stocks(self) -> List[Stock]:
         return self.stocks_list
 
     def get_stocks_by_sector(self, sector: str) -> List[Stock]:
         return self.sector_map.get(sector, [])
+
+    def get_row(self, symbol: str) -> Optional[int]:
+        return self.row_index.get(symbol)
+
+    def get_sector_rows(self, sector: str) -> np.ndarray:
+        """Row indexes of a sector as an int array (cached until the sector changes)."""
+        rows = self._sector_row_cache.get(sector)
+        if rows is None:
+            rows = np.array(self.sector_rows.get(sector, []), dtype=np.intp)
+            self._sector_row_cache[sector] = rows
+        return rows
+
+    def column(self, name: str) -> np.ndarray:
+        """Live view of a column ('price', 'volume' or 'volatility') over the occupied rows."""
+        return getattr(self, self.COLUMNS[name])[:len(self.stocks_list)]
+
+    def sector_code_column(self) -> np.ndarray:
+        return self.sector_codes[:len(self.stocks_list)]
+
+    # --- Prices & ring-buffer history ---
+
+    @_writes
+    def update_price(self, symbol: str, new_price: float) -> bool:
+        row = self.row_index.get(symbol)
+        if row is None:
+            return False
+        self._record_price(row, new_price)
+        return True
+
+    def diff_prices(self, symbols: List[str], prices) -> Tuple[List[str], List[float]]:
+        """
+        The change set of a quote batch: (symbols, prices) restricted to stored symbols
+        whose price actually differs from the stored one.
+        Time Complexity: O(k) dict lookups + one vectorized compare.
+        """
+        rows, values, kept = [], [], []
+        for symbol, price in zip(symbols, prices):
+            row = self.row_index.get(symbol)
+            if row is not None:
+                rows.append(row)
+                values.append(price)
+                kept.append(symbol)
+        if not rows:
+            return [], []
+
+        values = np.array(values, dtype=np.float64)
+        moved = np.flatnonzero(self.prices[np.array(rows, dtype=np.intp)] != values)
+        return [kept[i] for i in moved.tolist()], values[moved].tolist()
+
+    @_writes
+    def update_many(self, symbols: List[str], prices) -> int:
+        """
+        Record one market tick for many symbols in a single vectorized write.
+        Unknown symbols are skipped; each symbol should appear once per tick.
+        Returns the number of rows updated.
+        """
+        rows, values = [], []
+        for symbol, price in zip(symbols, prices):
+            row = self.row_index.get(symbol)
+            if row is not None:
+                rows.append(row)
+                values.append(price)
+        if not rows:
+            return 0
+
+        rows = np.array(rows, dtype=np.intp)
+        values = np.array(values, dtype=np.float64)
+        old_prices = self.prices[rows]
+        self.prices[rows] = values
+        heads = self.history_head[rows]
+        self.history[rows, heads] = values
+        self.history_head[rows] = (heads + 1) % HISTORY_LENGTH
+        self.history_len[rows] = np.minimum(self.history_len[rows] + 1, HISTORY_LENGTH)
+
+        for listener in self.listeners:
+            listener.on_prices_updated(rows, old_prices)
+        return len(rows)
+
+    @_writes
+    def _record_price(self, row: int, new_price: float):
+        old_price = self.prices[row]
+        self.prices[row] = new_price
+        self._append_history(row, new_price)
+
+        if self.listeners:
+            rows, old_prices = np.array([row], dtype=np.intp), np.array([old_price])
+            for listener in self.listeners:
+                listener.on_prices_updated(rows, old_prices)
+
+    @_writes
+    def _write_field(self, row: int, field: str, value):
+        column = getattr(self, self.COLUMNS[field])
+        old_value = column[row]
+        column[row] = value
+        for listener in self.listeners:
+            listener.on_field_changed(row, field, old_value)
+
+    @_writes
+    def append_history(self, row: int, price: float):
+        """Append to a row's history without changing its price."""
+        self._append_history(row, price)
+        for listener in self.listeners:
+            listener.on_history_changed(row)
+
+    @_writes
+    def replace_history(self, row: int, values: List[float]):
+        self._set_history(row, values)
+        for listener in self.listeners:
+            listener.on_history_changed(row)
+
+    def _append_history(self, row: int, price: float):
+        head = self.history_head[row]
+        self.history[row, head] = price
+        self.history_head[row] = (head + 1) % HISTORY_LENGTH
+        if self.history_len[row] < HISTORY_LENGTH:
+            self.history_len[row] += 1
+
+    def _set_history(self, row: int, values: List[float]):
+        values = values[-HISTORY_LENGTH:]
+        count = len(values)
+        self.history[row, :count] = values
+        self.history_head[row] = count % HISTORY_LENGTH
+        self.history_len[row] = count
+
+    def _history_at(self, row: int, index: int) -> float:
+        start = self.history_head[row] - self.history_len[row]
+        return float(self.history[row, (start + index) % HISTORY_LENGTH])
+
+    def get_history(self, row: int) -> np.ndarray:
+        """One row's history, oldest -> newest (a copy)."""
+        length = self.history_len[row]
+        start = self.history_head[row] - length
+        return self.history[row, (start + np.arange(length)) % HISTORY_LENGTH]
+
+    def history_matrix(self, window: int = HISTORY_LENGTH, rows: Optional[np.ndarray] = None):
+        """
+        Last `window` prices of every row (or of `rows`) as an (n x window) array,
+        oldest -> newest and right-aligned; slots with no data yet are NaN.
+        Returns (matrix, lengths) where lengths is the number of valid slots per row.
+        """
+        window = min(window, HISTORY_LENGTH)
+        if rows is None:
+            rows = np.arange(len(self.stocks_list))
+        heads = self.history_head[rows].astype(np.intp)
+        lengths = np.minimum(self.history_len[rows], window)
+
+        offsets = np.arange(window - 1, -1, -1)  # steps back from the newest price
+        slots = (heads[:, None] - 1 - offsets[None, :]) % HISTORY_LENGTH
+        matrix = self.history[rows[:, None], slots]
+        matrix[offsets[None, :] >= lengths[:, None]] = np.nan
+        return matrix, lengths
@@ -0,0 +1,159 @@
+import json
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from storage import StockStorage, StorageListener
+from trend_analysis import TrendEngine
+
+
+class Subscriber:
+    """One streaming client: a bounded queue of pre-encoded SSE frames."""
+
+    def __init__(self, queue_size: int):
+        self.frames = deque()
+        self.queue_size = queue_size
+        self.dropped = 0  # frames dropped over the connection's lifetime
+        self.behind = 0  # frames dropped since the client last drained its queue
+        self.lagged = False  # dropped frames the client has not been told about yet
+        self.closed = False
+        self.cond = threading.Condition()
+
+
+class StreamBroadcaster(StorageListener):
+    """
+    Server-Sent Events fan-out of price ticks.
+    Each tick becomes one `tick` event carrying the moved symbols' price and trend
+    plus the live sentiment counts. It is encoded once and appended to every
+    subscriber's queue.
+    Slow consumers: a full queue drops its oldest frame and the client gets a `resync`
+    event (pull /api/changes?since=<last id>) before its next frames; a client that
+    falls `max_lag` frames behind without draining is disconnected.
+    Register after the TrendEngine / ChangeTracker so their state is current when a tick is published.
+    Time Complexity: O(k) to encode a k-symbol tick + O(clients) to enqueue it.
+    """
+
+    def __init__(self, storage: StockStorage, trend_engine: TrendEngine, change_tracker=None,
+                 queue_size: int = 64, max_lag: Optional[int] = None, heartbeat: float = 15.0):
+        self.storage = storage
+        self.trend_engine = trend_engine
+        self.change_tracker = change_tracker
+        self.queue_size = queue_size
+        self.max_lag = max_lag if max_lag is not None else queue_size * 8
+        self.heartbeat = heartbeat
+        self.subscribers: List[Subscriber] = []
+        self.published = 0
+        self._lock = threading.Lock()
+        storage.add_listener(self)
+
+    # --- Clients ---
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+        with subscriber.cond:
+            subscriber.closed = True
+            subscriber.cond.notify()
+
+    def stream(self, subscriber: Optional[Subscriber] = None) -> Iterator[str]:
+        """
+        SSE body for one client; blocks between events and sends a comment as heartbeat.
+        Without a subscriber it subscribes on first iteration, so a response that is never
+        started never leaves a queue behind.
+        """
+        if subscriber is None:
+            subscriber = self.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                with subscriber.cond:
+                    if not subscriber.frames and not subscriber.lagged and not subscriber.closed:
+                        subscriber.cond.wait(self.heartbeat)
+                    if subscriber.closed:
+                        return
+                    frames = list(subscriber.frames)
+                    subscriber.frames.clear()
+                    lagged, subscriber.lagged = subscriber.lagged, False
+                    subscriber.behind = 0
+
+                if lagged:
+                    yield _frame("resync", {"version": self._version()})
+                if frames:
+                    yield "".join(frames)
+                elif not lagged:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            subscribers = list(self.subscribers)
+        return {
+            "clients": len(subscribers),
+            "published": self.published,
+            "queued": sum(len(s.frames) for s in subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+        }
+
+    # --- Publishing ---
+
+    def publish(self, event: str, payload: Dict, event_id: Optional[int] = None):
+        frame = _frame(event, payload, event_id)
+        with self._lock:
+            subscribers = list(self.subscribers)
+            self.published += 1
+
+        for subscriber in subscribers:
+            with subscriber.cond:
+                if subscriber.closed:
+                    continue
+                if len(subscriber.frames) >= subscriber.queue_size:
+                    subscriber.frames.popleft()
+                    subscriber.dropped += 1
+                    subscriber.behind += 1
+                    subscriber.lagged = True
+                    if subscriber.behind > self.max_lag:
+                        subscriber.closed = True
+                subscriber.frames.append(frame)
+                subscriber.cond.notify()
+
+    def _version(self) -> int:
+        return self.change_tracker.version if self.change_tracker is not None else self.published
+
+    def _publish_tick(self, rows):
+        if not len(rows) or not self.subscribers:
+            return
+        stocks_list = self.storage.stocks_list
+        prices = self.storage.prices[rows].tolist()
+        ticks = []
+        for row, price in zip(rows.tolist(), prices):
+            symbol = stocks_list[row].symbol
+            ticks.append({"symbol": symbol, "price": price, "trend": self.trend_engine.get_trend(symbol)})
+        version = self._version()
+        self.publish("tick", {"version": version, "ticks": ticks,
+                              "sentiment": self.trend_engine.get_sentiment()}, version)
+
+    # --- Storage events ---
+
+    def on_prices_updated(self, rows, old_prices):
+        self._publish_tick(rows[self.storage.prices[rows] != old_prices])
+
+    def on_field_changed(self, row: int, field: str, old_value):
+        if field == 'price' and self.storage.prices[row] != old_value:
+            self._publish_tick(np.array([row], dtype=np.intp))
+
+
+def _frame(event: str, payload: Dict, event_id: Optional[int] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(payload, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
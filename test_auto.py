@@ -1,11 +1,40 @@
 import unittest
-from models import Stock
+import numpy as np
+import heapq
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import asdict
+from models import Stock, HISTORY_LENGTH
 from storage import StockStorage
 from search import SearchManager
 from ranking import RankingManager
-from trend_analysis import TrendAnalyzer
+from trend_analysis import TrendAnalyzer, TrendEngine, TREND_LABELS
 from sorting import StockSorter
 from sector_analysis import SectorAnalyzer
+from indicators import IndicatorAnalyzer
+from sorted_index import StockIndexes
+from live_data import LiveDataManager, FakeQuoteProvider
+from changes import ChangeTracker
+from streaming import StreamBroadcaster
+from concurrency import RWLock
+from persistence import MarketStore
+from tick_archive import TickArchive, TICK_DTYPE
+from bars import BarBuilder
+from response_cache import ResponseCache
+import serialization
+import simulate
+from serialization import STOCK_FIELDS, LIST_FIELDS, parse_fields, project
+from flask import Flask, jsonify, request
+from portfolio_manager import PortfolioManager, PortfolioItem, PortfolioBook
+from ledger import Ledger, Position, FIFO, LIFO, AVERAGE, COST_BASIS_METHODS
 
 class TestStockMarketAnalyzer(unittest.TestCase):
     def setUp(self):
@@ -37,6 +66,44 @@ class TestStockMarketAnalyzer(unittest.TestCase):
         self.assertEqual(len(self.storage.get_stocks_by_sector("Tech")), 5)
         self.assertEqual(len(self.storage.get_stocks_by_sector("Auto")), 1)
 
+    def test_columnar_storage(self):
+        self.s3.update_price(720.0)
+        self.assertEqual(self.storage.column('price')[self.storage.get_row("TSLA")], 720.0)
+        self.assertEqual(list(self.storage.get_sector_rows("Auto")), [2])
+
+        self.assertTrue(self.storage.delete_stock("GOOG"))
+        self.assertEqual(self.s2.price, 2000.0)  # detached copy keeps its values
+        self.assertEqual(self.storage.get_row("TSLA"), 1)
+        self.assertEqual(self.s3.price, 720.0)
+        self.assertEqual(list(self.storage.column('volume')), [1000, 2000, 800, 1200, 1500])
+        self.assertEqual(list(self.storage.get_sector_rows("Tech")), [0, 2, 3, 4])
+
+    def test_swap_remove_delete(self):
+        storage = StockStorage(preserve_order=False)
+        stocks = [Stock(s.symbol, s.name, s.sector, s.price, s.volume, s.volatility)
+                  for s in self.storage.get_all_stocks()]
+        for s in stocks:
+            storage.add_stock(s)
+
+        self.assertTrue(storage.delete_stock("GOOG"))
+        self.assertFalse(storage.delete_stock("GOOG"))
+        self.assertEqual(storage.delete_many(["AAPL", "INVALID", "TSLA"]), 2)
+
+        remaining = storage.get_all_stocks()
+        self.assertEqual(sorted(s.symbol for s in remaining), ["AMZN", "MSFT", "NVDA"])
+        for row, s in enumerate(remaining):
+            self.assertEqual(storage.get_row(s.symbol), row)
+            self.assertEqual(storage.column('price')[row], s.price)
+        self.assertEqual(storage.get_stocks_by_sector("Auto"), [])
+        tech_rows = storage.get_sector_rows("Tech")
+        self.assertEqual([remaining[r] for r in tech_rows], storage.get_stocks_by_sector("Tech"))
+
+    def test_delete_many_ordered(self):
+        self.assertEqual(self.storage.delete_many(["GOOG", "MSFT"]), 2)
+        self.assertEqual([s.symbol for s in self.storage.get_all_stocks()], ["AAPL", "TSLA", "AMZN", "NVDA"])
+        self.assertEqual(list(self.storage.get_sector_rows("Tech")), [0, 2, 3])
+        self.assertEqual(self.s5.price, 250.0)
+
     def test_search(self):
         res = self.search.search_by_name("App")
         self.assertIn(self.s1, res)
@@ -45,6 +112,848 @@ class TestStockMarketAnalyzer(unittest.TestCase):
         res_comp_sym = self.search.composite_search("TSLA")
         self.assertIn(self.s3, res_comp_sym)
 
+    def test_search_index_matches_scan(self):
+        rng = random.Random(9)
+        storage = StockStorage(preserve_order=False)
+        indexed, linear = SearchManager(storage), SearchManager(storage, use_index=False)
+        for i in range(300):
+            storage.add_stock(Stock(f"S{i:03d}", f"Corp {rng.choice(['Alpha', 'Beta', 'Gamma'])} {i}",
+                                    rng.choice(["Tech", "Auto", "Bank"]), 10.0, 100, 0.5))
+        storage.delete_many([f"S{i:03d}" for i in range(0, 300, 7)])
+        storage.add_stock(Stock("S01", "Short One", "Tech", 10.0, 100, 0.5))
+
+        for query in ["", "s", "S01", "s01", "01", "alpha", "ALP", "corp beta 2", "ech", "tech", "zzz", "a 1"]:
+            self.assertEqual(indexed.composite_search(query), linear.composite_search(query))
+            self.assertEqual(indexed.search_by_name(query), linear.search_by_name(query))
+            self.assertEqual(indexed.search_by_symbol(query), linear.search_by_symbol(query))
+
+            query_lower = query.lower()
+            def rank(s):
+                symbol, name, sector = s.symbol.lower(), s.name.lower(), s.sector.lower()
+                if symbol == query_lower:
+                    return 0
+                if symbol.startswith(query_lower):
+                    return 1
+                return 2 if name.startswith(query_lower) or sector.startswith(query_lower) else 3
+            expected = sorted(linear.composite_search(query), key=rank)
+            self.assertEqual(indexed.ranked_search(query), expected)
+            for limit in (1, 5, 40):
+                self.assertEqual(indexed.ranked_search(query, limit), expected[:limit])
+
+        self.assertEqual(indexed.ranked_search("s01", 3)[0].symbol, "S01")
+
+    def test_concurrent_fetch(self):
+        provider = FakeQuoteProvider(latency=0.05, failures={"FLAKY": 2, "DOWN": 5}, hang={"SLOW"}, hang_time=0.5)
+        manager = LiveDataManager(provider, max_workers=64, timeout=0.2, retries=2, backoff=0.01)
+        manager.popular_symbols = [f"Q{i}" for i in range(60)] + ["FLAKY", "DOWN", "SLOW"]
+
+        start = time.perf_counter()
+        stocks = manager.fetch_top_stocks()
+        elapsed = time.perf_counter() - start
+
+        symbols = [s["symbol"] for s in stocks]
+        self.assertEqual(symbols, [f"Q{i}" for i in range(60)] + ["FLAKY"])  # watchlist order
+        self.assertEqual((provider.calls["FLAKY"], provider.calls["DOWN"], provider.calls["SLOW"]), (3, 3, 3))
+        self.assertLess(elapsed, 1.5)  # serially: 63 * 0.05s plus three 0.5s hangs
+        self.assertEqual(manager.fetch_stock_by_symbol("Q1")["volatility"], stocks[1]["volatility"])
+
+    def test_change_set_and_versions(self):
+        tracker = ChangeTracker(self.storage)
+        self.assertEqual(tracker.changes_since(0)["changes"], [])
+
+        symbols, prices = self.storage.diff_prices(["AAPL", "GOOG", "TSLA", "NOPE"], [150.0, 2100.0, 710.0, 1.0])
+        self.assertEqual((symbols, prices), (["GOOG", "TSLA"], [2100.0, 710.0]))
+        self.storage.update_many(symbols, prices)
+        self.assertEqual(tracker.version, 1)  # one batch, one version
+        self.assertEqual(len(self.s1.price_history), 0)  # unchanged symbol: no tick recorded
+
+        self.s5.update_price(250.0)  # same price: no new version
+        self.s6.volume = 9999
+        self.storage.delete_stock("AMZN")
+        delta = tracker.changes_since(1)
+        self.assertEqual([(c["symbol"], c["version"]) for c in delta["changes"]], [("NVDA", 2)])
+        self.assertEqual((delta["version"], delta["removed"], delta["reset"]), (3, ["AMZN"], False))
+        self.assertEqual([c["symbol"] for c in tracker.changes_since(0)["changes"]], ["GOOG", "TSLA", "NVDA"])
+        self.assertTrue(tracker.changes_since(99)["reset"])
+
+    def test_stream_broadcaster(self):
+        engine = TrendEngine(self.storage)
+        broadcaster = StreamBroadcaster(self.storage, engine, ChangeTracker(self.storage),
+                                        queue_size=2, max_lag=3, heartbeat=0.01)
+        fast, slow = broadcaster.stream(), broadcaster.stream()
+        self.assertEqual(next(fast), "retry: 3000\n\n")
+        next(slow)
+
+        self.storage.update_many(["AAPL", "TSLA"], [150.0, 750.0])  # AAPL unchanged
+        frame = next(fast)
+        self.assertTrue(frame.startswith("id: 1\nevent: tick\ndata: "))
+        payload = json.loads(frame.split("data: ", 1)[1])
+        self.assertEqual([t["symbol"] for t in payload["ticks"]], ["TSLA"])
+        self.assertEqual(payload["sentiment"], engine.get_sentiment())
+        self.assertEqual(next(fast), ": keepalive\n\n")
+
+        for price in (760.0, 770.0, 780.0):  # slow client: queue of 2 overflows once
+            self.s3.update_price(price)
+        frames = next(slow)
+        self.assertTrue(frames.startswith("event: resync\n"))
+        self.assertEqual(next(slow).count("event: tick"), 2)
+
+        for price in range(800, 806):  # more than max_lag drops without draining: disconnected
+            self.s3.update_price(float(price))
+        self.assertEqual(list(slow), [])
+        self.assertEqual(broadcaster.stats()["clients"], 1)
+        fast.close()
+        self.assertEqual(broadcaster.stats()["clients"], 0)
+
+    def test_rw_lock(self):
+        lock = RWLock()
+        with lock.write():
+            with lock.write(), lock.read():  # reentrant writer may also read
+                pass
+        with lock.read():
+            with lock.read():
+                pass
+            with self.assertRaises(RuntimeError):  # no read -> write upgrade
+                lock.acquire_write()
+
+        entered = threading.Event()
+
+        def second_reader():
+            with lock.read():
+                entered.set()
+
+        with lock.read():  # readers do not block each other
+            t = threading.Thread(target=second_reader)
+            t.start()
+            self.assertTrue(entered.wait(1))
+        t.join()
+
+        def queued_writer(lock, wrote):
+            with lock.write():
+                wrote.set()
+
+        for patience, reader_waits in [(60.0, False), (0.0, True)]:
+            lock, wrote = RWLock(writer_patience=patience), threading.Event()
+            entered.clear()
+            with lock.read():  # a long read, with a tick queued behind it
+                writer = threading.Thread(target=queued_writer, args=(lock, wrote))
+                writer.start()
+                while not lock._waiting_since:
+                    time.sleep(0.001)
+                t = threading.Thread(target=second_reader)
+                t.start()
+                # Within its patience a queued writer lets new readers in; past it they queue
+                self.assertEqual(entered.wait(0.2), not reader_waits)
+                self.assertFalse(wrote.is_set())
+            writer.join()
+            t.join()
+            self.assertTrue(entered.is_set() and wrote.is_set())
+
+    def test_concurrent_readers_and_writers(self):
+        indexes = StockIndexes(self.storage)
+        tracker = ChangeTracker(self.storage)
+        self.storage.update_many([s.symbol for s in self.storage.get_all_stocks()], [100.0] * 6)
+        stop = threading.Event()
+        errors = []
+
+        def writer(seed):
+            rng = random.Random(seed)
+            extra = f"X{seed}"
+            for i in range(300):
+                with self.storage.lock.write():  # a tick moves every price to one value
+                    price = float(rng.randint(1, 1000))
+                    live = [s.symbol for s in self.storage.get_all_stocks()]
+                    self.storage.update_many(live, [price] * len(live))
+                    if i % 10 == 0 and not self.storage.delete_stock(extra):
+                        self.storage.add_stock(Stock(extra, extra, "Tech", price, 10, 0.1))
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    with self.storage.lock.read():
+                        n = len(self.storage.stocks_list)
+                        self.assertEqual(n, len(self.storage.row_index))
+                        self.assertEqual(len(set(self.storage.prices[:n].tolist())), 1)
+                        self.assertEqual(self.sector.check_consistency(), [])
+                        self.assertEqual(len(indexes.top('price', n)), n)
+                        self.assertEqual(len(tracker.symbol_versions), n)
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        writers = [threading.Thread(target=writer, args=(seed,)) for seed in range(2)]
+        for t in readers + writers:
+            t.start()
+        for t in writers:
+            t.join()
+        stop.set()
+        for t in readers:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.storage.lock._readers, 0)
+
+    def test_market_store_warm_start(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        def state(storage, portfolio):
+            stocks = [(s.symbol, s.name, s.sector, s.price, s.volume, s.volatility, list(s.price_history))
+                      for s in storage.get_all_stocks()]
+            holdings = sorted((h.symbol, h.quantity, h.buy_price, h.platform) for h in portfolio.holdings.values())
+            return stocks, holdings
+
+        def restart():
+            storage = StockStorage()
+            portfolio = PortfolioManager(storage)
+            self.assertTrue(MarketStore(path).load(storage, portfolio))
+            return state(storage, portfolio)
+
+        portfolio = PortfolioManager(self.storage)
+        store = MarketStore(path)
+        store.attach(self.storage, portfolio)
+        self.storage.update_many(["AAPL", "TSLA"], [151.0, 755.0])
+        self.s2.update_price(2810.0)
+        self.s4.volume = 4321
+        self.storage.delete_stock("MSFT")
+        self.storage.add_stock(Stock("IBM", "IBM", "Tech", 140.0, 900, 0.2))
+        self.s1.price_history = [1.0, 2.0, 151.0]
+        portfolio.add_stock("AAPL", 10, 140.0, "Zerodha")
+        portfolio.add_stock("AAPL", 10, 160.0, "Groww")
+        self.assertEqual(restart(), state(self.storage, portfolio))
+
+        store.snapshot()  # compaction: one snapshot, an empty log, older generations gone
+        self.assertEqual(sorted(os.listdir(path)), ["log-2.jsonl", "snapshot-2"])
+        self.assertEqual(restart(), state(self.storage, portfolio))
+
+        self.storage.update_many(["TSLA"], [760.0])
+        store.close()
+        with open(os.path.join(path, "log-2.jsonl"), "ab") as f:
+            f.write(b'{"op":"tick","sym')  # crash mid-write
+        self.assertEqual(restart(), state(self.storage, portfolio))
+
+        storage = StockStorage()
+        portfolio = PortfolioManager(storage)
+        store = MarketStore(path)
+        store.load(storage, portfolio)
+        store.attach(storage, portfolio)  # keeps appending to the log that had the torn line
+        storage.update_many(["TSLA"], [765.0])
+        portfolio.add_stock("TSLA", 1, 700.0, "Groww")
+        store.close()
+        self.assertEqual(restart(), state(storage, portfolio))
+        self.assertFalse(MarketStore(tempfile.mkdtemp(dir=path)).load(StockStorage()))
+
+        # A cold start that crashed before its first snapshot completed left a log behind
+        cold = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cold)
+        with open(os.path.join(cold, "log-1.jsonl"), "w") as f:
+            f.write('{"op":"remove","symbol":"TSLA"}\n')
+        store = MarketStore(cold)
+        self.assertFalse(store.load(StockStorage()))
+        store.attach(storage, portfolio)  # the next cold start: snapshot-1 and an empty log-1
+        storage.update_many(["AAPL"], [152.0])
+        store.close()
+        restored = StockStorage()
+        restored_portfolio = PortfolioManager(restored)
+        self.assertTrue(MarketStore(cold).load(restored, restored_portfolio))
+        self.assertEqual(state(restored, restored_portfolio), state(storage, portfolio))
+
+    def test_tick_archive_ranges_and_bars(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        now = [1_000_020.0]
+        archive = TickArchive(path, flush_every=3, flush_interval=None, clock=lambda: now[0])
+        archive.attach(self.storage)
+
+        ticks = [(1_000_020.0, 700.0), (1_000_050.0, 710.0), (1_000_070.0, 690.0),
+                 (1_000_110.0, 705.0), (1_003_700.0, 720.0), (1_003_650.0, 730.0)]  # clock steps back
+        for ts, price in ticks:
+            now[0] = ts
+            self.storage.update_many(["TSLA", "AAPL"], [price, 150.0])
+        self.s3.volume = 5000  # not a tick: no record
+
+        # Ticks only buffer (they run under the write lock), and reads never write.
+        self.assertFalse(os.path.exists(archive._file("TSLA")))
+        self.assertEqual(len(archive.get_history("TSLA")), 0)
+        archive.flush()
+
+        history = archive.get_history("TSLA")
+        self.assertEqual(history['price'].tolist(), [p for _, p in ticks])
+        self.assertEqual(history['ts'][-1], 1_003_700.0)  # clamped, the file stays sorted
+        self.assertEqual(archive.get_history("TSLA", 1_000_050.0, 1_000_110.0)['price'].tolist(), [710.0, 690.0])
+
+        bars = archive.get_ohlc("TSLA", "1m")
+        self.assertEqual([(b["time"], b["open"], b["high"], b["low"], b["close"]) for b in bars], [
+            (1_000_020, 700.0, 710.0, 690.0, 690.0),
+            (1_000_080, 705.0, 705.0, 705.0, 705.0),
+            (1_003_680, 720.0, 730.0, 720.0, 730.0),
+        ])
+        self.assertEqual(archive.get_ohlc("TSLA", "1m", chunk=1), bars)  # chunking never splits a bar
+        self.assertEqual(len(archive.get_ohlc("TSLA", "1h")), 2)
+        self.assertEqual(archive.get_ohlc("TSLA", "1d", start=1_003_000.0)[0]["open"], 720.0)
+        with self.assertRaises(ValueError):
+            archive.get_ohlc("TSLA", "2m")
+
+        self.storage.delete_stock("TSLA")  # the archive outlives the stock
+        self.assertEqual(len(TickArchive(path).get_history("TSLA")), len(ticks))
+        self.assertEqual(len(archive.get_history("NOPE")), 0)
+
+        # A restarted archive clamps against what is already on disk.
+        restarted = TickArchive(path, flush_interval=None)
+        restarted.append("TSLA", 740.0, 1, ts=1_000_000.0)
+        restarted.flush()
+        self.assertEqual(restarted.get_history("TSLA")['ts'][-1], 1_003_700.0)
+
+        # The background flusher writes the buffer out on its own.
+        background = TickArchive(path, flush_every=1, flush_interval=60.0)
+        background.attach(self.storage)
+        self.addCleanup(background.close)
+        self.storage.update_many(["AAPL"], [151.0])
+        deadline = time.time() + 5
+        while len(background.get_history("AAPL")) < len(ticks) + 1 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(background.get_history("AAPL")['price'][-1], 151.0)
+
+    def test_tick_archive_torn_tail_and_failed_flush(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        archive = TickArchive(path, flush_interval=None)
+        for i in range(3):
+            archive.append("TSLA", 700.0 + i, 1, ts=float(i))
+        archive.flush()
+        with open(archive._file("TSLA"), 'ab') as f:
+            f.write(b'\x00' * 5)  # crash mid-record
+
+        self.assertEqual(len(archive.get_history("TSLA")), 3)  # the torn record is not mapped
+        restarted = TickArchive(path, flush_interval=None)
+        restarted.append("TSLA", 710.0, 1, ts=10.0)
+        restarted.flush()
+        self.assertEqual(os.path.getsize(archive._file("TSLA")) % TICK_DTYPE.itemsize, 0)
+        self.assertEqual(restarted.get_history("TSLA")['price'].tolist(), [700.0, 701.0, 702.0, 710.0])
+
+        # A failed write keeps its records buffered, ahead of later appends.
+        write = restarted._write
+        def failing(symbol, records):
+            raise OSError("disk full")
+        restarted._write = failing
+        restarted.append("TSLA", 711.0, 1, ts=11.0)
+        with self.assertRaises(OSError):
+            restarted.flush()
+        restarted.append("TSLA", 712.0, 1, ts=12.0)
+        restarted._write = write
+        restarted.flush()
+        self.assertEqual(restarted.get_history("TSLA")['price'].tolist()[-2:], [711.0, 712.0])
+
+        # The background flusher outlives a failed flush.
+        background = TickArchive(path, flush_every=1, flush_interval=0.01)
+        failures = [1]
+        def flaky(symbol, records):
+            if failures:
+                failures.pop()
+                raise OSError("disk full")
+            TickArchive._write(background, symbol, records)
+        background._write = flaky
+        background.attach(self.storage)
+        self.addCleanup(background.close)
+        background.append("TSLA", 713.0, 1, ts=13.0)
+        deadline = time.time() + 5
+        while len(background.get_history("TSLA")) < 7 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(background.get_history("TSLA")['price'][-1], 713.0)
+
+    def test_bar_builder_matches_brute_force(self):
+        now = [3600.0 * 1000]
+        builder = BarBuilder(self.storage, max_bars=1000, clock=lambda: now[0])
+        rng = random.Random(11)
+        observed = {s.symbol: [(now[0], s.price, 0)] for s in self.storage.get_all_stocks()}
+        symbols = list(observed)
+        for _ in range(400):
+            now[0] += rng.uniform(1, 90)
+            batch = rng.sample(symbols, 3)
+            prices = [round(rng.uniform(100, 200), 2) for _ in batch]
+            traded = [rng.randint(0, 50) for _ in batch]
+            for symbol, bought in zip(batch, traded):  # session volume grows, or resets to a new session
+                stock = self.storage.get_stock(symbol)
+                reset = rng.random() < 0.05 and bought < stock.volume  # a drop reads as a new session
+                stock.volume = bought if reset else stock.volume + bought
+            self.storage.update_many(batch, prices)
+            for symbol, price, bought in zip(batch, prices, traded):
+                observed[symbol].append((now[0], price, bought))
+
+        for resolution, width in (("1m", 60), ("15m", 900), ("1h", 3600)):
+            for symbol, ticks in observed.items():
+                expected = {}
+                for ts, price, traded in ticks:
+                    bucket = int(ts // width) * width
+                    bar = expected.setdefault(bucket, {"time": bucket, "open": price, "high": price,
+                                                       "low": price, "close": price, "volume": 0})
+                    bar["high"], bar["low"] = max(bar["high"], price), min(bar["low"], price)
+                    bar["close"] = price
+                    bar["volume"] += traded
+                self.assertEqual(builder.get_bars(symbol, resolution), list(expected.values()))
+
+        tail = builder.get_bars("AAPL", "1m", limit=3)
+        self.assertEqual(tail, builder.get_bars("AAPL", "1m")[-3:])
+        self.assertEqual(builder.get_closes("AAPL", "1m", 3), [b["close"] for b in tail])
+        with self.assertRaises(ValueError):
+            BarBuilder(self.storage)
+        storage = StockStorage()
+        storage.add_stock(Stock("IBM", "IBM", "Tech", 140.0, 900, 0.2))
+        small = BarBuilder(storage, resolutions=("1m",), max_bars=2, clock=lambda: now[0])
+        for _ in range(5):
+            now[0] += 60
+            storage.update_price("IBM", 141.0)
+        self.assertEqual(len(small.get_bars("IBM", "1m", include_open=False)), 2)  # bounded
+        self.storage.delete_stock("AAPL")
+        self.assertEqual(builder.get_bars("AAPL", "1m"), [])
+        with self.assertRaises(ValueError):
+            builder.get_bars("TSLA", "2m")
+
+    def test_response_cache_versions_etags_and_lru(self):
+        app = Flask(__name__)
+        cache = ResponseCache(lambda: self.storage.write_version, max_entries=2)
+        builds = []
+
+        @app.route('/prices')
+        @cache.cached
+        def prices():
+            builds.append(request.args.get('sector'))
+            if request.args.get('sector') == 'none':
+                return jsonify({"error": "no such sector"}), 404
+            resp = jsonify([s.price for s in self.storage.get_all_stocks()])
+            resp.headers['X-Total-Count'] = str(len(self.storage.get_all_stocks()))
+            return resp
+
+        client = app.test_client()
+        first = client.get('/prices')
+        again = client.get('/prices')
+        self.assertEqual((first.headers['X-Cache'], again.headers['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(again.get_data(), first.get_data())
+        self.assertEqual(again.headers['X-Total-Count'], '6')
+        self.assertEqual(len(builds), 1)
+
+        etag = first.headers['ETag']
+        self.assertEqual(client.get('/prices', headers={'If-None-Match': etag}).status_code, 304)
+        self.s1.update_price(151.0)
+        changed = client.get('/prices', headers={'If-None-Match': etag})
+        self.assertEqual((changed.status_code, changed.headers['X-Cache']), (200, 'MISS'))
+        self.s1.price_history = list(self.s1.price_history)  # a new version with an identical body
+        rebuilt = client.get('/prices', headers={'If-None-Match': changed.headers['ETag']})
+        self.assertEqual((rebuilt.status_code, rebuilt.headers['X-Cache']), (304, 'MISS'))
+
+        client.get('/prices?sector=Tech')
+        client.get('/prices?sector=Auto')  # evicts the least recently used entry
+        self.assertEqual(client.get('/prices?sector=none').status_code, 404)  # errors are not cached
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["not_modified"]), (2, 2, 2))
+        self.assertGreaterEqual(stats["evictions"], 1)
+        self.assertEqual(stats["bytes"], sum(len(e.body) for e in cache.entries.values()))
+
+    def test_projection_matches_asdict(self):
+        self.s1.update_price(151.5)
+        stocks = self.storage.get_all_stocks()[::-1]
+        full = [asdict(s) for s in stocks]
+        self.assertEqual(project(self.storage, stocks, STOCK_FIELDS), full)
+        self.assertEqual(project(self.storage, stocks), [{k: d[k] for k in LIST_FIELDS} for d in full])
+        self.assertEqual(project(self.storage, stocks[:2], parse_fields("price, symbol,price")),
+                         [{"price": d["price"], "symbol": d["symbol"]} for d in full[:2]])
+        self.assertEqual(parse_fields(""), LIST_FIELDS)
+        with self.assertRaises(ValueError):
+            parse_fields("symbol,password")
+
+        encoded = serialization.dumps(full)
+        self.assertEqual(json.loads(encoded), full)
+        fast, serialization.orjson = serialization.orjson, None  # stdlib fallback
+        try:
+            self.assertEqual(json.loads(serialization.dumps(full)), full)
+        finally:
+            serialization.orjson = fast
+
+    def test_slotted_stock_stays_compatible(self):
+        stock = Stock("SLOT", "Slotted Inc", "".join(["Te", "ch"]), 10, 500, 0.1)
+        self.assertFalse(hasattr(stock, '__dict__'))
+        self.assertFalse(hasattr(PortfolioItem("SLOT", 1, 10.0, "Broker"), '__dict__'))
+        self.assertIs(stock.sector, self.s1.sector)  # interned
+
+        for i in range(HISTORY_LENGTH + 5):
+            stock.update_price(float(i))
+        self.assertEqual(len(stock.price_history), HISTORY_LENGTH)
+        self.assertEqual(stock.price_history, [float(i) for i in range(5, HISTORY_LENGTH + 5)])
+        copy = Stock("SLOT", "Slotted Inc", "Tech", stock.price, 500, 0.1, list(stock.price_history))
+        self.assertEqual(stock, copy)
+        expected = asdict(stock)
+        self.assertEqual(expected["price_history"], list(stock.price_history))
+
+        self.storage.add_stock(stock)
+        self.assertEqual(asdict(stock), expected)
+        self.assertEqual(stock.price_history, copy.price_history)
+        self.storage.delete_stock("SLOT")
+        self.assertEqual(asdict(stock), expected)  # detached values are copied back
+        stock.price = 12.5
+        self.assertEqual(stock.price, 12.5)
+
+    def test_portfolio_incremental_aggregates(self):
+        portfolio = PortfolioManager(self.storage)
+        portfolio.add_stock("AAPL", 10, 140.0, "Zerodha")
+        portfolio.add_stock("TSLA", 3, 800.0, "Groww")
+        portfolio.add_stock("AAPL", 5, 160.0, "Groww")  # a second lot, on another platform
+        portfolio.add_stock("AMZN", 1, 3000.0, "Upstox")
+
+        def assert_matches():
+            # What the old full sweep produced: holdings synced to storage, then summed.
+            items = portfolio.holdings.values()
+            for item in items:
+                stock = self.storage.get_stock(item.symbol)
+                if stock is not None:
+                    self.assertEqual((item.current_price, item.volatility), (stock.price, stock.volatility))
+                self.assertAlmostEqual(item.current_value, item.quantity * item.current_price, places=6)
+            platforms, sectors = {}, {}
+            for item in items:
+                for platform, quantity in item.platform_quantities.items():
+                    platforms[platform] = platforms.get(platform, 0.0) + quantity * item.current_price
+                sectors[item.sector] = sectors.get(item.sector, 0.0) + item.current_value
+            investment = sum(i.quantity * i.buy_price for i in items)
+            value = sum(i.current_value for i in items)
+            stats = portfolio.get_portfolio_stats()
+            self.assertAlmostEqual(stats["total_investment"], investment, places=6)
+            self.assertAlmostEqual(stats["current_value"], value, places=6)
+            self.assertAlmostEqual(stats["total_pl"], value - investment, places=6)
+            self.assertAlmostEqual(portfolio.volatility_sum, sum(i.volatility for i in items), places=9)
+            for want, got in [(platforms, portfolio.get_platform_distribution()),
+                              (sectors, portfolio.get_sector_distribution())]:
+                self.assertEqual(want.keys(), got.keys())
+                for key in want:
+                    self.assertAlmostEqual(want[key], got[key], places=6)
+
+        assert_matches()
+        self.assertEqual(portfolio.get_platform_distribution().keys(), {"Zerodha", "Groww", "Upstox"})
+        rng = random.Random(3)
+        for _ in range(50):
+            self.storage.update_many(["AAPL", "MSFT", "TSLA"], [rng.uniform(100, 900) for _ in range(3)])
+        self.s4.update_price(3100.0)
+        self.s3.volatility = 0.9
+        assert_matches()
+        self.assertEqual(portfolio.holdings["TSLA"].current_price, self.s3.price)
+        self.assertEqual(portfolio.holdings["TSLA"].volatility, 0.9)
+
+        self.storage.delete_stock("TSLA")  # the holding keeps its last values
+        self.storage.update_many(["AAPL"], [170.0])
+        assert_matches()
+        self.storage.add_stock(Stock("TSLA", "Tesla", "Auto", 820.0, 2000, 0.6))
+        self.assertEqual(portfolio.holdings["TSLA"].current_price, 820.0)
+        assert_matches()
+
+        for i in range(len(self.storage.prices)):  # grow past the initial capacity
+            self.storage.add_stock(Stock(f"X{i}", f"X {i}", "Misc", 10.0, 100, 0.1))
+        last = self.storage.stocks_list[-1].symbol
+        portfolio.add_stock(last, 4, 9.0, "Groww")
+        self.storage.delete_stock("X0")  # swap-remove moves the held last row and its holder count
+        self.storage.update_many(["AAPL", last], [180.0, 11.0])
+        self.assertEqual(portfolio.holdings[last].current_price, 11.0)
+        assert_matches()
+
+        value = portfolio.current_value
+        portfolio.current_value += 1e-3  # drift the ticks' deltas could accumulate
+        portfolio.platform_values["Groww"] += 1e-3
+        portfolio.resync()
+        self.assertAlmostEqual(portfolio.current_value, value, places=9)
+        assert_matches()
+
+    def test_portfolio_book_fans_out_ticks(self):
+        book = PortfolioBook(self.storage)
+        alice, alice_ira = book.portfolio("alice"), book.portfolio("alice", "ira")
+        bob = book.portfolio("bob")
+        alice.add_stock("AAPL", 10, 140.0, "Zerodha")
+        alice_ira.add_stock("TSLA", 2, 650.0, "Groww")
+        bob.add_stock("AAPL", 1, 100.0, "Groww")
+        bob.add_stock("GOOG", 4, 1900.0, "Groww")
+        self.assertIs(book.get("carol"), book.get("dave", "x"))  # reads do not create portfolios
+        self.assertEqual(book.accounts, {"alice": ["main", "ira"], "bob": ["main"]})
+        self.assertEqual(book.symbol_index["AAPL"], [alice, bob])
+
+        self.storage.update_many(["AAPL", "GOOG", "MSFT"], [155.0, 2100.0, 260.0])
+        self.s3.update_price(720.0)
+        self.assertEqual(alice.get_portfolio_stats()["current_value"], 1550.0)
+        self.assertEqual(alice_ira.get_portfolio_stats()["current_value"], 1440.0)
+        self.assertEqual(bob.get_portfolio_stats()["current_value"], 155.0 + 8400.0)
+        self.assertEqual(bob.get_sector_distribution(), {"Tech": 8555.0})
+        self.assertEqual(book.get("carol").get_portfolio_stats()["current_value"], 0.0)
+        self.assertEqual(book.resync(), 3)
+        self.assertEqual(bob.get_sector_distribution(), {"Tech": 8555.0})
+
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        store = MarketStore(path)
+        store.attach(self.storage, book)
+        bob.add_stock("NVDA", 3, 500.0, "Upstox")
+        store.close()
+        storage = StockStorage()
+        restored = PortfolioBook(storage)
+        self.assertTrue(MarketStore(path).load(storage, restored))
+        self.assertEqual(sorted(map(sorted, map(dict.items, restored.holding_records()))),
+                         sorted(map(sorted, map(dict.items, book.holding_records()))))
+        self.assertEqual(restored.get("bob").get_portfolio_stats(), bob.get_portfolio_stats())
+
+    def test_ledger_cost_basis_and_checkpoints(self):
+        ledger = Ledger(checkpoint_every=4)
+        ledger.buy(10, 100.0, "Zerodha", ts=1)
+        ledger.buy(10, 120.0, "Zerodha", ts=2)
+        ledger.sell(15, 130.0, "Zerodha", ts=3)
+        expected = {FIFO: (350.0, 600.0), LIFO: (250.0, 500.0), AVERAGE: (300.0, 550.0)}
+        for method, (realized, cost) in expected.items():
+            position = ledger.position(method)
+            self.assertEqual((position.quantity, position.realized, position.cost), (5, realized, cost))
+        ledger.split(2, ts=4)
+        self.assertEqual(ledger.position(FIFO).lots, {"Zerodha": deque([(10, 60.0)])})
+        with self.assertRaises(ValueError):
+            ledger.sell(11, 1.0, "Zerodha")
+        with self.assertRaises(ValueError):
+            ledger.sell(1, 1.0, "Groww")
+
+        rng = random.Random(6)
+        for _ in range(60):
+            platform = rng.choice(["A", "B"])
+            held = ledger.open.get(platform, 0)
+            if held and rng.random() < 0.4:
+                ledger.sell(rng.randint(1, int(held)), rng.uniform(50, 150), platform)
+            elif rng.random() < 0.05:
+                ledger.split(rng.choice([2, 3]))
+            else:
+                ledger.buy(rng.randint(1, 20), rng.uniform(50, 150), platform)
+
+        def replayed(method, upto):
+            position = Position()
+            for txn in ledger.transactions[:upto]:
+                position.apply(txn, method)
+            return position
+
+        for method in COST_BASIS_METHODS:
+            for upto in (None, 0, 3, 17, 40, len(ledger) - 1):
+                got, want = ledger.position(method, upto), replayed(method, upto)
+                self.assertEqual(got.count, want.count)
+                self.assertAlmostEqual(got.realized, want.realized, places=6)
+                self.assertAlmostEqual(got.cost, want.cost, places=6)
+
+        applied = []
+        original = Position.apply
+        Position.apply = lambda position, txn, method: (applied.append(txn), original(position, txn, method))
+        try:
+            ledger.position(LIFO, upto=len(ledger) - 2)
+            ledger.buy(1, 100.0, "A")
+            ledger.position(LIFO)
+        finally:
+            Position.apply = original
+        self.assertLessEqual(len(applied), ledger.checkpoint_every + 1)  # replays from a checkpoint, not from 0
+
+        ledger = Ledger()  # fractional splits on large lots: the lots round apart from Ledger.open
+        for quantity in (0.1, 1e6, 7.3e8):
+            ledger.buy(quantity, 10.0, "A")
+        ledger.split(1.5)
+        ledger.split(7)
+        ledger.sell(ledger.open["A"], 12.0, "A")  # everything
+        self.assertEqual(ledger.open, {})
+        for method in COST_BASIS_METHODS:
+            position = ledger.position(method)
+            self.assertEqual(position.lots, {})
+            self.assertAlmostEqual(position.realized, 12.0 * ledger.transactions[-1].quantity - 10.0 * (0.1 + 1e6 + 7.3e8),
+                                   delta=1e-3)
+
+    def test_portfolio_sells_and_splits(self):
+        book = PortfolioBook(self.storage)
+        portfolio = book.portfolio("alice")
+        portfolio.add_stock("AAPL", 10, 100.0, "Zerodha")
+        portfolio.add_stock("AAPL", 10, 120.0, "Zerodha")
+        portfolio.add_stock("AAPL", 4, 150.0, "Groww")
+        with self.assertRaises(ValueError):
+            portfolio.sell_stock("AAPL", 5, 130.0)  # two platforms hold it
+        self.assertEqual(portfolio.sell_stock("AAPL", 15, 130.0, "Zerodha"), 300.0)  # average cost
+        item = portfolio.holdings["AAPL"]
+        self.assertEqual((item.quantity, item.platform_quantities), (9, {"Zerodha": 5, "Groww": 4}))
+        self.assertEqual(portfolio.get_portfolio_stats()["realized_pl"], 300.0)
+
+        portfolio.set_cost_basis(FIFO)
+        self.assertEqual(portfolio.get_portfolio_stats()["realized_pl"], 350.0)
+        self.assertAlmostEqual(portfolio.get_portfolio_stats()["total_investment"], 600.0 + 600.0)
+        self.assertEqual(book.apply_split("aapl", 2), 1)
+        self.assertEqual(item.quantity, 18)
+        self.assertAlmostEqual(item.buy_price, 1200.0 / 18)
+        self.assertEqual(portfolio.get_platform_distribution(), {"Zerodha": 10 * 150.0, "Groww": 8 * 150.0})
+        self.assertEqual(portfolio.get_ledger("AAPL")["positions"][LIFO]["realized_pl"], 250.0)
+        self.assertTrue(all(type(txn.quantity) is float for txn in portfolio.ledgers["AAPL"].transactions))
+        self.assertIs(type(item.quantity), float)
+        with self.assertRaises(ValueError):
+            portfolio.sell_stock("AAPL", float("nan"), 130.0, "Zerodha")
+
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        store = MarketStore(path)
+        store.attach(self.storage, book)  # snapshot with the ledgers so far
+        portfolio.sell_stock("AAPL", 8, 90.0, "Groww")  # logged
+        store.close()
+        restored = PortfolioBook(StockStorage())
+        store = MarketStore(path)
+        self.assertTrue(store.load(restored.storage, restored))
+        self.assertEqual(restored.get("alice").ledgers["AAPL"].transactions, portfolio.ledgers["AAPL"].transactions)
+        self.assertEqual(restored.get("alice").cost_basis, FIFO)  # from the snapshot
+        self.assertEqual(restored.get("alice").realized_pl, portfolio.realized_pl)
+
+        store.attach(restored.storage, restored)
+        restored.get("alice").set_cost_basis(LIFO)  # logged
+        store.close()
+        reloaded = PortfolioBook(StockStorage())
+        MarketStore(path).load(reloaded.storage, reloaded)
+        self.assertEqual(reloaded.get("alice").cost_basis, LIFO)
+        self.assertEqual(reloaded.get("alice").realized_pl, restored.get("alice").realized_pl)
+
+    def test_portfolio_closed_holding_drops_out(self):
+        book = PortfolioBook(self.storage)
+        portfolio = book.portfolio("alice")
+        portfolio.add_stock("AAPL", 10, 100.0, "Zerodha")
+        portfolio.add_stock("GOOG", 2, 100.0, "Zerodha")
+        row = self.storage.get_row("AAPL")
+        self.assertEqual(portfolio.sell_stock("AAPL", 10, 130.0), 300.0)
+
+        self.assertNotIn("AAPL", portfolio.holdings)
+        self.assertNotIn("AAPL", book.symbol_index)
+        self.assertEqual(book.holders[row], 0)
+        self.assertEqual([h["symbol"] for h in portfolio.get_top_k_holdings(5, 'risk')], ["GOOG"])
+        self.assertEqual(len(portfolio.get_risk_vs_profit_data()), 1)
+        self.assertEqual(portfolio.volatility_sum, self.s2.volatility)
+        self.assertEqual(portfolio.get_portfolio_stats()["realized_pl"], 300.0)
+        self.storage.update_many(["AAPL"], [160.0])  # not followed any more
+        self.assertEqual(portfolio.get_portfolio_stats()["current_value"], 2 * self.s2.price)
+
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        store = MarketStore(path)
+        store.attach(self.storage, book)  # the closed ledger is in the snapshot
+        store.close()
+        restored = PortfolioBook(StockStorage())
+        MarketStore(path).load(restored.storage, restored)
+        self.assertEqual(restored.get("alice").realized_pl, 300.0)
+        self.assertNotIn("AAPL", restored.get("alice").holdings)
+
+        portfolio.add_stock("AAPL", 1, 150.0, "Zerodha")  # reopened
+        self.assertEqual(book.holders[row], 1)
+        self.assertEqual(portfolio.holdings["AAPL"].realized_pl, 300.0)
+        self.assertEqual(portfolio.get_portfolio_stats()["realized_pl"], 300.0)
+        portfolio.sell_stock("AAPL", 1, 140.0)
+        portfolio.sell_stock("GOOG", 2, 100.0)
+        self.assertEqual(portfolio.holdings, {})
+        self.assertEqual(portfolio.get_portfolio_stats()["realized_pl"], 290.0)
+
+    def test_risk_model_matches_brute_force(self):
+        rng = np.random.default_rng(8)
+        stocks = [self.s1, self.s2, self.s3, self.s4, self.s5, self.s6]
+        loadings = np.array([0.5, 1.0, 1.5, 0.2, 0.8, 1.2])
+        portfolio = PortfolioManager(self.storage)
+        for symbol, quantity in [("AAPL", 10), ("TSLA", 3), ("AMZN", 1), ("GOOG", 2)]:
+            portfolio.add_stock(symbol, quantity, 100.0, "Zerodha")
+        self.assertIsNone(portfolio.get_risk_report())  # stored histories are not aligned: wait for ticks
+
+        observed = []  # per-tick log returns of every stock, the brute-force reference
+
+        def tick(moving=stocks):
+            shocks = loadings * rng.normal(0, 0.01) + rng.normal(0, 0.01, len(stocks))
+            returns = np.array([shock if stock in moving else 0.0 for stock, shock in zip(stocks, shocks)])
+            old = np.array([stock.price for stock in stocks])
+            self.storage.update_many([stock.symbol for stock in moving],
+                                     [stock.price * float(np.exp(r)) for stock, r in zip(stocks, returns)
+                                      if stock in moving])
+            observed.append(np.log(np.array([stock.price for stock in stocks]) / old))
+
+        def check(report):
+            returns = np.array(observed[-(HISTORY_LENGTH - 1):])
+            returns = np.column_stack([returns, returns.mean(axis=1)])  # equal-weighted market last
+            columns = [stocks.index(self.storage.get_stock(symbol)) for symbol in report["symbols"]]
+            cov = np.cov(returns[:, columns + [6]], rowvar=False)
+            values = np.array([portfolio.holdings[symbol].current_value for symbol in report["symbols"]])
+            weights = values / values.sum()
+            volatility = np.sqrt(weights @ cov[:-1, :-1] @ weights)
+            self.assertEqual(report["observations"], len(returns))
+            self.assertAlmostEqual(report["volatility"], volatility, places=10)
+            pnl = np.expm1(returns[:, columns]) @ values
+            self.assertAlmostEqual(report["var"]["historical"], -np.quantile(pnl, 0.05), places=6)
+            self.assertGreaterEqual(report["cvar"]["historical"], report["var"]["historical"])
+            self.assertGreaterEqual(report["cvar"]["parametric"], report["var"]["parametric"])
+            betas = cov[:-1, -1] / cov[-1, -1]
+            self.assertTrue(np.allclose([h["beta"] for h in report["holdings"]], betas))
+            self.assertAlmostEqual(sum(h["contribution"] for h in report["holdings"]), volatility, places=10)
+            self.assertTrue(np.allclose(np.diag(report["correlation"]), 1.0))
+
+        for _ in range(40):
+            tick()
+        check(portfolio.get_risk_report())
+        for _ in range(150):  # the model is read once after wrapping the window: a rebuild
+            tick()
+        check(portfolio.get_risk_report())
+        self.assertEqual(portfolio.risk_model.count, HISTORY_LENGTH - 1)
+        for i in range(HISTORY_LENGTH + 5):  # read every tick: rank-one updates and an exact resync
+            tick(stocks if i % 3 else [self.s1, self.s3])  # the rest did not move: zero returns
+            if i % 10 == 0:
+                check(portfolio.get_risk_report())
+        check(portfolio.get_risk_report())
+
+        model = portfolio.risk_model
+        held = len(model.symbols)
+        before = model.covariance()
+        portfolio.add_stock("NVDA", 5, 100.0, "Groww")  # a new holding joins with its window
+        after = model.covariance()
+        self.assertEqual(model.symbols[-1], "NVDA")
+        self.assertTrue(np.array_equal(after[:held, :held], before[:held, :held]))
+        self.assertTrue(np.array_equal(after[:held, -1], before[:held, -1]))
+        self.assertEqual(after[-1, -1], before[-1, -1])
+        check(portfolio.get_risk_report())
+        score = portfolio.calculate_portfolio_health_score()
+        self.assertTrue(0 <= score <= 100)
+
+    def test_monte_carlo_simulation(self):
+        values = np.array([1000.0, 500.0])
+        steady = np.tile([0.01, -0.02], (20, 1))  # no variance: every path is the same
+        for method in simulate.METHODS:
+            result = simulate.simulate(values, steady, horizon=5, paths=300, method=method)
+            expected = [float(values @ np.exp(np.array([0.01, -0.02]) * t)) for t in range(6)]
+            for band in result["bands"].values():
+                self.assertTrue(np.allclose(band, expected))
+
+        rng = np.random.default_rng(10)
+        returns = rng.normal(0.001, 0.02, (60, 2))
+        self.addCleanup(simulate.shutdown)
+        for method in simulate.METHODS:
+            inline = simulate.simulate(values, returns, horizon=10, paths=5_000, method=method, seed=3)
+            pooled = simulate.simulate(values, returns, horizon=10, paths=5_000, method=method, seed=3, workers=2)
+            self.assertEqual(inline, pooled)  # the seed decides the paths, not the worker count
+            self.assertNotEqual(inline, simulate.simulate(values, returns, horizon=10, paths=5_000,
+                                                          method=method, seed=4))
+            bands = [inline["bands"][f"p{p}"] for p in simulate.DEFAULT_PERCENTILES]
+            self.assertTrue(all(np.all(np.diff(np.array(bands)[:, t]) >= 0) for t in range(11)))
+            self.assertEqual(bands[0][0], 1500.0)
+        with self.assertRaises(ValueError):
+            simulate.simulate(values, returns, method="heston")
+        with self.assertRaises(ValueError):  # the whole value matrix is held for the bands
+            simulate.simulate(values, returns, horizon=250, paths=200_000)
+        self.assertNotEqual(simulate._CONTEXT.get_start_method(), "fork")
+        # Workers re-import the main module: importing the app must not load or start anything.
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        probe = ("import threading, app; "
+                 "print(threading.active_count(), len(app.storage.stocks_list), app.stock_indexes)")
+        output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env={**os.environ, "STOCK_DATA_DIR": path}).stdout
+        self.assertEqual(output.split(), ["1", "0", "None"])
+
+        portfolio = PortfolioManager(self.storage)
+        portfolio.add_stock("AAPL", 10, 100.0, "Zerodha")
+        portfolio.add_stock("GOOG", 1, 100.0, "Zerodha")
+        self.assertIsNone(portfolio.simulation_inputs())  # no ticks yet
+        for _ in range(30):
+            self.storage.update_many(["AAPL", "GOOG"], (np.array([self.s1.price, self.s2.price])
+                                                        * np.exp(rng.normal(0, 0.01, 2))).tolist())
+        symbols, values, returns = portfolio.simulation_inputs()
+        self.assertEqual((symbols, returns.shape), (["AAPL", "GOOG"], (30, 2)))
+        self.assertEqual(values.tolist(), [self.s1.price * 10, self.s2.price])
+
     def test_ranking(self):
         top = self.ranking.get_top_k_stocks(1, 'price')
         self.assertEqual(top[0].symbol, "AMZN")
@@ -71,6 +980,78 @@ class TestStockMarketAnalyzer(unittest.TestCase):
         sorted_small = self.sorter.hybrid_sort(small_list, 'price', True)
         self.assertEqual(sorted_small[0].symbol, "AAPL")
 
+    def test_sort_engines(self):
+        self.s5.update_price(600.0)  # ties with NVDA
+        stocks = self.storage.get_all_stocks()
+        expected = sorted(sorted(stocks, key=lambda s: s.price, reverse=True), key=lambda s: s.sector)
+        for engine in ('numpy', 'timsort'):
+            sorter = StockSorter(engine=engine)
+            self.assertEqual(sorter.sort(stocks, [('sector', True), ('price', False)]), expected)
+            desc = sorter.hybrid_sort(stocks, 'price', ascending=False)
+            self.assertEqual([s.symbol for s in desc], ["AMZN", "GOOG", "TSLA", "MSFT", "NVDA", "AAPL"])
+            by_name = sorter.sort(stocks, [('name', False)])
+            self.assertEqual(by_name, sorted(stocks, key=lambda s: s.name, reverse=True))
+
+        legacy = StockSorter(threshold=5, engine='hybrid')
+        self.assertEqual(legacy.hybrid_sort(stocks, 'price')[0].symbol, "AAPL")
+
+    def test_sorted_index_pagination(self):
+        indexes = StockIndexes(self.storage)
+        self.s1.update_price(2500.0)
+        self.storage.update_many(["TSLA"], [10.0])
+        self.s4.volume = 9000
+        self.storage.delete_stock("GOOG")
+        self.storage.add_stock(Stock("IBM", "IBM", "Tech", 600.0, 900, 0.2))
+
+        sorter = StockSorter()
+        for key in ('price', 'volume', 'name', 'score'):
+            for descending in (False, True):
+                pages, cursor = [], None
+                while True:
+                    page, cursor, total = indexes.query(key, descending, limit=2, cursor=cursor)
+                    pages.extend(page)
+                    if not cursor:
+                        break
+                scores = self.ranking.calculate_priority_scores()
+                expected = sorter.sort(self.storage.get_all_stocks(), [(scores if key == 'score' else key, not descending)])
+                self.assertEqual(pages, expected)
+                self.assertEqual(total, 6)
+
+        page, _, _ = indexes.query('price', limit=2, offset=1)
+        self.assertEqual([s.symbol for s in page], ["MSFT", "NVDA"])  # NVDA/IBM tie: insertion order
+        tech, _, total = indexes.query('price', descending=True, sector='Tech', limit=1)
+        self.assertEqual((tech[0].symbol, total), ("AMZN", 5))
+        with self.assertRaises(ValueError):
+            indexes.query('name', cursor=indexes.query('price', limit=1)[1])
+
+        # sort=sector within one sector is not indexed: /api/stocks sorts those stocks directly
+        self.assertTrue(indexes.covers('sector') and not indexes.covers('sector', 'Tech'))
+        self.assertTrue(all(indexes.covers(key, 'Tech') for key in ('price', 'volume', 'name', 'score')))
+        tech = self.storage.get_stocks_by_sector('Tech')
+        self.assertEqual(sorter.sort(tech, [('sector', False)]), tech)
+
+    def test_leaderboards_match_nlargest(self):
+        rng = random.Random(3)
+        for i in range(60):
+            self.storage.add_stock(Stock(f"X{i}", f"X {i}", rng.choice(["Tech", "Auto", "Bank"]),
+                                         float(rng.randint(1, 20)), rng.randint(1, 5) * 100, 0.5))
+        live = RankingManager(self.storage, StockIndexes(self.storage))
+        symbols = [s.symbol for s in self.storage.get_all_stocks()]
+        for _ in range(200):
+            self.storage.get_stock(rng.choice(symbols)).update_price(float(rng.randint(1, 20)))
+        self.storage.delete_stock("X5")
+
+        keys = {'price': lambda s: s.price, 'volume': lambda s: s.volume,
+                'score': self.ranking.calculate_priority_score}
+        stocks = self.storage.get_all_stocks()
+        for criteria, key in keys.items():
+            for k in (1, 5, 70):
+                self.assertEqual(live.get_top_k_stocks(k, criteria), heapq.nlargest(k, stocks, key=key))
+                self.assertEqual(live.get_top_k_stocks_by_sector("Tech", k, criteria),
+                                 heapq.nlargest(k, self.storage.get_stocks_by_sector("Tech"), key=key))
+                if criteria != 'score':
+                    self.assertEqual(live.get_bottom_k_stocks(k, criteria), heapq.nsmallest(k, stocks, key=key))
+
     def test_market_sentiment(self):
         self.s1.price_history = [150.0, 150.0, 150.0]
         self.s2.price_history = [2000.0, 2010.0, 2020.0, 2050.0]
@@ -82,6 +1063,79 @@ class TestStockMarketAnalyzer(unittest.TestCase):
         self.assertIn("DOWN", counts)
         self.assertIn("STABLE", counts)
     
+    def test_ring_buffer_history(self):
+        self.s1.price_history = [float(p) for p in range(150)]
+        self.assertEqual(len(self.s1.price_history), 100)
+        self.assertEqual(self.s1.price_history[0], 50.0)
+        self.s1.update_price(500.0)
+        self.assertEqual(self.s1.price_history[-1], 500.0)
+        self.assertEqual(list(self.s1.price_history)[-3:], [148.0, 149.0, 500.0])
+
+        self.assertEqual(self.storage.update_many(["GOOG", "INVALID", "TSLA"], [2100.0, 1.0, 710.0]), 2)
+        self.assertEqual(self.s2.price, 2100.0)
+        self.assertEqual(list(self.s3.price_history), [710.0])
+        self.assertEqual(asdict(self.s3)['price_history'], [710.0])
+
+    def test_vectorized_trends_match(self):
+        rng = random.Random(7)
+        for s in self.storage.get_all_stocks():
+            s.price_history = [100 + rng.uniform(-3, 3) for _ in range(rng.randint(0, 120))]
+        self.s1.price_history = [150.0, 150.0, 150.0]
+
+        codes = self.trend.analyze_trends(self.storage)
+        for s, code in zip(self.storage.get_all_stocks(), codes):
+            self.assertEqual(TREND_LABELS[int(code)], self.trend.analyze_trend(list(s.price_history)))
+        self.assertEqual(self.trend.calculate_storage_sentiment(self.storage),
+                         self.trend.calculate_market_sentiment(self.storage.get_all_stocks()))
+
+    def test_trend_engine_matches_analyze_trend(self):
+        engine = TrendEngine(self.storage)
+        rng = random.Random(11)
+        symbols = [s.symbol for s in self.storage.get_all_stocks()]
+
+        def check():
+            stocks = self.storage.get_all_stocks()
+            for s in stocks:
+                self.assertEqual(engine.get_trend(s.symbol), self.trend.analyze_trend(list(s.price_history)))
+                self.assertAlmostEqual(engine.get_sma(s.symbol),
+                                       self.trend.calculate_moving_average(list(s.price_history)), places=6)
+            self.assertEqual(engine.get_sentiment(), self.trend.calculate_market_sentiment(stocks))
+
+        check()
+        for tick in range(300):
+            if tick % 3:
+                self.storage.update_many(symbols, [rng.choice([100.0, 100.5, 99.5, rng.uniform(95, 105)])
+                                                   for _ in symbols])
+            else:
+                self.storage.get_stock(rng.choice(symbols)).update_price(rng.uniform(95, 105))
+        check()
+
+        self.s1.price_history = [100.0, 100.0, 100.0, 100.0, 102.0]
+        self.storage.delete_stock("GOOG")
+        self.storage.add_stock(Stock("IBM", "IBM", "Tech", 130.0, 900, 0.2))
+        self.storage.get_stock("IBM").update_price(131.0)
+        check()
+
+    def test_indicators(self):
+        analyzer = IndicatorAnalyzer(window_size=5, bollinger_window=5, volatility_window=4)
+        rising = [100.0 + i for i in range(30)]
+        single = analyzer.calculate_for_prices(rising)
+        self.assertAlmostEqual(single['sma'], sum(rising[-5:]) / 5)
+        self.assertEqual(single['rsi'], 100.0)
+        self.assertGreater(single['macd'], 0)
+        self.assertAlmostEqual(single['bb_middle'], single['sma'])
+        self.assertAlmostEqual(single['bb_upper'] - single['bb_middle'], 2 * (2 ** 0.5))
+        self.assertAlmostEqual(single['return_1'], 129.0 / 128.0 - 1)
+        self.assertAlmostEqual(single['return_window'], 129.0 / 100.0 - 1)
+
+        self.s1.price_history = rising
+        self.s2.price_history = [2000.0, 2010.0]
+        rows = analyzer.calculate_for_storage(self.storage)
+        self.assertEqual([r['symbol'] for r in rows], [s.symbol for s in self.storage.get_all_stocks()])
+        self.assertEqual(rows[0], dict(single, symbol="AAPL"))
+        self.assertIsNone(rows[1]['sma'])  # not enough history
+        self.assertAlmostEqual(rows[1]['return_1'], 0.005)
+
     def test_sector_ranking(self):
         top_tech = self.ranking.get_top_k_stocks_by_sector("Tech", 1, 'price')
         self.assertEqual(top_tech[0].symbol, "AMZN")
@@ -100,6 +1154,37 @@ class TestStockMarketAnalyzer(unittest.TestCase):
         auto_stat = next(s for s in stats if s['sector'] == 'Auto')
         self.assertEqual(auto_stat['count'], 1)
         self.assertEqual(auto_stat['avg_price'], 700.0)
+        self.assertEqual((tech_stat['min_price'], tech_stat['max_price']), (150.0, 3000.0))
+
+    def test_sector_aggregates_consistent(self):
+        rng = random.Random(11)
+        storage = StockStorage(preserve_order=False)
+        analyzer = SectorAnalyzer(storage)
+        for i in range(200):
+            storage.add_stock(Stock(f"X{i}", f"X {i}", rng.choice(["Tech", "Auto", "Bank"]),
+                                    rng.uniform(1, 3000), rng.randint(1, 10**6), rng.uniform(0.1, 0.9)))
+        for step in range(2000):
+            symbols = [s.symbol for s in storage.get_all_stocks()]
+            stock = storage.get_stock(rng.choice(symbols))
+            action = step % 5
+            if action == 0:
+                stock.update_price(rng.uniform(1, 3000))
+            elif action == 1:
+                storage.update_many(rng.sample(symbols, 20), [rng.uniform(1, 3000) for _ in range(20)])
+            elif action == 2:
+                stock.volume = rng.randint(1, 10**6)
+                stock.volatility = rng.uniform(0.1, 0.9)
+            elif action == 3 and len(symbols) > 50:
+                storage.delete_stock(stock.symbol)
+            else:
+                storage.add_stock(Stock(f"Y{step}", "Y", rng.choice(["Tech", "Auto", "Bank", "Gold"]),
+                                        rng.uniform(1, 3000), rng.randint(1, 10**6), 0.5))
+        self.assertEqual(analyzer.check_consistency(), [])
+
+        for s in list(storage.get_stocks_by_sector("Gold")):
+            storage.delete_stock(s.symbol)
+        self.assertNotIn("Gold", [s['sector'] for s in analyzer.calculate_sector_stats()])
+        self.assertEqual(analyzer.check_consistency(), [])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import numpy as np
+
+from models import Stock
+from storage import StockStorage, StorageListener
+
+# One fixed-size little-endian record per observation: 24 bytes.
+TICK_DTYPE = np.dtype([('ts', '<f8'), ('price', '<f8'), ('volume', '<i8')])
+
+# OHLC bar widths in seconds.
+INTERVALS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '1d': 86400}
+
+
+class TickArchive(StorageListener):
+    """
+    Append-only per-symbol tick files: <path>/<symbol>.ticks, records of TICK_DTYPE
+    (epoch seconds, price, volume) in time order.
+    Every price tick appends one record per row to an in-memory buffer; adding a stock
+    records its opening price. Deleting a stock keeps its file.
+    Ticks arrive under the storage write lock, so appending never touches the disk: a
+    background thread writes the buffer out every `flush_interval` seconds, or sooner
+    once `flush_every` records are waiting (flush() does it on demand).
+    Reads see what has been written so far and never write themselves. They memory-map
+    the file: a time range is found by binary search on the ts column and only the
+    pages inside it are touched, so long-range charts never load the whole archive
+    into RAM.
+    Time Complexity: append O(1) amortized; get_history O(log n + k); get_ohlc O(log n + k)
+    for k ticks in range, processed in bounded chunks.
+    """
+
+    def __init__(self, path: str, flush_every: int = 4096, flush_interval: Optional[float] = 1.0,
+                 clock=time.time):
+        self.path = path
+        self.flush_every = flush_every  # buffered records that wake the flusher early
+        self.flush_interval = flush_interval  # seconds between background flushes; None: only flush()
+        self.clock = clock
+        self.storage: Optional[StockStorage] = None
+        self._pending: Dict[str, List[tuple]] = {}
+        self._pending_count = 0
+        self._last_ts: Dict[str, float] = {}  # newest ts appended per symbol
+        self._written_ts: Dict[str, float] = {}  # newest ts on disk per symbol, once looked up
+        self._lock = threading.Lock()  # the buffer
+        self._write_lock = threading.Lock()  # one flush at a time, so each file stays in order
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+        os.makedirs(path, exist_ok=True)
+
+    def attach(self, storage: StockStorage):
+        self.storage = storage
+        storage.add_listener(self)
+        if self.flush_interval is not None and self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def close(self):
+        """Stop the background flusher and write out what is buffered."""
+        self._closed = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    # --- Writing ---
+
+    def append(self, symbol: str, price: float, volume: int, ts: Optional[float] = None):
+        """Buffer one record. Time Complexity: O(1), no I/O."""
+        ts = self.clock() if ts is None else ts
+        with self._lock:
+            # Clamp to the previous record so each file stays sorted for binary search
+            # (against the file itself when it is written, see _write).
+            ts = max(ts, self._last_ts.get(symbol, ts))
+            self._last_ts[symbol] = ts
+            self._pending.setdefault(symbol, []).append((ts, price, volume))
+            self._pending_count += 1
+            if self._pending_count >= self.flush_every:
+                self._wake.set()
+
+    def flush(self):
+        """
+        Write the buffered records to disk; appends are only held up while the buffer is
+        swapped out. If a write fails, the records not yet written go back to the front of
+        the buffer and the error propagates.
+        """
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending, self._pending_count = self._pending, {}, 0
+            try:
+                for symbol in list(pending):
+                    self._write(symbol, np.array(pending[symbol], dtype=TICK_DTYPE))
+                    del pending[symbol]
+            finally:
+                if pending:
+                    self._requeue(pending)
+
+    def _requeue(self, pending: Dict[str, List[tuple]]):
+        with self._lock:
+            for symbol, records in pending.items():
+                self._pending[symbol] = records + self._pending.get(symbol, [])
+                self._pending_count += len(records)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep the thread alive: the records stay buffered for the next attempt.
+                print(f"Tick archive flush error: {e}")
+
+    def _write(self, symbol: str, records: np.ndarray):
+        path = self._file(symbol)
+        last = self._written_ts.get(symbol)
+        if last is None:
+            self._repair(path)
+            on_disk = self._map(symbol)
+            last = float(on_disk['ts'][-1]) if len(on_disk) else float('-inf')
+        records['ts'] = np.maximum.accumulate(np.maximum(records['ts'], last))
+        with open(path, 'ab') as f:
+            size = f.tell()
+            try:
+                records.tofile(f)
+                f.flush()
+            except BaseException:
+                # Cut a partial write off again so the file keeps whole records only.
+                f.truncate(size)
+                raise
+        self._written_ts[symbol] = float(records['ts'][-1])
+
+    @staticmethod
+    def _repair(path: str):
+        """Truncate a torn final record (a crash mid-write), or appends would be misaligned."""
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+            whole = size - size % TICK_DTYPE.itemsize
+            if whole < size:
+                with open(path, 'r+b') as f:
+                    f.truncate(whole)
+
+    # --- Reading ---
+
+    def get_history(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """Records with start <= ts < end (either bound optional) as a TICK_DTYPE array copy."""
+        records = self._map(symbol)
+        lo, hi = self._bounds(records, start, end)
+        return np.array(records[lo:hi])
+
+    def get_ohlc(self, symbol: str, interval: str = '1m', start: Optional[float] = None,
+                 end: Optional[float] = None, chunk: int = 1 << 20) -> List[Dict]:
+        """
+        OHLC bars over [start, end), aligned to UTC multiples of the interval.
+        A bar's volume is the last volume seen in it (quotes carry the session volume).
+        At most ~`chunk` records are copied out of the map at a time.
+        Raises ValueError for an unknown interval.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval '{interval}', expected one of {sorted(INTERVALS)}")
+        width = INTERVALS[interval]
+        records = self._map(symbol)
+        lo, hi = self._bounds(records, start, end)
+        timestamps = records['ts']
+
+        bars = []
+        i = lo
+        while i < hi:
+            j = min(i + chunk, hi)
+            if j < hi:
+                # Stretch the chunk to the end of its last bar so no bar spans two chunks.
+                edge = (timestamps[j - 1] // width + 1) * width
+                j = i + int(np.searchsorted(timestamps[i:hi], edge, side='left'))
+            bars.extend(_ohlc(np.array(records[i:j]), width))
+            i = j
+        return bars
+
+    def _map(self, symbol: str) -> np.ndarray:
+        # Whole records only: the tail may be a write in progress or a crash's torn record.
+        path = self._file(symbol)
+        count = os.path.getsize(path) // TICK_DTYPE.itemsize if os.path.exists(path) else 0
+        if not count:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.memmap(path, dtype=TICK_DTYPE, mode='r', shape=(count,))
+
+    @staticmethod
+    def _bounds(records: np.ndarray, start: Optional[float], end: Optional[float]):
+        timestamps = records['ts']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(records) if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        return lo, max(lo, hi)
+
+    def _file(self, symbol: str) -> str:
+        return os.path.join(self.path, quote(symbol, safe='') + '.ticks')
+
+    # --- Storage events ---
+
+    def on_stock_added(self, stock: Stock):
+        self.append(stock.symbol, stock.price, stock.volume)
+
+    def on_prices_updated(self, rows, old_prices):
+        now = self.clock()
+        stocks_list = self.storage.stocks_list
+        prices = self.storage.prices[rows].tolist()
+        volumes = self.storage.volumes[rows].tolist()
+        for row, price, volume in zip(rows.tolist(), prices, volumes):
+            self.append(stocks_list[row].symbol, price, volume, now)
+
+
+def _ohlc(records: np.ndarray, width: int) -> List[Dict]:
+    """Vectorized OHLC over time-ordered records that hold whole bars."""
+    if not len(records):
+        return []
+    buckets = records['ts'] // width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(records)] - 1
+    prices = records['price']
+    return [
+        {"time": int(bucket) * width, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for bucket, o, h, l, c, v in zip(
+            buckets[starts].tolist(), prices[starts].tolist(),
+            np.maximum.reduceat(prices, starts).tolist(), np.minimum.reduceat(prices, starts).tolist(),
+            prices[ends].tolist(), records['volume'][ends].tolist())
+    ]
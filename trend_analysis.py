@@ -1,5 +1,10 @@
 from collections import deque
-from typing import List
+from typing import List, Optional
+import numpy as np
+from models import HISTORY_LENGTH
+from storage import StorageListener
+
+TREND_LABELS = {-1: "DOWN", 0: "STABLE", 1: "UP"}
 
 class TrendAnalyzer:
     def __init__(self, window_size: int = 5):
@@ -40,3 +45,167 @@ class TrendAnalyzer:
                 
         return sentiment_counts
 
+    def analyze_trends(self, storage, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Vectorized analyze_trend over the storage ring buffer.
+        Returns one code per row: -1 DOWN, 0 STABLE, 1 UP (see TREND_LABELS).
+        Window sums are accumulated oldest -> newest, the same order as sum(),
+        so results match analyze_trend exactly.
+        """
+        if rows is None:
+            rows = np.arange(len(storage.stocks_list))
+        totals, counts, current = self._window_sums(storage, rows)
+
+        sma = totals / np.maximum(counts, 1)
+        threshold = sma * 0.005
+
+        codes = np.zeros(len(rows), dtype=np.int8)
+        codes[current > sma + threshold] = 1
+        codes[current < sma - threshold] = -1
+        codes[storage.history_len[rows] < 2] = 0
+        return codes
+
+    def _window_sums(self, storage, rows: np.ndarray):
+        """Exact window sums, window counts and latest prices for the given rows."""
+        matrix, _ = storage.history_matrix(self.window_size, rows)
+
+        totals = np.zeros(len(rows))
+        counts = np.zeros(len(rows))
+        for col in matrix.T:
+            valid = ~np.isnan(col)
+            totals = np.where(valid, totals + col, totals)
+            counts += valid
+        return totals, counts, matrix[:, -1]
+
+    def calculate_storage_sentiment(self, storage) -> dict:
+        """Market sentiment for every stored stock in one pass over the ring buffer."""
+        codes = self.analyze_trends(storage)
+        return {
+            "UP": int(np.count_nonzero(codes == 1)),
+            "DOWN": int(np.count_nonzero(codes == -1)),
+            "STABLE": int(np.count_nonzero(codes == 0)),
+        }
+
+
+class TrendEngine(TrendAnalyzer, StorageListener):
+    """
+    Incremental trend state kept in storage columns next to each row:
+    a running window sum (SMA), an EMA and the current UP/DOWN/STABLE code.
+    A price tick updates them in O(1) per row and market sentiment is a set
+    of live counters, so /api/sentiment no longer rescans every history.
+    Classification matches analyze_trend exactly (see on_prices_updated).
+    """
+
+    # Relative distance from a threshold inside which the running sum is not trusted.
+    EXACT_BAND = 1e-9
+
+    def __init__(self, storage, window_size: int = 5):
+        if not 0 < window_size < HISTORY_LENGTH:
+            raise ValueError(f"window_size must be between 1 and {HISTORY_LENGTH - 1}")
+        TrendAnalyzer.__init__(self, window_size)
+        self.storage = storage
+        self.alpha = 2 / (window_size + 1)
+        self._counts = np.zeros(3, dtype=np.int64)  # indexed by code + 1
+
+        storage.register_column('trend_sum', np.float64)
+        storage.register_column('trend_ema', np.float64)
+        storage.register_column('trend_code', np.int8)
+
+        self._rebuild(np.arange(len(storage.stocks_list)), counted=False)
+        storage.add_listener(self)
+
+    # --- Reads (O(1)) ---
+
+    def get_sentiment(self) -> dict:
+        return {"UP": int(self._counts[2]), "DOWN": int(self._counts[0]), "STABLE": int(self._counts[1])}
+
+    def get_trend(self, symbol: str) -> Optional[str]:
+        row = self.storage.get_row(symbol)
+        return None if row is None else TREND_LABELS[int(self.storage.trend_code[row])]
+
+    def get_sma(self, symbol: str) -> float:
+        row = self.storage.get_row(symbol)
+        if row is None:
+            return 0.0
+        count = min(int(self.storage.history_len[row]), self.window_size)
+        return float(self.storage.trend_sum[row] / count) if count else 0.0
+
+    def get_ema(self, symbol: str) -> float:
+        row = self.storage.get_row(symbol)
+        return 0.0 if row is None else float(self.storage.trend_ema[row])
+
+    # --- Storage events ---
+
+    def on_stock_added(self, stock):
+        self._rebuild(np.array([stock._row], dtype=np.intp), counted=False)
+
+    def on_stock_removed(self, stock):
+        self._counts[self.storage.trend_code[stock._row] + 1] -= 1
+
+    def on_history_changed(self, row: int):
+        self._rebuild(np.array([row], dtype=np.intp), counted=True)
+
+    def on_prices_updated(self, rows: np.ndarray, old_prices: np.ndarray):
+        storage = self.storage
+        window = self.window_size
+        lengths = storage.history_len[rows]
+        heads = storage.history_head[rows].astype(np.intp)
+        new_prices = storage.prices[rows]
+
+        # Slide the window: add the new price, drop the one `window` ticks back.
+        slid_out = np.where(lengths > window,
+                            storage.history[rows, (heads - 1 - window) % HISTORY_LENGTH], 0.0)
+        sums = storage.trend_sum[rows] + new_prices - slid_out
+
+        # Re-sum exactly whenever a row's ring wraps, bounding float drift to 100 ticks.
+        wrapped = heads == 0
+        if wrapped.any():
+            sums[wrapped] = self._window_sums(storage, rows[wrapped])[0]
+
+        emas = np.where(lengths == 1, new_prices,
+                        self.alpha * new_prices + (1 - self.alpha) * storage.trend_ema[rows])
+
+        sma = sums / np.minimum(lengths, window)
+        threshold = sma * 0.005
+        upper, lower = sma + threshold, sma - threshold
+        codes = np.zeros(len(rows), dtype=np.int8)
+        codes[new_prices > upper] = 1
+        codes[new_prices < lower] = -1
+        codes[lengths < 2] = 0
+
+        # Running sums can differ from sum() in the last bits; decide borderline rows exactly.
+        band = np.abs(sma) * self.EXACT_BAND
+        borderline = (np.abs(new_prices - upper) <= band) | (np.abs(new_prices - lower) <= band)
+        if borderline.any():
+            codes[borderline] = self.analyze_trends(storage, rows[borderline])
+
+        self._recount(storage.trend_code[rows], codes)
+        storage.trend_sum[rows] = sums
+        storage.trend_ema[rows] = emas
+        storage.trend_code[rows] = codes
+
+    # --- Helpers ---
+
+    def _rebuild(self, rows: np.ndarray, counted: bool):
+        """Recompute a row's state from its full history (new rows, replaced histories)."""
+        if len(rows) == 0:
+            return
+        storage = self.storage
+        codes = self.analyze_trends(storage, rows)
+
+        matrix, _ = storage.history_matrix(HISTORY_LENGTH, rows)
+        emas = np.full(len(rows), np.nan)
+        for col in matrix.T:
+            emas = np.where(np.isnan(emas), col, np.where(np.isnan(col), emas,
+                            self.alpha * col + (1 - self.alpha) * emas))
+
+        if counted:
+            self._recount(storage.trend_code[rows], codes)
+        else:
+            self._counts += np.bincount(codes + 1, minlength=3)
+        storage.trend_sum[rows] = self._window_sums(storage, rows)[0]
+        storage.trend_ema[rows] = np.nan_to_num(emas)
+        storage.trend_code[rows] = codes
+
+    def _recount(self, old_codes: np.ndarray, new_codes: np.ndarray):
+        self._counts += np.bincount(new_codes + 1, minlength=3) - np.bincount(old_codes + 1, minlength=3)